@@ -4,18 +4,72 @@ import base64
 import hashlib
 import hmac
 import json
-from typing import Optional, List, Dict
-from config import API_KEY, API_SECRET, API_DOMAIN
+import asyncio
+import functools
+import threading
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from typing import Optional, List, Dict, Tuple, Union
+import metrics
+from candle_store import CandleStore
+from config import API_KEY, API_SECRET, API_DOMAIN, CANDLE_CACHE_DIR, KRAKEN_PRIVATE_WORKERS
+from http_transport import HTTPTransport, get_default_transport
 from logger_config import logger
+from nonce_allocator import NonceAllocator, get_nonce_allocator
+from ohlcv import from_kraken_rows
+from order_book import OrderBook
+from response_cache import ResponseCache, get_default_response_cache
+from rate_limiter import KrakenRateLimiter, RequestCoalescer, get_default_rate_limiter, get_default_coalescer
 from tenacity import retry, wait_exponential, stop_after_attempt
 
+# Times a private call is signed and sent when Kraken rejects it for an out-of-order nonce
+NONCE_ATTEMPTS = 5
+
+
+def _count_retry(retry_state) -> None:
+    # tenacity passes (self, method, ...) positionally or method by keyword
+    method = retry_state.kwargs.get("method") or retry_state.args[1]
+    metrics.API_RETRIES.inc(method)
+    metrics.API_ERRORS.inc(method, "exception")
+
 
 class KrakenAPI:
-    def __init__(self, api_key: str, api_secret: str, api_domain: str):
+    def __init__(self, api_key: str, api_secret: str, api_domain: str, transport: Optional[HTTPTransport] = None,
+                 rate_limiter: Optional[KrakenRateLimiter] = None, coalescer: Optional[RequestCoalescer] = None,
+                 cache: Optional[ResponseCache] = None, nonce_allocator: Optional[NonceAllocator] = None):
         self.api_key = api_key
         # Decode the base64-encoded secret
         self.api_secret = base64.b64decode(api_secret)
+        # HMAC state keyed by the secret, computed once and copied for each signature
+        self._hmac = hmac.new(self.api_secret, digestmod=hashlib.sha512)
+        # Nonces come from one thread-safe sequence per key, shared by every client
+        self.nonce_allocator = nonce_allocator if nonce_allocator else get_nonce_allocator(api_key)
         self.api_domain = api_domain
+        # Pooled keep-alive session, shared across clients unless one is given
+        self.transport = transport if transport else get_default_transport()
+        # Call counters and request coalescing are shared process-wide by default,
+        # since Kraken's limits apply per IP and per key rather than per client
+        self.rate_limiter = rate_limiter if rate_limiter else get_default_rate_limiter()
+        self.coalescer = coalescer if coalescer else get_default_coalescer()
+        # Public responses are cached per endpoint TTL; private calls never are
+        self.cache = cache if cache else get_default_response_cache()
+        # Optional WebSocket feed that serves market data from local state
+        self.market_feed = None
+        self._candle_stores = {}
+        self._candle_stores_lock = threading.Lock()
+
+    def attach_market_feed(self, market_feed) -> None:
+        """
+        Serves price, volume and order book lookups from a KrakenMarketFeed while
+        its state is fresh, falling back to REST otherwise.
+        """
+        self.market_feed = market_feed
+
+    def _feed_for(self, pair: str):
+        if self.market_feed is not None and self.market_feed.pair == pair:
+            return self.market_feed
+        return None
 
     def _sign_request(self, api_path: str, api_nonce: str, api_postdata: str) -> str:
         """
@@ -24,85 +78,238 @@ class KrakenAPI:
         # Step 1: SHA-256 of (nonce + POST data)
         api_sha256 = hashlib.sha256(api_nonce.encode('utf-8') + api_postdata.encode('utf-8')).digest()
         # Step 2: HMAC-SHA512 of (API path + previous hash), keyed by the API secret
-        api_hmacsha512 = hmac.new(self.api_secret, api_path.encode('utf-8') + api_sha256, hashlib.sha512)
+        api_hmacsha512 = self._hmac.copy()
+        api_hmacsha512.update(api_path.encode('utf-8') + api_sha256)
         # Step 3: Base64-encode the final HMAC
         return base64.b64encode(api_hmacsha512.digest()).decode()
 
-    @retry(wait=wait_exponential(min=1, max=10), stop=stop_after_attempt(5))
     def _make_request(self, method: str, path: str, data: Optional[Dict] = None, is_private: bool = False) -> Optional[Dict]:
         """
         Handles GET (public) and POST (private) requests to the Kraken API.
-        Retries on failure, up to 5 attempts with exponential backoff.
+        Public responses are served from the response cache while fresh, and identical
+        public requests made concurrently or in quick succession share one call.
+        """
+        if is_private:
+            return self._send_request(method, path, data, is_private)
+        key = (self.api_domain, path, method, tuple(sorted((data or {}).items())))
+        cacheable = self.cache.is_cacheable(method)
+        if cacheable:
+            hit, result = self.cache.get(key, method)
+            if hit:
+                metrics.API_CACHE_HITS.inc(method)
+                return result
+        result = self.coalescer.call(key, lambda: self._send_request(method, path, data, is_private))
+        if cacheable and result is not None:
+            self.cache.set(key, method, result)
+        return result
+
+    @retry(wait=wait_exponential(min=1, max=10), stop=stop_after_attempt(5), before_sleep=_count_retry)
+    def _send_request(self, method: str, path: str, data: Optional[Dict] = None, is_private: bool = False) -> Optional[Dict]:
+        """
+        Sends one request once the rate limiter has budget for it.
+        Retries on failure, up to 5 attempts with exponential backoff. A private call
+        rejected for its nonce is re-signed with a fresh nonce straight away.
         """
         url = f"{self.api_domain}{path}{method}"
         headers = {"User-Agent": "Kraken REST API"}
-
         if is_private:
-            # For private endpoints, add the necessary authentication headers
-            nonce = str(int(time.time() * 1000))
-            if not data:
-                data = {}
-            data['nonce'] = nonce
-            # Construct POST data as key=value pairs joined by '&'
-            post_data_string = "&".join([f"{key}={value}" for key, value in data.items()])
-            headers["API-Key"] = self.api_key
-            headers["API-Sign"] = self._sign_request(path + method, nonce, post_data_string)
-
-        try:
-            logger.info(f"Making {method} request to {url} with data: {data}")
+            # A copy, so neither the caller's dict nor a queued log record sees later nonces
+            data = dict(data) if data else {}
+
+        for attempt in range(NONCE_ATTEMPTS if is_private else 1):
+            self.rate_limiter.acquire(method, is_private)
             if is_private:
-                # Private endpoints typically use POST
-                response = requests.post(url, headers=headers, data=data)
-            else:
-                # Public endpoints typically use GET
-                response = requests.get(url, headers=headers, params=data)
+                # For private endpoints, add the necessary authentication headers
+                nonce = str(self.nonce_allocator.next())
+                data = dict(data, nonce=nonce)
+                # Sign exactly the body that is sent, so nested keys such as orders[0][price]
+                # and values with reserved characters are encoded the same way in both
+                post_data_string = urllib.parse.urlencode(data)
+                headers["Content-Type"] = "application/x-www-form-urlencoded"
+                headers["API-Key"] = self.api_key
+                headers["API-Sign"] = self._sign_request(path + method, nonce, post_data_string)
+
+            metrics.API_REQUESTS.inc(method)
+            started = time.perf_counter()
+            try:
+                logger.debug("Making %s request to %s with data: %s", method, url, data)
+                if is_private:
+                    # Private endpoints typically use POST
+                    response = self.transport.post(url, headers=headers, data=post_data_string)
+                else:
+                    # Public endpoints typically use GET
+                    response = self.transport.get(url, headers=headers, params=data)
 
-            # Raise if we get an HTTP error
-            response.raise_for_status()
+                metrics.API_REQUEST_SECONDS.observe(time.perf_counter() - started, method)
+                # Raise if we get an HTTP error
+                response.raise_for_status()
 
-            api_reply = response.json()
+                api_reply = response.json()
 
-            # Kraken usually returns an 'error' array; check if it has any entries
-            if 'error' in api_reply and len(api_reply['error']) > 0:
-                logger.error(f"API error: {api_reply['error']}")
+                # Kraken usually returns an 'error' array; check if it has any entries
+                if 'error' in api_reply and len(api_reply['error']) > 0:
+                    if is_private and attempt + 1 < NONCE_ATTEMPTS \
+                            and any("Invalid nonce" in error for error in api_reply['error']):
+                        # A concurrent call with a later nonce arrived first. The request was
+                        # not executed, and a fresh nonce is above every one handed out so far.
+                        logger.debug("%s nonce %s arrived out of order; re-signing", method, nonce)
+                        metrics.API_RETRIES.inc(method)
+                        continue
+                    logger.error("API error: %s", api_reply['error'])
+                    metrics.API_ERRORS.inc(method, "api")
+                    if any("Rate limit" in error or "Too many requests" in error for error in api_reply['error']):
+                        # Let the counter drain before anything else is sent
+                        self.rate_limiter.penalize(is_private)
+                    return None
+
+                return api_reply.get('result', None)
+
+            except requests.RequestException as error:
+                logger.error("API call failed with error: %s", error)
+                metrics.API_ERRORS.inc(method, "http")
                 return None
+        return None
 
-            return api_reply.get('result', None)
+    def get_asset_pairs(self) -> Dict[str, str]:
+        """
+        Maps each pair's altname (e.g. XBTUSD) to the key Kraken uses for it in
+        results (e.g. XXBTZUSD). Cached for an hour by the response cache.
+        """
+        result = self._make_request(method="AssetPairs", path="/0/public/")
+        if not result:
+            return {}
+        return {info.get("altname", key): key for key, info in result.items()}
 
-        except requests.RequestException as error:
-            logger.error(f"API call failed with error: {error}")
-            return None
+    def get_pair_currencies(self, pair: str) -> Optional[Tuple[str, str]]:
+        """
+        Returns the (base, quote) asset names of a pair, e.g. ("ETH", "USDT") for
+        ETHUSDT, taken from its WebSocket name in AssetPairs.
+        """
+        result = self._make_request(method="AssetPairs", path="/0/public/")
+        for key, info in (result or {}).items():
+            if pair in (key, info.get("altname")) and "/" in info.get("wsname", ""):
+                base, quote = info["wsname"].split("/", 1)
+                return base, quote
+        return None
 
-    def get_btc_order_book(self) -> Optional[Dict]:
+    def _result_for(self, result: Dict, pair: str):
+        # Results are keyed by Kraken's own pair name, which differs from the altname
+        # for legacy pairs such as XBTUSD -> XXBTZUSD
+        if pair in result:
+            return result[pair]
+        return result.get(self.get_asset_pairs().get(pair))
+
+    def get_tickers(self, pairs: List[str]) -> Dict[str, Dict]:
         """
-        Gets the current order book for BTC/USDT.
+        Fetches the ticker for many pairs in a single Ticker call.
+        Pairs missing from the response are left out of the returned dict.
+        """
+        if not pairs:
+            return {}
+        known = self.get_asset_pairs()
+        if known:
+            # Kraken fails the whole call on a single unknown pair, so those are left out
+            unknown = [pair for pair in pairs if pair not in known and pair not in known.values()]
+            if unknown:
+                logger.warning("Unknown asset pairs %s; leaving them out of the Ticker call.", unknown)
+                pairs = [pair for pair in pairs if pair not in unknown]
+        if not pairs:
+            return {}
+        result = self._make_request(method="Ticker", path="/0/public/", data={"pair": ",".join(pairs)})
+        if not result:
+            return {}
+        tickers = {}
+        for pair in pairs:
+            ticker = self._result_for(result, pair)
+            if ticker is not None:
+                tickers[pair] = ticker
+            else:
+                logger.warning("No ticker returned for %s.", pair)
+        return tickers
+
+    def get_prices(self, pairs: List[str]) -> Dict[str, Optional[float]]:
+        """
+        Fetches the last trade price of every pair, serving pairs with a fresh market
+        feed locally and the rest from one batched Ticker call.
         """
-        result = self._make_request(method="Depth", path="/0/public/", data={"pair": "XBTUSDT"})
+        prices = {}
+        for pair in pairs:
+            feed = self._feed_for(pair)
+            prices[pair] = feed.get_price() if feed else None
+        tickers = self.get_tickers([pair for pair in pairs if prices[pair] is None])
+        for pair, ticker in tickers.items():
+            # 'c' typically represents the current "last trade closed" price
+            prices[pair] = float(ticker['c'][0])
+        return prices
+
+    def get_market_volumes(self, pairs: List[str]) -> Dict[str, Optional[float]]:
+        """
+        Fetches the 24-hour trading volume of every pair, batched like get_prices.
+        """
+        volumes = {}
+        for pair in pairs:
+            feed = self._feed_for(pair)
+            volumes[pair] = feed.get_volume() if feed else None
+        tickers = self.get_tickers([pair for pair in pairs if volumes[pair] is None])
+        for pair, ticker in tickers.items():
+            try:
+                # v[1] is the 24-hour volume
+                volumes[pair] = float(ticker['v'][1])
+            except (KeyError, ValueError, IndexError) as e:
+                logger.error("Error retrieving market volume for %s: %s", pair, e)
+        return volumes
+
+    def get_order_book(self, pair: str = "XBTUSDT") -> Optional[Dict]:
+        """
+        Gets the current order book for the given pair.
+        """
+        feed = self._feed_for(pair)
+        if feed:
+            order_book = feed.get_order_book()
+            if order_book:
+                return order_book
+        result = self._make_request(method="Depth", path="/0/public/", data={"pair": pair})
         if result:
-            return result.get('XBTUSDT')
+            return self._result_for(result, pair)
         return None
 
-    def get_optimal_price(self, order_book: Dict, side: str, buffer: float = 0.05) -> Optional[float]:
+    def get_btc_order_book(self) -> Optional[Dict]:
+        """
+        Gets the current order book for BTC/USDT.
+        """
+        return self.get_order_book("XBTUSDT")
+
+    def get_optimal_price(self, order_book: Union[Dict, OrderBook], side: str, buffer: float = 0.05,
+                          volume: Optional[float] = None) -> Optional[float]:
         """
         Calculates an optimal price for buying or selling based on the order book.
-        A buffer amount is added or subtracted from the best bid/ask to get a slightly better fill.
+        A buffer amount is added or subtracted from the reference price to get a slightly better fill.
+        Without a volume the reference is the best bid/ask; with one it is the average
+        fill price for that volume, so larger orders are priced against real depth.
         """
+        if side not in ("buy", "sell"):
+            return None
+        book = order_book if isinstance(order_book, OrderBook) else OrderBook.from_rest(order_book)
+
+        reference_price = book.average_fill_price(side, volume) if volume else None
+        if reference_price is None:
+            # No volume given, or not enough visible depth to fill it
+            reference_price = book.best_ask() if side == "buy" else book.best_bid()
+        if reference_price is None:
+            return None
+
         if side == "buy":
-            best_ask = float(order_book['asks'][0][0])
-            optimal_price = best_ask - buffer
-        elif side == "sell":
-            best_bid = float(order_book['bids'][0][0])
-            optimal_price = best_bid + buffer
+            optimal_price = reference_price - buffer
         else:
-            return None
+            optimal_price = reference_price + buffer
 
         # Round the optimal price to 1 decimal place (Kraken often accepts prices up to 1 decimal)
         return round(optimal_price, 1)
 
-    def get_historical_prices(self, pair: str = "XBTUSDT", interval: int = 60, since: Optional[int] = None) -> List[float]:
+    def get_ohlc(self, pair: str = "XBTUSDT", interval: int = 60, since: Optional[int] = None) -> Tuple[Optional[List[List]], Optional[int]]:
         """
-        Fetches historical OHLC (Open/High/Low/Close) data for the given pair.
-        Returns a list of closing prices.
+        Fetches raw OHLC rows [time, open, high, low, close, vwap, volume, count] for the
+        given pair, together with Kraken's `last` cursor for the next incremental fetch.
         """
         data = {"pair": pair, "interval": interval}
         if since:
@@ -110,30 +317,106 @@ class KrakenAPI:
 
         result = self._make_request(method="OHLC", path="/0/public/", data=data)
         if result:
-            # Each entry in the OHLC array is [time, open, high, low, close, vwap, volume, count]
-            return [float(entry[4]) for entry in result.get(pair, [])]
-        return []
+            return self._result_for(result, pair) or [], result.get("last")
+        return None, None
+
+    def _candle_store(self, pair: str, interval: int) -> Optional[CandleStore]:
+        if not CANDLE_CACHE_DIR:
+            return None
+        key = (pair, interval)
+        with self._candle_stores_lock:
+            if key not in self._candle_stores:
+                self._candle_stores[key] = CandleStore(CANDLE_CACHE_DIR, pair, interval)
+            return self._candle_stores[key]
+
+    def get_historical_closes(self, pair: str = "XBTUSDT", interval: int = 60) -> np.ndarray:
+        """
+        Returns all cached closing prices as a zero-copy array after syncing the local
+        candle store with only the candles that are new since its last fetch. Prices
+        before the store's latest hole in history are left out.
+        """
+        store = self._candle_store(pair, interval)
+        if store is None:
+            return np.asarray(self.get_historical_prices(pair, interval), dtype=np.float64)
+        store.sync(self)
+        return store.column("close")[store.contiguous_start:]
+
+    def get_historical_prices(self, pair: str = "XBTUSDT", interval: int = 60, since: Optional[int] = None,
+                              limit: int = 720) -> List[float]:
+        """
+        Fetches historical OHLC (Open/High/Low/Close) data for the given pair.
+        Returns a list of the latest `limit` closing prices, served from the local
+        candle store when it is enabled.
+        """
+        store = self._candle_store(pair, interval) if since is None else None
+        if store is not None:
+            store.sync(self)
+            return store.column("close")[store.contiguous_start:][-limit:].tolist()
+
+        rows, _ = self.get_ohlc(pair, interval, since)
+        # Each entry in the OHLC array is [time, open, high, low, close, vwap, volume, count]
+        return [float(entry[4]) for entry in (rows or [])][-limit:]
+
+    def get_ohlcv(self, pair: str = "XBTUSDT", interval: int = 60, since: Optional[int] = None,
+                  limit: int = 720) -> np.ndarray:
+        """
+        Returns the latest `limit` candles with every column (time, OHLC, vwap, volume,
+        count) as an OHLCV record array, served from the local candle store when enabled.
+        """
+        store = self._candle_store(pair, interval) if since is None else None
+        if store is not None:
+            store.sync(self)
+            return store.records(min(limit, len(store) - store.contiguous_start))
+
+        rows, _ = self.get_ohlc(pair, interval, since)
+        return from_kraken_rows((rows or [])[-limit:])
+
+    def get_historical_closes_many(self, pairs: List[str], interval: int = 60) -> Dict[str, np.ndarray]:
+        """
+        Syncs and returns the closing prices of many pairs, fetching them concurrently
+        over the connection pool. Pairs whose fetch fails map to an empty array.
+        """
+        if not pairs:
+            return {}
+        closes = {}
+        with ThreadPoolExecutor(max_workers=min(len(pairs), self.transport.pool_size),
+                                thread_name_prefix="kraken-ohlc") as executor:
+            futures = {pair: executor.submit(self.get_historical_closes, pair, interval) for pair in pairs}
+            for pair, future in futures.items():
+                try:
+                    closes[pair] = future.result()
+                except Exception as error:
+                    logger.error("Could not fetch history for %s: %s", pair, error)
+                    closes[pair] = np.empty(0, dtype=np.float64)
+        return closes
+
+    def get_price(self, pair: str = "XBTUSDT") -> Optional[float]:
+        """
+        Fetches the current price of the given pair.
+        """
+        return self.get_prices([pair]).get(pair)
 
     def get_btc_price(self) -> Optional[float]:
         """
         Fetches the current BTC price in USDT.
         """
-        result = self._make_request(method="Ticker", path="/0/public/", data={"pair": "XBTUSDT"})
-        if result:
-            # 'c' typically represents the current "last trade closed" price
-            return float(result['XBTUSDT']['c'][0])
-        return None
+        return self.get_price("XBTUSDT")
 
-    def execute_trade(self, volume: float, side: str) -> None:
+    def execute_trade(self, volume: float, side: str, pair: str = "XBTUSDT") -> None:
         """
-        Executes a limit order to buy or sell a specified volume of BTC at an optimal price.
+        Executes a limit order to buy or sell a specified volume of the pair at an optimal price.
+        The Depth and AddOrder calls reuse the same pooled keep-alive connection, and
+        the Depth call is skipped entirely when a market feed holds a fresh local book.
         """
-        order_book = self.get_btc_order_book()
+        feed = self._feed_for(pair)
+        order_book = feed.get_book() if feed else None
+        if order_book is None:
+            order_book = self.get_order_book(pair)
         if order_book:
-            optimal_price = self.get_optimal_price(order_book, side)
+            optimal_price = self.get_optimal_price(order_book, side, volume=volume)
             if optimal_price:
                 data = {
-                    "pair": "XBTUSDT",
+                    "pair": pair,
                     "type": side,
                     "ordertype": "limit",
                     "price": optimal_price,
@@ -141,27 +424,14 @@ class KrakenAPI:
                 }
                 result = self._make_request(method="AddOrder", path="/0/private/", data=data, is_private=True)
                 if result:
-                    logger.info(
-                        f"\033[92mExecuted {side} order for {volume} BTC at {optimal_price}.\033[0m "
-                        f"Order response: {result}"
-                    )
+                    logger.info("Executed %s order for %s %s at %s. Order response: %s",
+                                side, volume, pair, optimal_price, result, extra={"color": "green"})
 
     def get_market_volume(self, pair: str = "XBTUSDT") -> Optional[float]:
         """
         Fetches the 24-hour trading volume for a given pair.
         """
-        result = self._make_request(method="Ticker", path="/0/public/", data={"pair": pair})
-        if result:
-            try:
-                volume_data = result[pair].get('v', [])
-                # v[1] is the 24-hour volume
-                if len(volume_data) > 1:
-                    return float(volume_data[1])
-                else:
-                    logger.error("Volume data is incomplete.")
-            except (KeyError, ValueError, IndexError) as e:
-                logger.error(f"Error retrieving market volume: {e}")
-        return None
+        return self.get_market_volumes([pair]).get(pair)
 
     def get_total_btc_balance(self) -> Optional[float]:
         """
@@ -177,12 +447,103 @@ class KrakenAPI:
             return None
 
 
+class AsyncKrakenAPI:
+    """
+    Coroutine counterpart of KrakenAPI exposing the same methods.
+    Public calls run on a thread pool sized to the HTTP connection pool, so several
+    can be in flight at once. Private calls run on KRAKEN_PRIVATE_WORKERS workers;
+    their nonces come from the client's shared allocator, and a call that reaches
+    Kraken behind a later nonce is re-signed rather than failed.
+    """
+    def __init__(self, api_key: str, api_secret: str, api_domain: str, transport: Optional[HTTPTransport] = None,
+                 rate_limiter: Optional[KrakenRateLimiter] = None, coalescer: Optional[RequestCoalescer] = None,
+                 cache: Optional[ResponseCache] = None):
+        self.client = KrakenAPI(api_key, api_secret, api_domain, transport=transport, rate_limiter=rate_limiter,
+                                coalescer=coalescer, cache=cache)
+        self._public_executor = ThreadPoolExecutor(max_workers=self.client.transport.pool_size,
+                                                   thread_name_prefix="kraken-public")
+        self._private_executor = ThreadPoolExecutor(max_workers=KRAKEN_PRIVATE_WORKERS,
+                                                    thread_name_prefix="kraken-private")
+
+    async def _run(self, executor: ThreadPoolExecutor, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+
+    async def get_btc_order_book(self) -> Optional[Dict]:
+        return await self._run(self._public_executor, self.client.get_btc_order_book)
+
+    async def get_order_book(self, pair: str = "XBTUSDT") -> Optional[Dict]:
+        return await self._run(self._public_executor, self.client.get_order_book, pair)
+
+    async def get_tickers(self, pairs: List[str]) -> Dict[str, Dict]:
+        return await self._run(self._public_executor, self.client.get_tickers, pairs)
+
+    async def get_prices(self, pairs: List[str]) -> Dict[str, Optional[float]]:
+        return await self._run(self._public_executor, self.client.get_prices, pairs)
+
+    async def get_market_volumes(self, pairs: List[str]) -> Dict[str, Optional[float]]:
+        return await self._run(self._public_executor, self.client.get_market_volumes, pairs)
+
+    def get_optimal_price(self, order_book: Union[Dict, OrderBook], side: str, buffer: float = 0.05,
+                          volume: Optional[float] = None) -> Optional[float]:
+        # Pure computation, no I/O to await
+        return self.client.get_optimal_price(order_book, side, buffer, volume)
+
+    async def get_historical_prices(self, pair: str = "XBTUSDT", interval: int = 60, since: Optional[int] = None) -> List[float]:
+        return await self._run(self._public_executor, self.client.get_historical_prices, pair, interval, since)
+
+    async def get_ohlcv(self, pair: str = "XBTUSDT", interval: int = 60, since: Optional[int] = None) -> np.ndarray:
+        return await self._run(self._public_executor, self.client.get_ohlcv, pair, interval, since)
+
+    async def get_historical_closes(self, pair: str = "XBTUSDT", interval: int = 60) -> np.ndarray:
+        return await self._run(self._public_executor, self.client.get_historical_closes, pair, interval)
+
+    async def get_historical_closes_many(self, pairs: List[str], interval: int = 60) -> Dict[str, np.ndarray]:
+        closes = await asyncio.gather(*(self.get_historical_closes(pair, interval) for pair in pairs))
+        return dict(zip(pairs, closes))
+
+    async def get_btc_price(self) -> Optional[float]:
+        return await self._run(self._public_executor, self.client.get_btc_price)
+
+    async def get_price(self, pair: str = "XBTUSDT") -> Optional[float]:
+        return await self._run(self._public_executor, self.client.get_price, pair)
+
+    async def execute_trade(self, volume: float, side: str, pair: str = "XBTUSDT") -> None:
+        return await self._run(self._private_executor, self.client.execute_trade, volume, side, pair)
+
+    async def get_market_volume(self, pair: str = "XBTUSDT") -> Optional[float]:
+        return await self._run(self._public_executor, self.client.get_market_volume, pair)
+
+    async def get_total_btc_balance(self) -> Optional[float]:
+        return await self._run(self._private_executor, self.client.get_total_btc_balance)
+
+    def close(self):
+        self._public_executor.shutdown(wait=False)
+        self._private_executor.shutdown(wait=False)
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_kraken_api() -> KrakenAPI:
+    """
+    Returns the process-wide KrakenAPI client built from config, creating it on first use.
+    """
+    global _default_client
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None:
+                _default_client = KrakenAPI(API_KEY, API_SECRET, API_DOMAIN)
+    return _default_client
+
+
 if __name__ == "__main__":
     # Example usage:
-    kraken_api = KrakenAPI(API_KEY, API_SECRET, API_DOMAIN)
+    kraken_api = get_kraken_api()
     
     btc_balance = kraken_api.get_total_btc_balance()
     if btc_balance is not None:
-        logger.info(f"Your total BTC balance is: {btc_balance}")
+        logger.info("Your total BTC balance is: %s", btc_balance)
     else:
         logger.info("Could not retrieve BTC balance.")
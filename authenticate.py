@@ -1,12 +1,6 @@
 import os
-import logging
-import openai
 from dotenv import load_dotenv
-
-# Configure logger
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
+from logger_config import logger
 
 # Load environment variables from the .env file
 logger.info("Loading environment variables from .env file...")
@@ -14,7 +8,13 @@ load_dotenv()
 
 # Get Twitter API credentials from environment variables with error handling
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# Optional alternative endpoint, e.g. a local stand-in for the OpenAI API
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
 
+# In simulation mode the local OpenAI stand-in is used unless told otherwise
+if os.getenv("SIMULATION", "false").lower() in ("1", "true", "yes"):
+    OPENAI_API_KEY = OPENAI_API_KEY or "simulator"
+    OPENAI_BASE_URL = OPENAI_BASE_URL or "http://127.0.0.1:8900/v1"
 
 if not OPENAI_API_KEY:
     raise ValueError(
@@ -27,7 +27,9 @@ def open_ai_auth():
     Authenticate with OpenAI API using the provided API key.
     """
     logger.info("Authenticating with OpenAI API...")
+    # Imported here so that loading this module stays cheap
+    import openai
 
-    ai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
+    ai_client = openai.OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL)
     logger.info("Successfully authenticated with OpenAI API.")
     return ai_client
@@ -0,0 +1,229 @@
+import functools
+import json
+import sys
+from typing import Optional, Dict, Union
+import numpy as np
+import ohlcv
+from rule_engine import NO_ACTION, BUY, PARTIAL_SELL, LADDER_THRESHOLDS, RuleBook, RuleSet, sentiment_ladder
+from logger_config import logger
+
+# Thresholds and windows used by TradingStrategy._determine_trade_action
+DEFAULT_PARAMS = {
+    **LADDER_THRESHOLDS,
+    "ma_window": 7,
+    "rsi_window": 14,
+    "short_window": 12,
+    "long_window": 26,
+    "signal_window": 7,
+    "transaction_fee_percentage": 0.26,
+    "min_market_volume": 100,
+    # Protective exits on the last buy; None disables them, as in the live strategy
+    "stop_loss_percent": None,
+    "take_profit_percent": None,
+}
+
+# Compiled rule books kept across generate_signals calls, so a sweep compiles each
+# threshold combination or rule set only once
+RULE_BOOK_CACHE_SIZE = 256
+
+
+@functools.lru_cache(maxsize=RULE_BOOK_CACHE_SIZE)
+def _ladder_book(thresholds: tuple) -> RuleBook:
+    return RuleBook([sentiment_ladder(dict(zip(LADDER_THRESHOLDS, thresholds)))])
+
+
+@functools.lru_cache(maxsize=RULE_BOOK_CACHE_SIZE)
+def _rule_set_book(rules_json: str) -> RuleBook:
+    return RuleBook([json.loads(rules_json)])
+
+
+def _rule_book(params: Dict, rules: Optional[RuleSet] = None) -> RuleBook:
+    """
+    The compiled book for `rules`, or for the sentiment ladder with the thresholds
+    in `params`. Books are read-only once built, so cached ones are shared.
+    """
+    if rules is None:
+        return _ladder_book(tuple(params[name] for name in LADDER_THRESHOLDS))
+    return _rule_set_book(json.dumps(rules, sort_keys=True))
+
+
+def generate_signals(closes: np.ndarray, sentiment: Union[float, np.ndarray] = 0.0, params: Optional[Dict] = None,
+                     rules: Optional[RuleSet] = None) -> np.ndarray:
+    """
+    Evaluates a rule set (by default the live sentiment ladder with the thresholds in
+    `params`) for every candle at once. Takes closes or an OHLCV record array and
+    returns an array of action codes (NO_ACTION, BUY, SELL, PARTIAL_SELL). Indicator
+    series are memoized per price array, so a sweep over thresholds on the same
+    history computes them only once.
+    """
+    p = dict(DEFAULT_PARAMS, **(params or {}))
+    closes = ohlcv.closes_of(closes)
+    sentiment = np.broadcast_to(np.asarray(sentiment, dtype=np.float64), closes.shape)
+
+    moving_avg = ohlcv.sma(closes, p["ma_window"])
+    rsi = ohlcv.rsi(closes, p["rsi_window"])
+    macd, signal, _ = ohlcv.macd(closes, p["short_window"], p["long_window"], p["signal_window"])
+
+    # The live strategy only acts when every indicator is available and truthy
+    with np.errstate(invalid='ignore'):
+        ready = np.all([np.isfinite(x) & (x != 0) for x in (moving_avg, rsi, macd, signal)], axis=0)
+    book = _rule_book(p, rules)
+    actions, _, _ = book.evaluate({"price": closes, "moving_avg": moving_avg, "rsi": rsi, "macd": macd,
+                                   "signal": signal, "sentiment": sentiment})
+    return np.where(ready, actions[0], NO_ACTION)
+
+
+def _find_exit(closes: np.ndarray, start: int, end: int, entry_price: float,
+               stop_loss: Optional[float], take_profit: Optional[float]) -> Optional[int]:
+    """
+    Index of the first close in [start, end) that hits the stop loss or take profit.
+    """
+    window = closes[start:end]
+    hit = np.zeros(len(window), dtype=bool)
+    if stop_loss is not None:
+        hit |= window <= entry_price * (1 - stop_loss)
+    if take_profit is not None:
+        hit |= window >= entry_price * (1 + take_profit)
+    hits = np.flatnonzero(hit)
+    return start + int(hits[0]) if len(hits) else None
+
+
+def run_backtest(closes: np.ndarray, sentiment: Union[float, np.ndarray] = 0.0, market_volume: Optional[np.ndarray] = None,
+                 trade_volume: float = 0.01, params: Optional[Dict] = None, initial_cash: float = 10000.0,
+                 initial_btc: float = 0.0, rules: Optional[RuleSet] = None, cooldown: float = 0.0,
+                 candle_seconds: Optional[float] = None) -> Dict:
+    """
+    Replays TradingStrategy's rules (or another rule set) over a price history and
+    reports PnL, trades, drawdown and fees. Indicators, signals and the equity
+    curve are vectorized; only the candles that raise a signal go through the
+    last-trade-type state machine and the is_profitable_trade fee gate, which are
+    path dependent.
+
+    Like the live trade_cooldown, signals within `cooldown` of a fill are ignored.
+    The cooldown is in candles, or in seconds when `candle_seconds` gives the
+    candle spacing.
+    """
+    p = dict(DEFAULT_PARAMS, **(params or {}))
+    closes = ohlcv.closes_of(closes)
+    actions = generate_signals(closes, sentiment, p, rules)
+    fee_rate = p["transaction_fee_percentage"] / 100.0
+
+    candidates = np.flatnonzero(actions)
+    if market_volume is not None:
+        # _execute_buy skips buys while the 24h market volume is too low
+        market_volume = np.asarray(market_volume, dtype=np.float64)
+        low_volume = (market_volume > 0) & (market_volume < p["min_market_volume"])
+        candidates = candidates[~((actions[candidates] == BUY) & low_volume[candidates])]
+
+    stop_loss = p["stop_loss_percent"]
+    take_profit = p["take_profit_percent"]
+    check_exits = stop_loss is not None or take_profit is not None
+    cooldown_candles = cooldown / candle_seconds if candle_seconds else cooldown
+
+    trade_index = []
+    trade_side = []
+    trade_size = []
+    last_buy_price = None
+    # First candle not yet scanned for a stop loss / take profit exit
+    scan_from = None
+    last_sell_price = None
+    last_trade_type = None
+    # Signals on candles before this index fall in the cooldown of the last fill
+    cooldown_end = 0.0
+    for index, action, price in zip(candidates.tolist(), actions[candidates].tolist(), closes[candidates].tolist()):
+        if check_exits and last_trade_type == 'buy':
+            exit_index = _find_exit(closes, scan_from, index + 1, last_buy_price, stop_loss, take_profit)
+            scan_from = index + 1
+            if exit_index is not None:
+                trade_index.append(exit_index)
+                trade_side.append(-1.0)
+                trade_size.append(trade_volume)
+                last_sell_price = float(closes[exit_index])
+                last_trade_type = 'sell'
+                cooldown_end = exit_index + cooldown_candles
+
+        if index < cooldown_end:
+            continue
+        if action == BUY:
+            reference_price = last_sell_price
+        elif last_trade_type == 'sell':
+            continue
+        else:
+            reference_price = last_buy_price
+        # Same gate as is_profitable_trade(calculate_potential_profit_loss(...))
+        if reference_price and (price - reference_price) / reference_price * 100.0 <= p["transaction_fee_percentage"]:
+            continue
+
+        trade_index.append(index)
+        cooldown_end = index + cooldown_candles
+        if action == BUY:
+            trade_side.append(1.0)
+            trade_size.append(trade_volume)
+            last_buy_price = price
+            scan_from = index + 1
+            last_trade_type = 'buy'
+        else:
+            trade_side.append(-1.0)
+            trade_size.append(trade_volume / 2 if action == PARTIAL_SELL else trade_volume)
+            last_sell_price = price
+            last_trade_type = 'sell'
+
+    if check_exits and last_trade_type == 'buy':
+        exit_index = _find_exit(closes, scan_from, len(closes), last_buy_price, stop_loss, take_profit)
+        if exit_index is not None:
+            trade_index.append(exit_index)
+            trade_side.append(-1.0)
+            trade_size.append(trade_volume)
+
+    trade_index = np.asarray(trade_index, dtype=np.int64)
+    trade_side = np.asarray(trade_side)
+    trade_size = np.asarray(trade_size)
+    trade_price = closes[trade_index]
+    notional = trade_size * trade_price
+    fees = notional * fee_rate
+
+    # Build cash and BTC position curves from the trade list and mark to market
+    cash_delta = np.zeros(len(closes))
+    btc_delta = np.zeros(len(closes))
+    np.add.at(cash_delta, trade_index, -trade_side * notional - fees)
+    np.add.at(btc_delta, trade_index, trade_side * trade_size)
+    equity = initial_cash + np.cumsum(cash_delta) + (initial_btc + np.cumsum(btc_delta)) * closes
+
+    initial_equity = initial_cash + initial_btc * closes[0] if len(closes) else initial_cash
+    peak = np.maximum.accumulate(equity) if len(equity) else equity
+    drawdown = peak - equity
+    max_drawdown_index = int(np.argmax(drawdown)) if len(drawdown) else 0
+    max_drawdown = float(drawdown[max_drawdown_index]) if len(drawdown) else 0.0
+
+    return {
+        "pnl": float(equity[-1] - initial_equity) if len(equity) else 0.0,
+        "return_pct": float((equity[-1] - initial_equity) / initial_equity * 100.0) if len(equity) and initial_equity else 0.0,
+        "trades": int(len(trade_index)),
+        "buys": int(np.sum(trade_side > 0)),
+        "sells": int(np.sum(trade_side < 0)),
+        "fees": float(fees.sum()),
+        "max_drawdown": max_drawdown,
+        "max_drawdown_pct": float(max_drawdown / peak[max_drawdown_index] * 100.0) if max_drawdown else 0.0,
+        "equity": equity,
+        "trade_index": trade_index,
+        "trade_side": trade_side,
+        "trade_size": trade_size,
+        "trade_price": trade_price,
+    }
+
+
+if __name__ == "__main__":
+    # Usage: python backtest.py [pair] [interval] [sentiment]
+    from candle_store import CandleStore
+    from config import CANDLE_CACHE_DIR, GLOBAL_TRADE_COOLDOWN
+
+    pair = sys.argv[1] if len(sys.argv) > 1 else "XBTUSDT"
+    interval = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+    sentiment = float(sys.argv[3]) if len(sys.argv) > 3 else 0.0
+    store = CandleStore(CANDLE_CACHE_DIR, pair, interval)
+    result = run_backtest(store.column("close"), sentiment=sentiment, cooldown=GLOBAL_TRADE_COOLDOWN,
+                          candle_seconds=interval * 60)
+    logger.info("Backtest %s/%s over %s candles: PnL %.2f (%.2f%%), trades %s (%s buys, %s sells), fees %.2f, "
+                "max drawdown %.2f (%.2f%%)", pair, interval, len(store), result['pnl'], result['return_pct'],
+                result['trades'], result['buys'], result['sells'], result['fees'], result['max_drawdown'],
+                result['max_drawdown_pct'])
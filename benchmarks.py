@@ -0,0 +1,318 @@
+import os
+import socket
+import tempfile
+
+# Benchmarks run against the local exchange simulator with throwaway caches and logs,
+# so they need no credentials and never touch the bot's own state files
+_workdir = tempfile.mkdtemp(prefix="bot-benchmarks-")
+
+
+def _free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+_rest_port = _free_port()
+for _name, _value in {
+    "SIMULATION": "1",
+    "API_DOMAIN": f"http://127.0.0.1:{_rest_port}",
+    "CANDLE_CACHE_DIR": "",
+    "DECISION_CACHE_FILE": os.path.join(_workdir, "decision_cache.json"),
+    "SENTIMENT_CACHE_FILE": os.path.join(_workdir, "sentiment_cache.sqlite3"),
+    "LOG_FILE": os.path.join(_workdir, "benchmarks.log"),
+    "KRAKEN_NONCE_FILE": os.path.join(_workdir, "kraken_nonce.txt"),
+    "STATE_SNAPSHOT_FILE": os.path.join(_workdir, "state_snapshot.bin"),
+    # Messages are still formatted at WARNING, but the terminal is not flooded
+    "LOG_LEVEL": "WARNING",
+}.items():
+    os.environ.setdefault(_name, _value)
+
+import argparse
+import itertools
+import json
+import platform
+import statistics
+import sys
+import time
+import timeit
+from datetime import datetime
+from typing import Optional, Dict, List, Callable
+import numpy as np
+from logger_config import logger
+from version import __version__
+
+# Price history sizes the indicator benchmarks run at
+HISTORY_SIZES = (100, 1000, 10000)
+
+# name -> factory returning the zero-argument callable to time
+BENCHMARKS: Dict[str, Callable[[], Callable[[], object]]] = {}
+
+
+def benchmark(name: str):
+    """
+    Registers a benchmark. The decorated function does the setup and returns the
+    callable that is timed, so setup cost never counts.
+    """
+    def register(factory):
+        BENCHMARKS[name] = factory
+        return factory
+    return register
+
+
+def _prices(size: int) -> List[float]:
+    return (60000 + np.cumsum(np.random.default_rng(size).normal(0, 50, size))).tolist()
+
+
+def _articles(count: int = 10) -> List[Dict]:
+    return [{"title": f"Bitcoin headline {index}", "description": "Markets moved on the news. " * (index + 1),
+             "url": f"https://example.com/{index}"} for index in range(count)]
+
+
+def _vader_available() -> bool:
+    try:
+        import nltk
+        nltk.data.find('sentiment/vader_lexicon.zip')
+        return True
+    except LookupError:
+        return False
+
+
+_exchange = None
+
+
+def _simulated_exchange():
+    # One simulator serves every network benchmark; its clock is stopped so the
+    # market does not move while a benchmark runs
+    global _exchange
+    if _exchange is None:
+        from exchange_simulator import SimulatedExchange
+        _exchange = SimulatedExchange(seed=0)
+        _exchange.start(port=_rest_port, ws_port=None, tick_interval=3600)
+    return _exchange
+
+
+def _register_indicators(size: int):
+    @benchmark(f"calculate_moving_average[{size}]")
+    def _():
+        from indicators import calculate_moving_average
+        prices = _prices(size)
+        return lambda: calculate_moving_average(prices)
+
+    @benchmark(f"calculate_rsi[{size}]")
+    def _():
+        from indicators import calculate_rsi
+        prices = _prices(size)
+        return lambda: calculate_rsi(prices)
+
+    @benchmark(f"calculate_macd[{size}]")
+    def _():
+        from indicators import calculate_macd
+        prices = _prices(size)
+        return lambda: calculate_macd(prices)
+
+    @benchmark(f"StreamingIndicators.warm_up[{size}]")
+    def _():
+        from indicators import StreamingIndicators
+        prices = _prices(size)
+        indicators = StreamingIndicators(capacity=max(size, 1000))
+        return lambda: indicators.warm_up(prices)
+
+
+for _size in HISTORY_SIZES:
+    _register_indicators(_size)
+
+
+@benchmark("StreamingIndicators.update")
+def _():
+    from indicators import StreamingIndicators
+    indicators = StreamingIndicators()
+    indicators.warm_up(_prices(1000))
+    price = itertools.cycle(_prices(10000))
+    return lambda: indicators.update(next(price))
+
+
+@benchmark("_sign_request")
+def _():
+    from api_kraken import get_kraken_api
+    client = get_kraken_api()
+    postdata = "nonce=1700000000000&ordertype=limit&pair=XBTUSDT&price=60000.0&type=buy&volume=0.01"
+    return lambda: client._sign_request("/0/private/AddOrder", "1700000000000", postdata)
+
+
+@benchmark("_make_request[public, uncached]")
+def _():
+    from api_kraken import KrakenAPI
+    from config import API_KEY, API_SECRET, API_DOMAIN
+    from rate_limiter import KrakenRateLimiter, RequestCoalescer
+    from response_cache import ResponseCache
+    _simulated_exchange()
+    # No cache, coalescing or rate limit, so every call is a full round trip
+    client = KrakenAPI(API_KEY, API_SECRET, API_DOMAIN, rate_limiter=KrakenRateLimiter(1e9, 1e9, 1e9, 1e9),
+                       coalescer=RequestCoalescer(window=0), cache=ResponseCache(max_entries=0))
+    return lambda: client._make_request("Ticker", "/0/public/", {"pair": "XBTUSDT"})
+
+
+@benchmark("_make_request[public, cached]")
+def _():
+    from api_kraken import KrakenAPI
+    from config import API_KEY, API_SECRET, API_DOMAIN
+    from response_cache import ResponseCache
+    _simulated_exchange()
+    client = KrakenAPI(API_KEY, API_SECRET, API_DOMAIN, cache=ResponseCache(ttls={"Ticker": 3600}))
+    return lambda: client._make_request("Ticker", "/0/public/", {"pair": "XBTUSDT"})
+
+
+@benchmark("_make_request[private]")
+def _():
+    from api_kraken import KrakenAPI
+    from config import API_KEY, API_SECRET, API_DOMAIN
+    from rate_limiter import KrakenRateLimiter
+    _simulated_exchange()
+    client = KrakenAPI(API_KEY, API_SECRET, API_DOMAIN, rate_limiter=KrakenRateLimiter(1e9, 1e9, 1e9, 1e9))
+    return lambda: client._make_request("Balance", "/0/private/", is_private=True)
+
+
+@benchmark("get_optimal_price[rest dict]")
+def _():
+    from api_kraken import get_kraken_api
+    client = get_kraken_api()
+    order_book = _simulated_exchange().engines["XBTUSDT"].market_book.to_rest_dict()
+    return lambda: client.get_optimal_price(order_book, "buy", volume=0.3)
+
+
+@benchmark("get_optimal_price[OrderBook]")
+def _():
+    from api_kraken import get_kraken_api
+    client = get_kraken_api()
+    book = _simulated_exchange().engines["XBTUSDT"].market_book.copy()
+    return lambda: client.get_optimal_price(book, "buy", volume=0.3)
+
+
+@benchmark("calculate_sentiment[cached]")
+def _():
+    if not _vader_available():
+        return None
+    from indicators import calculate_sentiment
+    articles = _articles()
+    calculate_sentiment(articles)
+    return lambda: calculate_sentiment(articles)
+
+
+@benchmark("calculate_sentiment[vader]")
+def _():
+    if not _vader_available():
+        return None
+    from indicators import get_sentiment_analyzer
+    from sentiment_cache import article_content
+    analyzer = get_sentiment_analyzer()
+    contents = [article_content(article) for article in _articles()]
+    return lambda: [analyzer.polarity_scores(content)['compound'] for content in contents]
+
+
+@benchmark("_determine_trade_action")
+def _():
+    from trading_strategy import TradingStrategy
+    prices = _prices(1000)
+    strategy = TradingStrategy(prices)
+    # Trade execution is stubbed out, so only the decision logic is timed
+    strategy._execute_buy = strategy._execute_sell = strategy._execute_partial_sell = lambda price: None
+    macd, signal = strategy.indicators.macd
+    rsi = strategy.indicators.rsi
+    return lambda: strategy._determine_trade_action(prices[-1], macd, signal, rsi)
+
+
+@benchmark("execute_strategy")
+def _():
+    if not _vader_available():
+        return None
+    import indicators
+    from trading_strategy import TradingStrategy
+    _simulated_exchange()
+    # A fixed news set stands in for NewsAPI so the tick never waits on the internet
+    indicators.news_cache["articles"] = _articles()
+    indicators.news_cache["timestamp"] = datetime.now()
+    strategy = TradingStrategy(_prices(1000), trade_cooldown=0)
+    return strategy.execute_strategy
+
+
+def measure(func: Callable[[], object], min_time: float = 0.2, repeat: int = 5) -> Dict:
+    """
+    Times `func` like timeit: picks a loop count that runs for at least `min_time`,
+    then reports per-call statistics over `repeat` rounds of that many loops.
+    """
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    rounds = [total / number for total in timer.repeat(repeat=repeat, number=number)]
+    return {"median": statistics.median(rounds), "min": min(rounds), "loops": number, "repeat": repeat}
+
+
+def run_benchmarks(selected: Optional[str] = None, min_time: float = 0.2, repeat: int = 5) -> Dict[str, Dict]:
+    results = {}
+    try:
+        for name, factory in BENCHMARKS.items():
+            if selected and selected not in name:
+                continue
+            func = factory()
+            if func is None:
+                logger.warning("Skipping %s: its dependencies are not available offline.", name)
+                continue
+            results[name] = measure(func, min_time, repeat)
+            print(f"{name:<42} {results[name]['median'] * 1e6:12.2f} us/call")
+    finally:
+        if _exchange is not None:
+            _exchange.stop()
+    return results
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float) -> List[str]:
+    """
+    Returns the names of benchmarks whose median is more than `threshold` (a fraction)
+    slower than in the baseline. Benchmarks missing from either side are ignored.
+    """
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        change = result["median"] / reference["median"] - 1
+        marker = "REGRESSION" if change > threshold else ""
+        print(f"{name:<42} {reference['median'] * 1e6:12.2f} -> {result['median'] * 1e6:12.2f} us "
+              f"({change * 100:+6.1f}%) {marker}")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the bot's hot paths and compare against a baseline.")
+    parser.add_argument("--baseline", default="benchmark_baseline.json", help="baseline results file")
+    parser.add_argument("--save-baseline", action="store_true", help="write this run's results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=float(os.getenv("BENCHMARK_THRESHOLD", "0.25")),
+                        help="allowed slowdown as a fraction of the baseline before failing (default 0.25)")
+    parser.add_argument("--filter", help="only run benchmarks whose name contains this text")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds each timing round should last")
+    parser.add_argument("--repeat", type=int, default=5, help="timing rounds per benchmark (median is compared)")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.filter, args.min_time, args.repeat)
+    if args.save_baseline:
+        with open(args.baseline, "w") as baseline_file:
+            json.dump({
+                "meta": {"version": __version__, "python": sys.version.split()[0], "machine": platform.machine(),
+                         "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")},
+                "results": results,
+            }, baseline_file, indent=2)
+        print(f"Saved {len(results)} results to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) regressed by more than {args.threshold * 100:.0f}%: "
+                  f"{', '.join(regressions)}")
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold * 100:.0f}%.")
+    else:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
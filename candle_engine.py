@@ -0,0 +1,342 @@
+import sys
+import threading
+from typing import Optional, List, Dict, Tuple
+import numpy as np
+from indicators import sma_series, rsi_series, macd_series
+from ohlcv import OHLCV_DTYPE, from_kraken_rows
+from logger_config import logger
+
+# Timeframes derived from the base stream, in minutes (Kraken's OHLC intervals up to a day)
+TIMEFRAMES = (1, 5, 15, 60, 240, 1440)
+
+# One row per candle, laid out like Kraken's OHLC rows
+CANDLE_DTYPE = OHLCV_DTYPE
+
+BASE_INTERVAL = 60  # seconds per base candle
+
+
+def _empty(capacity: int) -> np.ndarray:
+    return np.zeros(capacity, dtype=CANDLE_DTYPE)
+
+
+def resample(base: np.ndarray, seconds: int) -> np.ndarray:
+    """
+    Aggregates time-sorted candles into `seconds`-long buckets aligned to the epoch,
+    the way Kraken aligns its own intervals. Open and close come from the first and
+    last candle of each bucket, high, low, volume and trade count are reduced over
+    it, and vwap is volume-weighted. A bucket is only as complete as the candles in it.
+    """
+    if not len(base):
+        return _empty(0)
+    buckets = base["time"] // seconds * seconds
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(buckets)) + 1))
+    ends = np.concatenate((starts[1:], [len(base)])) - 1
+    result = _empty(len(starts))
+    result["time"] = buckets[starts]
+    result["open"] = base["open"][starts]
+    result["close"] = base["close"][ends]
+    result["high"] = np.maximum.reduceat(base["high"], starts)
+    result["low"] = np.minimum.reduceat(base["low"], starts)
+    result["volume"] = np.add.reduceat(base["volume"], starts)
+    result["count"] = np.add.reduceat(base["count"], starts)
+    traded = np.add.reduceat(base["vwap"] * base["volume"], starts)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result["vwap"] = np.where(result["volume"] > 0, traded / result["volume"], result["close"])
+    return result
+
+
+def _combine(earlier: np.ndarray, later: np.ndarray) -> np.ndarray:
+    # Merges two consecutive stretches of the same bucket into one bar
+    bar = earlier.copy()
+    bar["high"] = max(earlier["high"], later["high"])
+    bar["low"] = min(earlier["low"], later["low"])
+    bar["close"] = later["close"]
+    bar["volume"] = earlier["volume"] + later["volume"]
+    bar["count"] = earlier["count"] + later["count"]
+    if bar["volume"] > 0:
+        bar["vwap"] = (earlier["vwap"] * earlier["volume"] + later["vwap"] * later["volume"]) / bar["volume"]
+    return bar
+
+
+class _CandleBuffer:
+    """
+    Growable array of candles that keeps at most `max_rows`, trimming the oldest
+    in amortized batches so appends stay O(1).
+    """
+    def __init__(self, max_rows: int):
+        self.max_rows = max_rows
+        self._data = _empty(max(16, min(max_rows, 1024)))
+        self.length = 0
+
+    def __len__(self) -> int:
+        return self.length
+
+    @property
+    def rows(self) -> np.ndarray:
+        return self._data[:self.length]
+
+    def append(self, row: np.ndarray):
+        if self.length == len(self._data):
+            if self.length >= 2 * self.max_rows:
+                # Drop the oldest rows beyond the limit in one move
+                self._data[:self.max_rows] = self._data[self.length - self.max_rows:self.length]
+                self.length = self.max_rows
+            else:
+                grown = _empty(len(self._data) * 2)
+                grown[:self.length] = self._data[:self.length]
+                self._data = grown
+        self._data[self.length] = row
+        self.length += 1
+
+    def set_last(self, row: np.ndarray):
+        self._data[self.length - 1] = row
+
+    def replace(self, rows: np.ndarray):
+        rows = rows[-self.max_rows:]
+        if len(rows) > len(self._data):
+            self._data = _empty(len(rows) * 2)
+        self._data[:len(rows)] = rows
+        self.length = len(rows)
+
+
+class CandleEngine:
+    """
+    Multi-timeframe candles for one pair, all derived from a single stream of
+    1-minute candles (or raw trades folded into them). Every higher timeframe is
+    updated incrementally as base candles arrive: only its current bar is rebuilt,
+    from the base candles in that bar's bucket, so all timeframes stay consistent
+    and the exchange is asked for one interval instead of one per timeframe.
+
+    The last bar of each timeframe is normally still forming. Queries include it by
+    default; pass include_partial=False for closed bars only. Higher timeframes hold
+    as much history as the base covers, plus whatever `backfill` seeded at startup.
+    """
+    def __init__(self, pair: str = "XBTUSDT", timeframes: Tuple[int, ...] = TIMEFRAMES, history: int = 1000,
+                 base_history: Optional[int] = None):
+        self.pair = pair
+        self.timeframes = tuple(sorted(set(timeframes) | {1}))
+        # The base must cover at least the longest bucket so its current bar can be rebuilt
+        self.base = _CandleBuffer(max(base_history or 0, history, 2 * max(self.timeframes)))
+        self.frames: Dict[int, _CandleBuffer] = {tf: _CandleBuffer(history) for tf in self.timeframes if tf != 1}
+        self.last = None  # Kraken's `since` cursor for the next incremental base fetch
+        # Bumped whenever a timeframe changes, so indicator results can be reused until then
+        self._versions = {tf: 0 for tf in self.timeframes}
+        self._indicator_cache: Dict[Tuple, Tuple[int, Dict]] = {}
+        # timeframe -> (backfilled bar the base starts inside, base time it was fetched at)
+        self._seeds: Dict[int, Tuple[np.ndarray, int]] = {}
+        self._lock = threading.RLock()
+
+    # --- Input ---
+
+    def add_candles(self, rows: List[List], last: Optional[int] = None) -> int:
+        """
+        Feeds raw Kraken 1-minute OHLC rows [time, open, high, low, close, vwap, volume, count].
+        A row with the same time as the newest stored candle replaces it, since
+        Kraken's newest candle is still forming; older rows are ignored.
+        Returns the number of new base candles.
+        """
+        if not rows:
+            if last is not None:
+                self.last = last
+            return 0
+        candles = from_kraken_rows(rows)
+        with self._lock:
+            added = self._add(candles)
+            if last is not None:
+                self.last = last
+        return added
+
+    def add_trade(self, price: float, volume: float, timestamp: float):
+        """
+        Folds one trade into the forming 1-minute candle, opening a new one when the
+        trade falls in a later minute. Trades older than the current candle are ignored.
+        """
+        minute = int(timestamp) // BASE_INTERVAL * BASE_INTERVAL
+        with self._lock:
+            base = self.base.rows
+            if len(base) and base["time"][-1] > minute:
+                return
+            if len(base) and base["time"][-1] == minute:
+                candle = base[-1].copy()
+                traded = candle["vwap"] * candle["volume"] + price * volume
+                candle["high"] = max(candle["high"], price)
+                candle["low"] = min(candle["low"], price)
+                candle["close"] = price
+                candle["volume"] += volume
+                candle["count"] += 1
+                candle["vwap"] = traded / candle["volume"] if candle["volume"] > 0 else price
+            else:
+                candle = np.array((minute, price, price, price, price, price, volume, 1), dtype=CANDLE_DTYPE)
+            self._add(candle.reshape(1))
+
+    def _add(self, candles: np.ndarray) -> int:
+        # Caller holds the lock. Candles are sorted; each one is applied in turn.
+        if len(candles) > 64:
+            return self._add_bulk(candles)
+        added = 0
+        for candle in candles:
+            base = self.base.rows
+            if len(base) and candle["time"] < base["time"][-1]:
+                continue
+            if len(base) and candle["time"] == base["time"][-1]:
+                self.base.set_last(candle)
+            else:
+                self.base.append(candle)
+                added += 1
+            self._versions[1] += 1
+            for tf, frame in self.frames.items():
+                self._update_frame(tf, frame, int(candle["time"]))
+        return added
+
+    def _add_bulk(self, candles: np.ndarray) -> int:
+        # Large backfills are merged and resampled in one vectorized pass per timeframe
+        base = self.base.rows
+        if len(base):
+            candles = candles[candles["time"] >= base["time"][-1]]
+            if not len(candles):
+                return 0
+            keep = base[base["time"] < candles["time"][0]]
+            added = len(candles) - int(candles["time"][0] == base["time"][-1])
+            merged = np.concatenate((keep, candles))
+        else:
+            merged, added = candles, len(candles)
+        self.base.replace(merged)
+        self._versions[1] += 1
+        for tf, frame in self.frames.items():
+            self._rebuild_frame(tf, frame)
+        return added
+
+    def _bar(self, tf: int, bucket: int) -> Optional[np.ndarray]:
+        # The bar for one bucket, built from the base candles in it. A bucket that began
+        # before the base history can only be built on top of a backfilled bar for it.
+        seconds = tf * 60
+        base = self.base.rows
+        start, end = np.searchsorted(base["time"], [bucket, bucket + seconds])
+        rows = base[start:end]
+        if start == 0 and base["time"][0] > bucket:
+            seed = self._seeds.get(tf)
+            if seed is None or seed[0]["time"] != bucket:
+                return None
+            seed_bar, cutoff = seed
+            newer = rows[rows["time"] > cutoff]
+            return _combine(seed_bar, resample(newer, seconds)[0]) if len(newer) else seed_bar
+        return resample(rows, seconds)[0] if len(rows) else None
+
+    def _update_frame(self, tf: int, frame: _CandleBuffer, time: int):
+        # Rebuilds only the bar containing `time`
+        bucket = time // (tf * 60) * (tf * 60)
+        bar = self._bar(tf, bucket)
+        if bar is None:
+            return
+        if len(frame) and frame.rows["time"][-1] == bucket:
+            frame.set_last(bar)
+        elif not len(frame) or frame.rows["time"][-1] < bucket:
+            frame.append(bar)
+        else:
+            return
+        self._versions[tf] += 1
+
+    def _rebuild_frame(self, tf: int, frame: _CandleBuffer):
+        base = self.base.rows
+        if not len(base):
+            return
+        seconds = tf * 60
+        derived = resample(base, seconds)
+        first_bucket = int(base["time"][0]) // seconds * seconds
+        if base["time"][0] % seconds:
+            # The base starts mid-bucket, so that bar needs a backfilled one to be right
+            bar = self._bar(tf, first_bucket)
+            derived = derived[1:] if bar is None else np.concatenate((bar.reshape(1), derived[1:]))
+        # Bars from before the base (backfilled, or derived from candles since trimmed) stay
+        older = frame.rows
+        frame.replace(np.concatenate((older[older["time"] < first_bucket], derived)))
+        self._versions[tf] += 1
+
+    def sync(self, kraken_api) -> int:
+        """
+        Fetches 1-minute candles newer than the cursor with a single OHLC call and
+        updates every timeframe from them.
+        """
+        rows, last = kraken_api.get_ohlc(pair=self.pair, interval=1, since=self.last)
+        if rows is None:
+            return 0
+        return self.add_candles(rows, last)
+
+    def backfill(self, kraken_api, min_bars: int = 100):
+        """
+        One-off seeding for timeframes the base cannot yet cover with `min_bars` bars:
+        fetches that interval once and keeps its bars from before the base history.
+        Afterwards only the base stream is fetched. Call it after the first sync.
+        """
+        if not len(self.base):
+            logger.warning("Not backfilling %s: sync the base candles first.", self.pair)
+            return
+        for tf, frame in self.frames.items():
+            if len(frame) >= min_bars:
+                continue
+            rows, _ = kraken_api.get_ohlc(pair=self.pair, interval=tf)
+            if not rows:
+                continue
+            seed = from_kraken_rows(rows)
+            with self._lock:
+                base = self.base.rows
+                seed = seed[seed["time"] <= base["time"][0]]
+                if len(seed) and seed["time"][-1] < base["time"][0]:
+                    # The bar the base starts in is extended with base candles newer than
+                    # this fetch. The forming minute at the cutoff keeps its fetched state.
+                    self._seeds[tf] = (seed[-1].copy(), int(base["time"][-1]))
+                frame.replace(seed)
+                self._rebuild_frame(tf, frame)
+            logger.info("Backfilled %s %sm with %s bars; %s bars in total.", self.pair, tf, len(seed), len(frame))
+
+    # --- Queries ---
+
+    def candles(self, timeframe: int, include_partial: bool = True) -> np.ndarray:
+        """
+        Returns a copy of the bars of one timeframe, oldest first.
+        """
+        with self._lock:
+            rows = self.base.rows if timeframe == 1 else self.frames[timeframe].rows
+            if not include_partial:
+                rows = rows[:-1]
+            return rows.copy()
+
+    def closes(self, timeframe: int, include_partial: bool = True) -> np.ndarray:
+        return self.candles(timeframe, include_partial)["close"]
+
+    def indicators(self, timeframe: int, include_partial: bool = True, ma_window: int = 7, rsi_window: int = 14,
+                   short_window: int = 12, long_window: int = 26, signal_window: int = 7) -> Dict[str, Optional[float]]:
+        """
+        Latest moving average, RSI, MACD and signal for one timeframe, computed from
+        its closes and reused until that timeframe changes. Values are None until the
+        timeframe has enough bars.
+        """
+        key = (timeframe, include_partial, ma_window, rsi_window, short_window, long_window, signal_window)
+        with self._lock:
+            version = self._versions[timeframe]
+            cached = self._indicator_cache.get(key)
+            if cached and cached[0] == version:
+                return cached[1]
+            closes = self.closes(timeframe, include_partial)
+        values = {"moving_average": None, "rsi": None, "macd": None, "signal": None}
+        if len(closes):
+            macd, signal = macd_series(closes, short_window, long_window, signal_window)
+            latest = {"moving_average": sma_series(closes, ma_window)[-1], "rsi": rsi_series(closes, rsi_window)[-1],
+                      "macd": macd[-1], "signal": signal[-1]}
+            values = {name: None if np.isnan(value) else float(value) for name, value in latest.items()}
+        with self._lock:
+            self._indicator_cache[key] = (version, values)
+        return values
+
+
+if __name__ == "__main__":
+    # Usage: python candle_engine.py [pair]
+    from api_kraken import get_kraken_api
+    engine = CandleEngine(sys.argv[1] if len(sys.argv) > 1 else "XBTUSDT")
+    kraken_api = get_kraken_api()
+    engine.sync(kraken_api)
+    engine.backfill(kraken_api)
+    for timeframe in engine.timeframes:
+        bars = engine.candles(timeframe)
+        logger.info("%s %4sm: %s bars, last close %s, %s", engine.pair, timeframe, len(bars),
+                    bars['close'][-1] if len(bars) else None, engine.indicators(timeframe))
@@ -0,0 +1,159 @@
+import json
+import os
+import threading
+from typing import Optional, List, Dict
+import numpy as np
+from logger_config import logger
+
+# Kraken OHLC rows are [time, open, high, low, close, vwap, volume, count]
+OHLC_COLUMNS = {
+    "time": np.int64,
+    "open": np.float64,
+    "high": np.float64,
+    "low": np.float64,
+    "close": np.float64,
+    "vwap": np.float64,
+    "volume": np.float64,
+    "count": np.int64,
+}
+
+
+class CandleStore:
+    """
+    On-disk columnar OHLC store for one pair and interval. Each column lives in its
+    own flat binary file that is memory-mapped for reading, so callers get zero-copy
+    numpy views. A JSON metadata file holds the row count and Kraken's `last` cursor,
+    which lets each sync ask only for candles newer than what is already stored.
+
+    Column files are never shrunk or rewritten in place: new rows are appended, and
+    when stored rows must be replaced the column is copied to a new file that is
+    renamed over the old one, so views handed out earlier stay valid. Kraken only
+    serves the latest 720 candles, so after a long enough pause the history has a
+    hole; the row after each one is recorded in `breaks`.
+    """
+    def __init__(self, root: str, pair: str = "XBTUSDT", interval: int = 60):
+        self.pair = pair
+        self.interval = interval
+        self.directory = os.path.join(root, f"{pair}_{interval}")
+        os.makedirs(self.directory, exist_ok=True)
+        self._meta_path = os.path.join(self.directory, "meta.json")
+        self._views = {}
+        # Serializes syncs and appends, e.g. from several AsyncKrakenAPI workers
+        self._lock = threading.RLock()
+        self.length = 0
+        self.last = None
+        self.breaks: List[int] = []
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path) as meta_file:
+                meta = json.load(meta_file)
+            self.length = meta["length"]
+            self.last = meta["last"]
+            self.breaks = meta.get("breaks", [])
+
+    def __len__(self) -> int:
+        return self.length
+
+    def _column_path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.bin")
+
+    @property
+    def contiguous_start(self) -> int:
+        """
+        Index of the first row of the newest stretch of candles without a hole.
+        """
+        return self.breaks[-1] if self.breaks else 0
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        Returns a read-only, memory-mapped view of one column.
+        """
+        if name not in OHLC_COLUMNS:
+            raise KeyError(f"Unknown OHLC column: {name}")
+        with self._lock:
+            if self.length == 0:
+                return np.empty(0, dtype=OHLC_COLUMNS[name])
+            view = self._views.get(name)
+            if view is None:
+                view = np.memmap(self._column_path(name), dtype=OHLC_COLUMNS[name], mode="r", shape=(self.length,))
+                self._views[name] = view
+            return view
+
+    def append(self, rows: List[List], last: Optional[int]) -> int:
+        """
+        Appends raw Kraken OHLC rows. Stored candles at or after the first new row's
+        time are replaced, since Kraken's most recent candle is still forming.
+        Returns the number of rows added.
+        """
+        with self._lock:
+            previous_length = self.length
+            if rows:
+                new_columns = {name: np.array([row[i] for row in rows], dtype=dtype)
+                               for i, (name, dtype) in enumerate(OHLC_COLUMNS.items())}
+                times = self.column("time")
+                first_time = int(new_columns["time"][0])
+                keep = int(np.searchsorted(times, first_time)) if self.length else 0
+                self.breaks = [index for index in self.breaks if index < keep]
+                if keep and first_time > int(times[keep - 1]) + self.interval * 60:
+                    logger.warning("Candle store %s/%s: no candles between %s and %s; Kraken no longer "
+                                   "serves them, so the history has a hole at row %s.",
+                                   self.pair, self.interval, int(times[keep - 1]), first_time, keep)
+                    self.breaks.append(keep)
+                self._views = {}
+                for name, values in new_columns.items():
+                    self._write_column(name, keep, values)
+                self.length = keep + len(rows)
+            if last is not None:
+                self.last = last
+            self._write_meta()
+            return self.length - previous_length
+
+    def _write_column(self, name: str, keep: int, values: np.ndarray):
+        # Callers may still hold maps of the current file, so it only ever grows;
+        # replacing rows goes through a copy that is renamed into place
+        path = self._column_path(name)
+        dtype = np.dtype(OHLC_COLUMNS[name])
+        if keep == self.length and os.path.exists(path) and os.path.getsize(path) == keep * dtype.itemsize:
+            with open(path, "ab") as column_file:
+                column_file.write(values.tobytes())
+            return
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as column_file:
+            if keep:
+                column_file.write(np.fromfile(path, dtype=dtype, count=keep).tobytes())
+            column_file.write(values.tobytes())
+        os.replace(tmp_path, path)
+
+    def _write_meta(self):
+        # Written after the columns and swapped in atomically, so the row count
+        # never points past data that reached disk
+        tmp_path = self._meta_path + ".tmp"
+        with open(tmp_path, "w") as meta_file:
+            json.dump({"pair": self.pair, "interval": self.interval, "length": self.length, "last": self.last,
+                       "breaks": self.breaks}, meta_file)
+        os.replace(tmp_path, self._meta_path)
+
+    def sync(self, kraken_api) -> int:
+        """
+        Fetches candles newer than the stored cursor and appends them. Concurrent syncs
+        of the same store run one after another.
+        """
+        with self._lock:
+            rows, last = kraken_api.get_ohlc(pair=self.pair, interval=self.interval, since=self.last)
+            if rows is None:
+                return 0
+            added = self.append(rows, last)
+        logger.info("Candle store %s/%s: %+d rows, %s stored.", self.pair, self.interval, added, self.length)
+        return added
+
+    def to_dict(self) -> Dict[str, np.ndarray]:
+        return {name: self.column(name) for name in OHLC_COLUMNS}
+
+    def records(self, limit: Optional[int] = None) -> np.ndarray:
+        """
+        Copies the stored candles (the latest `limit` of them) into one OHLCV record array.
+        """
+        from ohlcv import from_columns  # ohlcv imports OHLC_COLUMNS from here
+        columns = self.to_dict()
+        if limit is not None:
+            columns = {name: column[-limit:] for name, column in columns.items()}
+        return from_columns(columns)
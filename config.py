@@ -4,6 +4,30 @@ from dotenv import load_dotenv
 # Load environment variables from the .env file
 load_dotenv()
 
+# Simulation mode runs against the local exchange simulator (exchange_simulator.py)
+# and OpenAI stand-in (openai_stub.py), so no real credentials are needed
+SIMULATION = os.getenv("SIMULATION", "false").lower() in ("1", "true", "yes")
+SIMULATION_DEFAULTS = {
+    "API_KEY": "simulator",
+    "API_SECRET": "c2ltdWxhdG9yLXNlY3JldA==",  # base64 of "simulator-secret"
+    "API_DOMAIN": "http://127.0.0.1:8901",
+    "KRAKEN_WS_URL": "ws://127.0.0.1:8902",
+    "KRAKEN_WS_AUTH_URL": "ws://127.0.0.1:8902",
+    "OPENAI_API_KEY": "simulator",
+    "OPENAI_BASE_URL": "http://127.0.0.1:8900/v1",
+    "ALLOC_HODL": "0.5",
+    "ALLOC_YIELD": "0.2",
+    "ALLOC_TRADING": "0.3",
+    "TOTAL_BTC": "1",
+    "MIN_TRADE_VOLUME": "0.0001",
+    "GLOBAL_TRADE_COOLDOWN": "300",
+    "SLEEP_DURATION": "900",
+}
+if SIMULATION:
+    # Explicit settings still win over the defaults
+    for name, value in SIMULATION_DEFAULTS.items():
+        os.environ.setdefault(name, value)
+
 
 # Get OpenAI API key from environment variables
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
@@ -36,4 +60,75 @@ MIN_TRADE_VOLUME = float(os.getenv("MIN_TRADE_VOLUME"))
 # Cooldown period in seconds between trades
 GLOBAL_TRADE_COOLDOWN = int(os.getenv("GLOBAL_TRADE_COOLDOWN"))  # 5 minutes
 
-SLEEP_DURATION = int(os.getenv("SLEEP_DURATION"))  # 15 minutes
\ No newline at end of file
+SLEEP_DURATION = int(os.getenv("SLEEP_DURATION"))  # 15 minutes
+
+# HTTP connection pooling for the Kraken REST client
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "10"))
+
+# Kraken WebSocket market data
+KRAKEN_WS_URL = os.getenv("KRAKEN_WS_URL", "wss://ws.kraken.com")
+
+# Local OHLC candle cache; set to an empty string to disable
+CANDLE_CACHE_DIR = os.getenv("CANDLE_CACHE_DIR", "candle_cache")
+
+# Client-side model of Kraken's REST call counters (defaults match the Starter tier)
+KRAKEN_PUBLIC_COUNTER_MAX = float(os.getenv("KRAKEN_PUBLIC_COUNTER_MAX", "5"))
+KRAKEN_PUBLIC_DECAY_RATE = float(os.getenv("KRAKEN_PUBLIC_DECAY_RATE", "1"))
+KRAKEN_PRIVATE_COUNTER_MAX = float(os.getenv("KRAKEN_PRIVATE_COUNTER_MAX", "15"))
+KRAKEN_PRIVATE_DECAY_RATE = float(os.getenv("KRAKEN_PRIVATE_DECAY_RATE", "0.33"))
+
+# Identical public requests issued within this many seconds share one call
+REQUEST_COALESCE_WINDOW = float(os.getenv("REQUEST_COALESCE_WINDOW", "0.25"))
+
+# In-memory cache for public REST responses; 0 disables it
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "256"))
+
+# Persistent cache of LLM trading decisions
+DECISION_CACHE_FILE = os.getenv("DECISION_CACHE_FILE", "decision_cache.json")
+DECISION_CACHE_TTL = float(os.getenv("DECISION_CACHE_TTL", "1800"))
+DECISION_CACHE_MAX_ENTRIES = int(os.getenv("DECISION_CACHE_MAX_ENTRIES", "512"))
+
+# Streamed LLM decisions: act on the parsed action as soon as it arrives,
+# falling back to "hold" if it has not arrived within the deadline (seconds)
+LLM_STREAM_DECISIONS = os.getenv("LLM_STREAM_DECISIONS", "false").lower() in ("1", "true", "yes")
+LLM_DECISION_DEADLINE = float(os.getenv("LLM_DECISION_DEADLINE", "5"))
+
+# On-disk cache of per-article sentiment scores
+SENTIMENT_CACHE_FILE = os.getenv("SENTIMENT_CACHE_FILE", "sentiment_cache.sqlite3")
+SENTIMENT_CACHE_MAX_ENTRIES = int(os.getenv("SENTIMENT_CACHE_MAX_ENTRIES", "50000"))
+
+# Pairs scanned together by the multi-pair scanner, comma-separated
+SCAN_PAIRS = [pair.strip() for pair in os.getenv("SCAN_PAIRS", "XBTUSDT").split(",") if pair.strip()]
+
+# Cadences of the long-running runtime's periodic tasks, in seconds
+MARKET_DATA_INTERVAL = float(os.getenv("MARKET_DATA_INTERVAL", "5"))
+SENTIMENT_INTERVAL = float(os.getenv("SENTIMENT_INTERVAL", str(SLEEP_DURATION)))
+LLM_MIN_INTERVAL = float(os.getenv("LLM_MIN_INTERVAL", "60"))
+REBALANCE_INTERVAL = float(os.getenv("REBALANCE_INTERVAL", "3600"))
+
+# Kraken private WebSocket (order and fill updates)
+KRAKEN_WS_AUTH_URL = os.getenv("KRAKEN_WS_AUTH_URL", "wss://ws-auth.kraken.com")
+# Open limit orders further than this from the current optimal price are replaced
+ORDER_REPRICE_BPS = float(os.getenv("ORDER_REPRICE_BPS", "5"))
+
+# Per-stage latency and API metrics, served in Prometheus text format when enabled
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() in ("1", "true", "yes")
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
+
+# Kraken private-call nonces: high-water mark file, suffixed per API key (empty disables
+# persistence), and how many private calls may be in flight at once
+KRAKEN_NONCE_FILE = os.getenv("KRAKEN_NONCE_FILE", "kraken_nonce.txt")
+KRAKEN_PRIVATE_WORKERS = int(os.getenv("KRAKEN_PRIVATE_WORKERS", "4"))
+
+# Warm-restart snapshot of strategy, indicator and portfolio state (empty disables it),
+# rewritten every STATE_SNAPSHOT_INTERVAL seconds and on shutdown
+STATE_SNAPSHOT_FILE = os.getenv("STATE_SNAPSHOT_FILE", "state_snapshot.bin")
+STATE_SNAPSHOT_INTERVAL = float(os.getenv("STATE_SNAPSHOT_INTERVAL", "30"))
+
+# JSON rule file for trade decisions: one rule set, or {"live": ..., "shadow": {name: ...}}
+# to score candidate rule sets on every tick without trading them. Empty uses the
+# built-in sentiment ladder.
+RULES_FILE = os.getenv("RULES_FILE", "")
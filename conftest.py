@@ -0,0 +1,29 @@
+import os
+import socket
+import tempfile
+
+# Tests run in simulation mode with throwaway caches, logs and state files, so they
+# need no credentials and never touch the bot's own files. Set before any module
+# reads config.
+_workdir = tempfile.mkdtemp(prefix="bot-tests-")
+
+
+def _free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+os.environ.update({
+    "SIMULATION": "1",
+    # Nothing listens here unless a test starts the simulator on it
+    "API_DOMAIN": f"http://127.0.0.1:{_free_port()}",
+    "CANDLE_CACHE_DIR": "",
+    "DECISION_CACHE_FILE": os.path.join(_workdir, "decision_cache.json"),
+    "SENTIMENT_CACHE_FILE": os.path.join(_workdir, "sentiment_cache.sqlite3"),
+    "KRAKEN_NONCE_FILE": os.path.join(_workdir, "kraken_nonce.txt"),
+    "STATE_SNAPSHOT_FILE": "",
+    "RULES_FILE": "",
+    "LOG_FILE": os.path.join(_workdir, "tests.log"),
+    "LOG_LEVEL": "WARNING",
+})
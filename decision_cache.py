@@ -0,0 +1,160 @@
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any
+from config import DECISION_CACHE_FILE, DECISION_CACHE_TTL, DECISION_CACHE_MAX_ENTRIES
+from logger_config import logger
+
+# Per-field tolerance as (mode, step). "relative" steps are fractions of the value,
+# "absolute" steps are in the field's own units. Inputs that fall in the same bucket
+# share a cached decision, and moves smaller than one step are not a material change.
+DEFAULT_TOLERANCES = {
+    "latest_price": ("relative", 0.002),
+    "trend_pct": ("absolute", 0.25),
+    "sentiment": ("absolute", 0.05),
+    "moving_average": ("relative", 0.002),
+    "rsi": ("absolute", 2.0),
+    "macd": ("absolute", 10.0),
+    "signal_line": ("absolute", 10.0),
+}
+
+# Tolerance for each portfolio bucket, in BTC
+PORTFOLIO_TOLERANCE = 1e-4
+
+
+def _quantize(value: Optional[float], mode: str, step: float):
+    if value is None:
+        return None
+    if mode == "relative":
+        if value <= 0:
+            return round(value, 8)
+        return round(math.log(value) / math.log1p(step))
+    return round(value / step)
+
+
+def _portfolio_buckets(portfolio: Any) -> Optional[Dict[str, float]]:
+    """
+    The portfolio's buckets as a plain dict, from a dict or a Portfolio, or None
+    when there is no portfolio.
+    """
+    buckets = getattr(portfolio, "portfolio", portfolio)
+    if not isinstance(buckets, dict):
+        return None
+    return {bucket: float(value) for bucket, value in buckets.items()}
+
+
+class DecisionCache:
+    """
+    Memoizes LLM trading decisions keyed on quantized inputs, with TTL and LRU
+    eviction, persisted to a JSON file so it survives restarts. A material-change
+    gate reuses the previous decision outright while no input has moved by more
+    than its tolerance since that decision was made.
+    """
+    def __init__(self, path: Optional[str] = DECISION_CACHE_FILE, ttl: float = DECISION_CACHE_TTL,
+                 max_entries: int = DECISION_CACHE_MAX_ENTRIES, tolerances: Optional[Dict] = None):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.tolerances = dict(DEFAULT_TOLERANCES, **(tolerances or {}))
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, list]" = OrderedDict()
+        self._last: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+        self._load()
+
+    def make_key(self, inputs: Dict[str, Optional[float]], portfolio: Any) -> str:
+        quantized = {field: _quantize(inputs.get(field), mode, step) for field, (mode, step) in self.tolerances.items()}
+        buckets = _portfolio_buckets(portfolio)
+        if buckets is not None:
+            buckets = {bucket: round(value / PORTFOLIO_TOLERANCE) for bucket, value in buckets.items()}
+        quantized["portfolio"] = buckets
+        return json.dumps(quantized, sort_keys=True)
+
+    def has_material_change(self, inputs: Dict[str, Optional[float]], portfolio: Any) -> bool:
+        """
+        True when any input moved by more than its tolerance since the last decision.
+        Without a portfolio, only the market inputs are compared.
+        """
+        if self._last is None:
+            return True
+        previous = self._last["inputs"]
+        for field, (mode, step) in self.tolerances.items():
+            old, new = previous.get(field), inputs.get(field)
+            if (old is None) != (new is None):
+                return True
+            if old is None:
+                continue
+            threshold = step * abs(old) if mode == "relative" else step
+            if abs(new - old) > threshold:
+                return True
+        if _portfolio_buckets(portfolio) is None:
+            return False
+        return self.make_key({}, portfolio) != self.make_key({}, self._last["portfolio"])
+
+    def lookup(self, inputs: Dict[str, Optional[float]], portfolio: Any) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            if self._last is not None and now - self._last["timestamp"] <= self.ttl \
+                    and not self.has_material_change(inputs, portfolio):
+                self.hits += 1
+                logger.info("No material change since last decision. Reusing: %s", self._last['decision'])
+                return self._last["decision"]
+
+            key = self.make_key(inputs, portfolio)
+            entry = self._entries.get(key)
+            if entry is not None:
+                timestamp, decision = entry
+                if now - timestamp <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    logger.info("Decision cache hit: %s", decision)
+                    return decision
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def store(self, inputs: Dict[str, Optional[float]], portfolio: Any, decision: str):
+        now = time.time()
+        with self._lock:
+            key = self.make_key(inputs, portfolio)
+            self._entries[key] = [now, decision]
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._last = {
+                "inputs": inputs,
+                "portfolio": _portfolio_buckets(portfolio),
+                "decision": decision,
+                "timestamp": now,
+            }
+            self._save()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as cache_file:
+                state = json.load(cache_file)
+        except (OSError, ValueError) as error:
+            logger.warning("Ignoring unreadable decision cache %s: %s", self.path, error)
+            return
+        now = time.time()
+        for key, (timestamp, decision) in state.get("entries", []):
+            if now - timestamp <= self.ttl:
+                self._entries[key] = [timestamp, decision]
+        self._last = state.get("last")
+
+    def _save(self):
+        if not self.path:
+            return
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w") as cache_file:
+                json.dump({"entries": list(self._entries.items()), "last": self._last}, cache_file)
+            os.replace(tmp_path, self.path)
+        except OSError as error:
+            logger.warning("Could not persist decision cache: %s", error)
@@ -0,0 +1,947 @@
+import os
+
+# The simulator never talks to Kraken, so it always loads config with the simulation defaults
+os.environ.setdefault("SIMULATION", "1")
+
+import argparse
+import asyncio
+import base64
+import collections
+import hashlib
+import hmac
+import itertools
+import json
+import math
+import operator
+import random
+import threading
+import time
+import urllib.parse
+import zlib
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Optional, List, Dict, Callable, Tuple
+import websockets
+from sortedcontainers import SortedDict
+from config import API_KEY, API_SECRET
+from kraken_ws import KrakenMarketFeed
+from logger_config import logger
+from order_book import OrderBook
+
+# Quote currencies recognised when splitting a pair name such as XBTUSDT into assets
+QUOTE_ASSETS = ("USDT", "USDC", "USD", "EUR", "GBP", "XBT", "ETH")
+
+# Fills smaller than this are treated as zero
+EPSILON = 1e-12
+
+
+def split_pair(pair: str) -> Tuple[str, str]:
+    for quote in QUOTE_ASSETS:
+        if pair.endswith(quote) and len(pair) > len(quote):
+            return pair[:-len(quote)], quote
+    raise ValueError(f"Cannot split pair {pair} into base and quote assets")
+
+
+def _format(value: float, decimals: int) -> str:
+    return f"{value:.{decimals}f}"
+
+
+class SyntheticMarket:
+    """
+    Seeded random-walk market: every step moves the price and rebuilds a book of
+    `depth` levels on each side around it, so runs with the same seed are identical.
+    """
+    def __init__(self, start_price: float = 60000.0, volatility: float = 0.0005, spread_bps: float = 1.0,
+                 depth: int = 25, level_volume: float = 0.5, trade_volume: float = 0.5, price_decimals: int = 1,
+                 seed: int = 0):
+        self.price = start_price
+        self.volatility = volatility
+        self.spread_bps = spread_bps
+        self.level_volume = level_volume
+        self.trade_volume = trade_volume
+        self.price_decimals = price_decimals
+        self.book = OrderBook(depth)
+        self._rng = random.Random(seed)
+        self._build_book()
+
+    def step(self) -> float:
+        """
+        Advances one tick and returns the volume traded by the rest of the market.
+        """
+        self.price *= math.exp(self._rng.gauss(0.0, self.volatility))
+        self._build_book()
+        return self._rng.expovariate(1.0 / self.trade_volume)
+
+    def _build_book(self):
+        tick = 10 ** -self.price_decimals
+        half_spread = max(tick / 2, self.price * self.spread_bps / 20000)
+        best_ask = math.ceil((self.price + half_spread) / tick) * tick
+        best_bid = math.floor((self.price - half_spread) / tick) * tick
+        if best_ask - best_bid < tick / 2:
+            best_ask = best_bid + tick
+        levels = range(self.book.depth)
+        self.book.apply_snapshot(
+            [[_format(best_ask + i * tick, self.price_decimals),
+              _format(self.level_volume * (0.5 + self._rng.random()), 8)] for i in levels],
+            [[_format(best_bid - i * tick, self.price_decimals),
+              _format(self.level_volume * (0.5 + self._rng.random()), 8)] for i in levels],
+        )
+
+
+class ReplayMarket:
+    """
+    Replays messages recorded with `python kraken_ws.py record`, advancing to the
+    next ticker or book update on every step and starting over at the end.
+    """
+    def __init__(self, messages: List[str], depth: int = 10, price_decimals: int = 1):
+        self.price_decimals = price_decimals
+        # The feed is only used to parse messages into ticker and book state
+        self._feed = KrakenMarketFeed(book_depth=depth)
+        self._messages = [message for message in messages if isinstance(json.loads(message), list)]
+        if not self._messages:
+            raise ValueError("Recording holds no market data messages")
+        self._position = 0
+        self.price = None
+        while self.price is None or not self.book.asks or not self.book.bids:
+            self.step()
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "ReplayMarket":
+        with open(path) as recording:
+            return cls([line.strip() for line in recording if line.strip()], **kwargs)
+
+    @property
+    def book(self) -> OrderBook:
+        return self._feed.book
+
+    def step(self) -> float:
+        for _ in range(len(self._messages)):
+            message = self._messages[self._position]
+            self._position = (self._position + 1) % len(self._messages)
+            self._feed.handle_message(message)
+            channel = json.loads(message)[-2]
+            if channel == "ticker":
+                last_trade = self._feed.ticker["c"]
+                self.price = float(last_trade[0])
+                return float(last_trade[1])
+            if channel.startswith("book"):
+                if self.price is None:
+                    self.price = self.book.mid_price()
+                return 0.0
+        return 0.0
+
+
+class SimulatedOrder:
+    def __init__(self, txid: str, pair: str, side: str, ordertype: str, volume: float, price: Optional[float],
+                 userref: Optional[int], opentm: float):
+        self.txid = txid
+        self.pair = pair
+        self.side = side
+        self.ordertype = ordertype
+        self.volume = volume
+        self.price = price
+        self.userref = userref
+        self.opentm = opentm
+        self.closetm = None
+        self.status = "open"
+        self.vol_exec = 0.0
+        self.cost = 0.0
+        self.fee = 0.0
+
+    @property
+    def remaining(self) -> float:
+        return self.volume - self.vol_exec
+
+    def info(self) -> Dict:
+        """
+        The order in the shape used by OpenOrders/QueryOrders and the openOrders channel.
+        """
+        avg_price = self.cost / self.vol_exec if self.vol_exec else 0.0
+        return {
+            "refid": None,
+            "userref": self.userref,
+            "status": self.status,
+            "opentm": self.opentm,
+            "closetm": self.closetm,
+            "descr": {
+                "pair": self.pair,
+                "type": self.side,
+                "ordertype": self.ordertype,
+                "price": str(self.price or 0),
+                "order": f"{self.side} {self.volume} {self.pair} @ {self.ordertype} {self.price or 'market'}",
+            },
+            "vol": f"{self.volume:.8f}",
+            "vol_exec": f"{self.vol_exec:.8f}",
+            "cost": f"{self.cost:.8f}",
+            "fee": f"{self.fee:.8f}",
+            "price": f"{avg_price:.8f}",
+            "avg_price": f"{avg_price:.8f}",
+        }
+
+
+class MatchingEngine:
+    """
+    Price-time priority matching for one pair. Incoming orders match resting
+    simulated orders first and then the market's own book liquidity, which is
+    depleted locally until the next market update replaces it. Resting orders
+    fill when a market update crosses their price.
+    """
+    def __init__(self, pair: str, balances: Dict[str, float], fee_rate: float, clock: Callable[[], float],
+                 on_trade: Callable[[Dict], None], on_order: Callable[[SimulatedOrder], None]):
+        self.pair = pair
+        self.base, self.quote = split_pair(pair)
+        self.balances = balances
+        self.fee_rate = fee_rate
+        self.clock = clock
+        self.on_trade = on_trade
+        self.on_order = on_order
+        self.market_book = OrderBook()
+        self.asks = SortedDict()
+        self.bids = SortedDict(operator.neg)
+        self._trade_ids = itertools.count(1)
+
+    def check_funds(self, side: str, volume: float, price: Optional[float]) -> bool:
+        if side == "sell":
+            return self.balances.get(self.base, 0.0) + EPSILON >= volume
+        reference = price if price else (self.market_book.best_ask() or 0.0)
+        return self.balances.get(self.quote, 0.0) + EPSILON >= volume * reference * (1 + self.fee_rate)
+
+    def add(self, order: SimulatedOrder):
+        self.on_order(order)
+        self._match(order, include_resting=True)
+        if order.status != "open":
+            return
+        if order.ordertype == "limit":
+            resting = self.bids if order.side == "buy" else self.asks
+            resting.setdefault(order.price, collections.deque()).append(order)
+        else:
+            # Market orders never rest; whatever the book could not absorb is dropped
+            self._close(order, "closed" if order.vol_exec > EPSILON else "canceled")
+
+    def cancel(self, order: SimulatedOrder) -> bool:
+        if order.status != "open":
+            return False
+        self._unrest(order)
+        self._close(order, "canceled")
+        return True
+
+    def update_market(self, book: OrderBook):
+        """
+        Replaces the market's liquidity and fills resting orders it now crosses.
+        """
+        self.market_book = book.copy()
+        for resting in (self.bids, self.asks):
+            for price in list(resting.keys()):
+                queue = resting[price]
+                for order in list(queue):
+                    self._match(order, include_resting=False)
+                if not self._crosses_market(resting is self.bids, price):
+                    # Price-sorted, so no later level can cross either
+                    break
+
+    def _crosses_market(self, is_bid: bool, price: float) -> bool:
+        if is_bid:
+            best_ask = self.market_book.best_ask()
+            return best_ask is not None and best_ask <= price
+        best_bid = self.market_book.best_bid()
+        return best_bid is not None and best_bid >= price
+
+    def _marketable(self, order: SimulatedOrder, price: float) -> bool:
+        if order.ordertype != "limit":
+            return True
+        return price <= order.price if order.side == "buy" else price >= order.price
+
+    def _match(self, order: SimulatedOrder, include_resting: bool):
+        opposing = self.asks if order.side == "buy" else self.bids
+        market_levels = self.market_book.asks if order.side == "buy" else self.market_book.bids
+        while order.remaining > EPSILON:
+            resting_price = opposing.peekitem(0)[0] if include_resting and opposing else None
+            market_price = market_levels.peekitem(0)[0] if market_levels else None
+            if resting_price is None and market_price is None:
+                break
+            # Pick whichever side offers the better price, resting orders on ties
+            use_resting = market_price is None or (
+                resting_price is not None and (resting_price <= market_price if order.side == "buy"
+                                               else resting_price >= market_price))
+            price = resting_price if use_resting else market_price
+            if not self._marketable(order, price):
+                break
+            if use_resting:
+                counterparty = opposing[price][0]
+                volume = min(order.remaining, counterparty.remaining)
+                self._fill(counterparty, price, volume, maker=True)
+                if counterparty.status != "open":
+                    self._unrest(counterparty)
+            else:
+                price_str, volume_str = market_levels[price]
+                volume = min(order.remaining, float(volume_str))
+                left = float(volume_str) - volume
+                if left > EPSILON:
+                    market_levels[price] = (price_str, f"{left:.8f}")
+                else:
+                    del market_levels[price]
+            self._fill(order, price, volume, maker=False)
+        if order.remaining <= EPSILON:
+            # _fill has already closed it; a resting order must also leave the book
+            self._unrest(order)
+
+    def _fill(self, order: SimulatedOrder, price: float, volume: float, maker: bool):
+        cost = price * volume
+        fee = cost * self.fee_rate
+        order.vol_exec += volume
+        order.cost += cost
+        order.fee += fee
+        if order.side == "buy":
+            self.balances[self.base] = self.balances.get(self.base, 0.0) + volume
+            self.balances[self.quote] = self.balances.get(self.quote, 0.0) - cost - fee
+        else:
+            self.balances[self.base] = self.balances.get(self.base, 0.0) - volume
+            self.balances[self.quote] = self.balances.get(self.quote, 0.0) + cost - fee
+        self.on_trade({
+            "tradeid": f"T{self.pair}-{next(self._trade_ids)}",
+            "ordertxid": order.txid,
+            "pair": self.pair,
+            "time": self.clock(),
+            "type": order.side,
+            "ordertype": order.ordertype,
+            "price": f"{price:.8f}",
+            "cost": f"{cost:.8f}",
+            "fee": f"{fee:.8f}",
+            "vol": f"{volume:.8f}",
+            "maker": maker,
+        })
+        if order.remaining <= EPSILON:
+            self._close(order, "closed")
+        else:
+            self.on_order(order)
+
+    def _unrest(self, order: SimulatedOrder):
+        resting = self.bids if order.side == "buy" else self.asks
+        queue = resting.get(order.price)
+        if queue is not None and order in queue:
+            queue.remove(order)
+            if not queue:
+                del resting[order.price]
+
+    def _close(self, order: SimulatedOrder, status: str):
+        order.status = status
+        order.closetm = self.clock()
+        self.on_order(order)
+
+
+class CandleSeries:
+    """
+    OHLC candles for one pair and interval, built from ticks and seeded with a
+    synthetic history so that warm-up has something to read.
+    """
+    MAX_ROWS = 1440
+
+    def __init__(self, interval: int, price_decimals: int):
+        self.interval = interval * 60
+        self.price_decimals = price_decimals
+        # [time, open, high, low, close, vwap, volume, count]
+        self.rows: List[List] = []
+
+    def backfill(self, end_time: float, end_price: float, count: int, rng: random.Random, volatility: float):
+        start = end_time - end_time % self.interval
+        price = end_price
+        rows = []
+        for index in range(1, count + 1):
+            close = price
+            price = close * math.exp(rng.gauss(0.0, volatility))
+            high, low = max(price, close), min(price, close)
+            volume = rng.expovariate(1.0)
+            rows.append([start - index * self.interval, price, high, low, close, (high + low) / 2, volume, 1])
+        self.rows = rows[::-1] + self.rows
+
+    def add(self, timestamp: float, price: float, volume: float):
+        start = timestamp - timestamp % self.interval
+        if self.rows and self.rows[-1][0] == start:
+            row = self.rows[-1]
+            row[2] = max(row[2], price)
+            row[3] = min(row[3], price)
+            row[4] = price
+            if row[6] + volume > 0:
+                row[5] = (row[5] * row[6] + price * volume) / (row[6] + volume)
+            row[6] += volume
+            row[7] += 1
+        else:
+            self.rows.append([start, price, price, price, price, price, volume, 1])
+            del self.rows[:-self.MAX_ROWS]
+
+    def to_rest(self, since: Optional[float] = None) -> Tuple[List[List], int]:
+        rows = [row for row in self.rows if since is None or row[0] >= since][-720:]
+        decimals = self.price_decimals
+        formatted = [[int(row[0]), *(_format(value, decimals) for value in row[1:6]), _format(row[6], 8), row[7]]
+                     for row in rows]
+        # `last` is the newest committed candle; the current one may still change
+        last = int(self.rows[-2][0]) if len(self.rows) > 1 else int(self.rows[-1][0]) if self.rows else 0
+        return formatted, last
+
+
+class SimulatedExchange:
+    """
+    Network-local stand-in for the Kraken REST and WebSocket APIs used by the bot,
+    backed by synthetic or replayed markets and a matching engine per pair.
+
+    Point the bot at it with SIMULATION=1 (see config.SIMULATION_DEFAULTS), or set
+    API_DOMAIN, KRAKEN_WS_URL and KRAKEN_WS_AUTH_URL to its URLs. Every REST reply
+    can be delayed by `latency` seconds plus up to `jitter` (per endpoint through
+    `endpoint_latency`), and WebSocket messages by `ws_latency`. With
+    `tick_interval` set to 0 the markets advance one step per market data request
+    instead of on a timer, which makes a run fully deterministic for a given seed.
+    """
+    def __init__(self, markets: Optional[Dict] = None, balances: Optional[Dict[str, float]] = None,
+                 fee_rate: float = 0.0026, latency: float = 0.0, jitter: float = 0.0,
+                 endpoint_latency: Optional[Dict[str, float]] = None, ws_latency: float = 0.0, seed: int = 0,
+                 start_time: Optional[float] = None, time_step: float = 1.0, history: int = 720,
+                 api_key: str = API_KEY, api_secret: str = API_SECRET, verify_signatures: bool = True,
+                 nonce_window: int = 0):
+        self.markets = markets if markets else {"XBTUSDT": SyntheticMarket(seed=seed)}
+        self.balances = dict(balances) if balances else {"XBT": 1.0, "USDT": 100000.0}
+        self.fee_rate = fee_rate
+        self.latency = latency
+        self.jitter = jitter
+        self.endpoint_latency = endpoint_latency or {}
+        self.ws_latency = ws_latency
+        self.time = float(start_time if start_time is not None else int(time.time()))
+        self.time_step = time_step
+        self.history = history
+        self.api_key = api_key
+        self.api_secret = base64.b64decode(api_secret)
+        self.verify_signatures = verify_signatures
+        # Like the API key setting on Kraken: how far below the highest nonce seen a
+        # not-yet-used nonce is still accepted (0 means strictly increasing)
+        self.nonce_window = nonce_window
+        self.requests = collections.Counter()
+        self.steps = 0
+
+        self._rng = random.Random(seed)
+        self._latency_rng = random.Random(seed + 1)
+        self._lock = threading.RLock()
+        self._order_ids = itertools.count(1)
+        self._last_nonce = 0
+        self._used_nonces = set()
+        self._tokens = set()
+        self.orders: Dict[str, SimulatedOrder] = {}
+        self.trades: List[Dict] = []
+        self.engines = {pair: MatchingEngine(pair, self.balances, fee_rate, lambda: self.time,
+                                             self._on_trade, self._on_order) for pair in self.markets}
+        self._candles: Dict[Tuple[str, int], CandleSeries] = {}
+        self._last_trade: Dict[str, Tuple[float, float]] = {}
+        for pair, market in self.markets.items():
+            self.engines[pair].update_market(market.book)
+            self._last_trade[pair] = (market.price, 0.0)
+            # The 1-minute series always exists since the 24h ticker stats come from it
+            self._series(pair, 1)
+
+        self._http_server = None
+        self._ws_loop = None
+        self._ws_server = None
+        self._connections = []
+        self._channel_ids = itertools.count(1)
+        self._threads = []
+        self._stopped = threading.Event()
+        self.step_on_request = False
+
+    # --- Market state ---
+
+    def _series(self, pair: str, interval: int) -> CandleSeries:
+        key = (pair, interval)
+        if key not in self._candles:
+            market = self.markets[pair]
+            series = CandleSeries(interval, market.price_decimals)
+            count = max(self.history, 1440) if interval == 1 else self.history
+            series.backfill(self.time, market.price, count, random.Random(zlib.crc32(f"{pair}:{interval}".encode())),
+                            0.001 * math.sqrt(interval))
+            series.add(self.time, market.price, 0.0)
+            self._candles[key] = series
+        return self._candles[key]
+
+    def step(self, count: int = 1):
+        """
+        Advances the clock and every market by `count` ticks.
+        """
+        for _ in range(count):
+            with self._lock:
+                self.time += self.time_step
+                self.steps += 1
+                for pair, market in self.markets.items():
+                    volume = market.step()
+                    self.engines[pair].update_market(market.book)
+                    self._last_trade[pair] = (market.price, volume)
+                    for (series_pair, _), series in self._candles.items():
+                        if series_pair == pair:
+                            series.add(self.time, market.price, volume)
+                self._publish_market()
+
+    def ticker(self, pair: str) -> Dict:
+        engine = self.engines[pair]
+        decimals = self.markets[pair].price_decimals
+        price, last_volume = self._last_trade[pair]
+        day = self._series(pair, 1).rows[-1440:]
+        volume = sum(row[6] for row in day)
+        vwap = sum(row[5] * row[6] for row in day) / volume if volume else price
+        best_ask = engine.market_book.best_ask() or price
+        best_bid = engine.market_book.best_bid() or price
+        return {
+            "a": [_format(best_ask, decimals), "1", "1.000"],
+            "b": [_format(best_bid, decimals), "1", "1.000"],
+            "c": [_format(price, decimals), f"{last_volume:.8f}"],
+            "v": [f"{volume:.8f}", f"{volume:.8f}"],
+            "p": [_format(vwap, decimals), _format(vwap, decimals)],
+            "t": [sum(row[7] for row in day)] * 2,
+            "l": [_format(min(row[3] for row in day), decimals)] * 2,
+            "h": [_format(max(row[2] for row in day), decimals)] * 2,
+            "o": _format(day[0][1], decimals),
+        }
+
+    def _pair_for(self, name: str) -> Optional[str]:
+        # Accepts both the pair name and its WebSocket name (XBT/USDT)
+        name = name.replace("/", "")
+        return name if name in self.markets else None
+
+    def _wsname(self, pair: str) -> str:
+        base, quote = split_pair(pair)
+        return f"{base}/{quote}"
+
+    # --- REST endpoints ---
+
+    def _latency_for(self, method: str) -> float:
+        with self._lock:
+            jitter = self._latency_rng.uniform(0.0, self.jitter) if self.jitter else 0.0
+        return self.endpoint_latency.get(method, self.latency) + jitter
+
+    def _public(self, method: str, data: Dict) -> Tuple[List[str], Optional[Dict]]:
+        if self.step_on_request and method in ("Ticker", "Depth", "OHLC"):
+            self.step()
+        with self._lock:
+            if method == "Time":
+                return [], {"unixtime": int(self.time), "rfc1123": time.strftime("%a, %d %b %y %H:%M:%S +0000",
+                                                                                   time.gmtime(self.time))}
+            if method == "AssetPairs":
+                return [], {pair: {"altname": pair, "wsname": self._wsname(pair), "base": split_pair(pair)[0],
+                                   "quote": split_pair(pair)[1], "pair_decimals": market.price_decimals,
+                                   "lot_decimals": 8, "ordermin": "0.0001"}
+                            for pair, market in self.markets.items()}
+            pairs = [self._pair_for(name) for name in data.get("pair", "").split(",")]
+            if not pairs or None in pairs:
+                return ["EQuery:Unknown asset pair"], None
+            if method == "Ticker":
+                return [], {pair: self.ticker(pair) for pair in pairs}
+            if method == "Depth":
+                book = self.engines[pairs[0]].market_book
+                count = int(data.get("count", 100))
+                return [], {pairs[0]: {
+                    "asks": [[price_str, volume_str, int(self.time)] for price_str, volume_str in
+                             itertools.islice(book.asks.values(), count)],
+                    "bids": [[price_str, volume_str, int(self.time)] for price_str, volume_str in
+                             itertools.islice(book.bids.values(), count)],
+                }}
+            if method == "OHLC":
+                since = float(data["since"]) if data.get("since") else None
+                rows, last = self._series(pairs[0], int(data.get("interval", 1))).to_rest(since)
+                return [], {pairs[0]: rows, "last": last}
+        return ["EGeneral:Unknown method"], None
+
+    def _authenticate(self, path: str, headers, body: str, data: Dict) -> Optional[str]:
+        if headers.get("API-Key") != self.api_key:
+            return "EAPI:Invalid key"
+        nonce = data.get("nonce", "")
+        if self.verify_signatures:
+            digest = hashlib.sha256(nonce.encode() + body.encode()).digest()
+            expected = base64.b64encode(hmac.new(self.api_secret, path.encode() + digest, hashlib.sha512).digest())
+            if not hmac.compare_digest(expected.decode(), headers.get("API-Sign", "")):
+                return "EAPI:Invalid signature"
+        with self._lock:
+            if not nonce.isdigit() or int(nonce) <= self._last_nonce - self.nonce_window \
+                    or int(nonce) in self._used_nonces:
+                return "EAPI:Invalid nonce"
+            self._last_nonce = max(self._last_nonce, int(nonce))
+            if self.nonce_window:
+                self._used_nonces.add(int(nonce))
+                if len(self._used_nonces) > 4096:
+                    floor = self._last_nonce - self.nonce_window
+                    self._used_nonces = {used for used in self._used_nonces if used > floor}
+        return None
+
+    def _place(self, pair: Optional[str], fields: Dict) -> Tuple[Optional[str], Optional[SimulatedOrder]]:
+        # Caller holds the lock
+        if pair is None:
+            return "EQuery:Unknown asset pair", None
+        side, ordertype = fields.get("type"), fields.get("ordertype", "limit")
+        if side not in ("buy", "sell") or ordertype not in ("limit", "market"):
+            return "EGeneral:Invalid arguments", None
+        try:
+            volume = float(fields["volume"])
+            price = float(fields["price"]) if ordertype == "limit" else None
+        except (KeyError, ValueError):
+            return "EGeneral:Invalid arguments", None
+        if volume <= 0 or (price is not None and price <= 0):
+            return "EGeneral:Invalid arguments", None
+        engine = self.engines[pair]
+        if not engine.check_funds(side, volume, price):
+            return "EOrder:Insufficient funds", None
+        userref = int(fields["userref"]) if fields.get("userref") not in (None, "") else None
+        order = SimulatedOrder(f"O{next(self._order_ids):06d}-SIM", pair, side, ordertype, volume, price, userref,
+                               self.time)
+        self.orders[order.txid] = order
+        engine.add(order)
+        return None, order
+
+    def _private(self, method: str, data: Dict) -> Tuple[List[str], Optional[Dict]]:
+        with self._lock:
+            if method in ("Balance", "BalanceEx"):
+                balances = {}
+                for asset, amount in self.balances.items():
+                    balances[asset] = f"{amount:.8f}"
+                    # The bot reads the BTC balance as XBT.F
+                    balances[f"{asset}.F"] = f"{amount:.8f}"
+                return [], balances
+            if method == "GetWebSocketsToken":
+                token = base64.b64encode(os.urandom(18)).decode()
+                self._tokens.add(token)
+                return [], {"token": token, "expires": 900}
+            if method == "AddOrder":
+                error, order = self._place(self._pair_for(data.get("pair", "")), data)
+                if error:
+                    return [error], None
+                return [], {"descr": {"order": order.info()["descr"]["order"]}, "txid": [order.txid]}
+            if method == "AddOrderBatch":
+                pair = self._pair_for(data.get("pair", ""))
+                replies = []
+                for fields in data.get("orders", []):
+                    error, order = self._place(pair, fields)
+                    replies.append({"error": error} if error else
+                                   {"txid": order.txid, "descr": {"order": order.info()["descr"]["order"]}})
+                return [], {"orders": replies}
+            if method == "CancelOrder":
+                order = self.orders.get(data.get("txid", ""))
+                if order is None:
+                    return ["EOrder:Unknown order"], None
+                cancelled = self.engines[order.pair].cancel(order)
+                return [], {"count": int(cancelled), "pending": False}
+            if method == "EditOrder":
+                order = self.orders.get(data.get("txid", ""))
+                if order is None or order.status != "open":
+                    return ["EOrder:Unknown order"], None
+                self.engines[order.pair].cancel(order)
+                fields = {"type": order.side, "ordertype": order.ordertype, "volume": data.get("volume", order.remaining),
+                          "price": data.get("price", order.price), "userref": data.get("userref", order.userref)}
+                error, replacement = self._place(order.pair, fields)
+                if error:
+                    return [error], None
+                return [], {"status": "ok", "txid": replacement.txid, "originaltxid": order.txid,
+                            "descr": {"order": replacement.info()["descr"]["order"]}}
+            if method == "OpenOrders":
+                return [], {"open": {txid: order.info() for txid, order in self.orders.items()
+                                     if order.status == "open"}}
+            if method == "QueryOrders":
+                txids = data.get("txid", "").split(",")
+                return [], {txid: self.orders[txid].info() for txid in txids if txid in self.orders}
+        return ["EGeneral:Unknown method"], None
+
+    def handle_rest(self, http_method: str, path: str, headers, body: str) -> Tuple[int, Dict]:
+        """
+        Serves one REST request and returns (HTTP status, JSON reply).
+        """
+        parsed = urllib.parse.urlparse(path)
+        parts = parsed.path.strip("/").split("/")
+        if len(parts) != 3 or parts[0] != "0" or parts[1] not in ("public", "private"):
+            return 404, {"error": ["EGeneral:Unknown method"]}
+        visibility, method = parts[1], parts[2]
+        self.requests[method] += 1
+        delay = self._latency_for(method)
+        if delay > 0:
+            time.sleep(delay)
+
+        if visibility == "public":
+            data = {key: values[-1] for key, values in urllib.parse.parse_qs(parsed.query).items()}
+            if body:
+                data.update({key: values[-1] for key, values in urllib.parse.parse_qs(body).items()})
+            errors, result = self._public(method, data)
+        else:
+            if headers.get("Content-Type", "").startswith("application/json"):
+                data = json.loads(body or "{}")
+                data["nonce"] = str(data.get("nonce", ""))
+            else:
+                data = _parse_form(body)
+            error = self._authenticate(parsed.path, headers, body, data)
+            if error:
+                return 200, {"error": [error]}
+            errors, result = self._private(method, data)
+        reply = {"error": errors}
+        if result is not None:
+            reply["result"] = result
+        return 200, reply
+
+    # --- Engine events ---
+
+    def _on_trade(self, trade: Dict):
+        self.trades.append(trade)
+        self._publish_private("ownTrades", {trade["tradeid"]: {key: value for key, value in trade.items()
+                                                               if key != "tradeid"}})
+
+    def _on_order(self, order: SimulatedOrder):
+        self._publish_private("openOrders", {order.txid: order.info()})
+
+    # --- WebSocket ---
+
+    def _send(self, connection: Dict, message):
+        if self._ws_loop is not None:
+            self._ws_loop.call_soon_threadsafe(connection["queue"].put_nowait, message)
+
+    def _publish_private(self, channel: str, entry: Dict):
+        for connection in list(self._connections):
+            if channel in connection["private"]:
+                connection["sequence"][channel] += 1
+                self._send(connection, [[entry], channel, {"sequence": connection["sequence"][channel]}])
+
+    def _publish_market(self):
+        # Caller holds the lock
+        for connection in list(self._connections):
+            for subscription in connection["public"]:
+                message = self._market_message(subscription, snapshot=False)
+                if message is not None:
+                    self._send(connection, message)
+
+    def _market_message(self, subscription: Dict, snapshot: bool) -> Optional[List]:
+        pair, name = subscription["pair"], subscription["name"]
+        wsname = self._wsname(pair)
+        if name == "ticker":
+            return [subscription["channel_id"], self.ticker(pair), "ticker", wsname]
+        if name == "ohlc":
+            interval = subscription["interval"]
+            row = self._series(pair, interval).rows[-1]
+            decimals = self.markets[pair].price_decimals
+            candle = [f"{self.time:.6f}", f"{row[0] + interval * 60:.6f}",
+                      *(_format(value, decimals) for value in row[1:6]), _format(row[6], 8), row[7]]
+            return [subscription["channel_id"], candle, f"ohlc-{interval}", wsname]
+        # Book: a snapshot, or the level changes since the last message plus a checksum
+        depth = subscription["depth"]
+        current = OrderBook(depth)
+        market_book = self.engines[pair].market_book
+        current.apply_snapshot(list(itertools.islice(market_book.asks.values(), depth)),
+                               list(itertools.islice(market_book.bids.values(), depth)))
+        timestamp = f"{self.time:.6f}"
+        previous = subscription.get("book")
+        subscription["book"] = current
+        if snapshot or previous is None:
+            return [subscription["channel_id"], {
+                "as": [[price_str, volume_str, timestamp] for price_str, volume_str in current.asks.values()],
+                "bs": [[price_str, volume_str, timestamp] for price_str, volume_str in current.bids.values()],
+            }, f"book-{depth}", wsname]
+        update = {}
+        for key, old, new in (("a", previous.asks, current.asks), ("b", previous.bids, current.bids)):
+            levels = [[old[price][0], "0.00000000", timestamp] for price in old if price not in new]
+            levels += [[price_str, volume_str, timestamp] for price, (price_str, volume_str) in new.items()
+                       if old.get(price) != (price_str, volume_str)]
+            if levels:
+                update[key] = levels
+        if not update:
+            return None
+        update["c"] = str(current.checksum())
+        return [subscription["channel_id"], update, f"book-{depth}", wsname]
+
+    def _subscribe(self, connection: Dict, request: Dict) -> List:
+        subscription = request.get("subscription", {})
+        name = subscription.get("name")
+        replies = []
+        with self._lock:
+            if name in ("openOrders", "ownTrades"):
+                if subscription.get("token") not in self._tokens:
+                    return [{"event": "subscriptionStatus", "status": "error", "errorMessage": "EGeneral:Invalid token",
+                             "subscription": {"name": name}}]
+                connection["private"].add(name)
+                connection["sequence"][name] = 1
+                replies.append({"event": "subscriptionStatus", "status": "subscribed", "channelName": name,
+                                "subscription": {"name": name}})
+                if name == "openOrders":
+                    entries = [{txid: order.info()} for txid, order in self.orders.items() if order.status == "open"]
+                else:
+                    entries = [{trade["tradeid"]: {key: value for key, value in trade.items() if key != "tradeid"}}
+                               for trade in self.trades[-50:]]
+                replies.append([entries, name, {"sequence": 1}])
+                return replies
+            for wsname in request.get("pair", []):
+                pair = self._pair_for(wsname)
+                if pair is None or name not in ("ticker", "book", "ohlc"):
+                    replies.append({"event": "subscriptionStatus", "status": "error", "pair": wsname,
+                                    "errorMessage": "Subscription not supported", "subscription": subscription})
+                    continue
+                channel = {"pair": pair, "name": name, "channel_id": next(self._channel_ids),
+                           "depth": int(subscription.get("depth", 10)),
+                           "interval": int(subscription.get("interval", 1))}
+                connection["public"].append(channel)
+                replies.append({"event": "subscriptionStatus", "status": "subscribed", "pair": wsname,
+                                "channelID": channel["channel_id"], "subscription": subscription})
+                replies.append(self._market_message(channel, snapshot=True))
+        return replies
+
+    async def _ws_sender(self, websocket, queue: asyncio.Queue):
+        while True:
+            message = await queue.get()
+            if self.ws_latency:
+                await asyncio.sleep(self.ws_latency)
+            await websocket.send(json.dumps(message))
+
+    async def _ws_handler(self, websocket, path=None):
+        connection = {"queue": asyncio.Queue(), "public": [], "private": set(), "sequence": {}}
+        self._connections.append(connection)
+        sender = asyncio.ensure_future(self._ws_sender(websocket, connection["queue"]))
+        await connection["queue"].put({"event": "systemStatus", "status": "online", "version": "simulator"})
+        try:
+            async for raw in websocket:
+                request = json.loads(raw)
+                if request.get("event") == "ping":
+                    await connection["queue"].put({"event": "pong", "reqid": request.get("reqid")})
+                elif request.get("event") == "subscribe":
+                    for reply in self._subscribe(connection, request):
+                        await connection["queue"].put(reply)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self._connections.remove(connection)
+            sender.cancel()
+
+    # --- Serving ---
+
+    def start(self, host: str = "127.0.0.1", port: int = 8901, ws_port: Optional[int] = 8902,
+              tick_interval: float = 1.0):
+        """
+        Starts the REST server, the WebSocket server (unless ws_port is None) and the
+        market clock in background threads. Port 0 picks a free port.
+        """
+        self._stopped.clear()
+        self.step_on_request = tick_interval <= 0
+        self._http_server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._start_thread("simulator-rest", self._http_server.serve_forever)
+
+        if ws_port is not None:
+            ready = threading.Event()
+
+            async def serve():
+                self._ws_loop = asyncio.get_running_loop()
+                async with websockets.serve(self._ws_handler, host, ws_port) as server:
+                    self._ws_server = server
+                    ready.set()
+                    while not self._stopped.is_set():
+                        await asyncio.sleep(0.1)
+
+            self._start_thread("simulator-ws", lambda: asyncio.run(serve()))
+            ready.wait(5)
+
+        if tick_interval > 0:
+            def clock():
+                while not self._stopped.wait(tick_interval):
+                    self.step()
+            self._start_thread("simulator-clock", clock)
+
+        if ws_port is not None:
+            logger.info("Simulated exchange listening at %s and %s", self.base_url, self.ws_url)
+        else:
+            logger.info("Simulated exchange listening at %s", self.base_url)
+
+    def _start_thread(self, name: str, target):
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def stop(self):
+        self._stopped.set()
+        if self._http_server:
+            self._http_server.shutdown()
+            self._http_server.server_close()
+        for thread in self._threads:
+            thread.join(2)
+        self._threads = []
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._http_server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def ws_url(self) -> Optional[str]:
+        if self._ws_server is None:
+            return None
+        host, port = next(iter(self._ws_server.sockets)).getsockname()[:2]
+        return f"ws://{host}:{port}"
+
+
+def _parse_form(body: str) -> Dict:
+    """
+    Decodes a form body, gathering orders[i][field] keys into an `orders` list.
+    """
+    data = {}
+    orders = {}
+    for key, value in urllib.parse.parse_qsl(body, keep_blank_values=True):
+        if key.startswith("orders["):
+            index, field = key[len("orders["):].rstrip("]").split("][")
+            orders.setdefault(int(index), {})[field] = value
+        else:
+            data[key] = value
+    if orders:
+        data["orders"] = [orders[index] for index in sorted(orders)]
+    return data
+
+
+def _make_handler(exchange: SimulatedExchange):
+    class Handler(BaseHTTPRequestHandler):
+        # Keep-alive, like the real API, so pooled clients reuse connections
+        protocol_version = "HTTP/1.1"
+        # Headers and body are written separately; without this Nagle adds ~40ms per reply
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def _serve(self, http_method: str):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode()
+            status, reply = exchange.handle_rest(http_method, self.path, self.headers, body)
+            payload = json.dumps(reply).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            self._serve("GET")
+
+        def do_POST(self):
+            self._serve("POST")
+
+    return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local simulated Kraken exchange.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8901, help="REST port")
+    parser.add_argument("--ws-port", type=int, default=8902, help="WebSocket port (public and private channels)")
+    parser.add_argument("--pairs", default="XBTUSDT", help="comma-separated synthetic pairs")
+    parser.add_argument("--replay", help="recording from `kraken_ws.py record` to replay instead of a random walk")
+    parser.add_argument("--tick-interval", type=float, default=1.0, help="seconds per market step; 0 steps per request")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every REST reply")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random REST latency, up to this many seconds")
+    parser.add_argument("--ws-latency", type=float, default=0.0, help="seconds added to every WebSocket message")
+    parser.add_argument("--nonce-window", type=int, default=0,
+                        help="accept unused nonces this far below the highest seen (0: strictly increasing)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.replay:
+        markets = {"XBTUSDT": ReplayMarket.from_file(args.replay)}
+    else:
+        markets = {pair: SyntheticMarket(seed=args.seed + index)
+                   for index, pair in enumerate(pair.strip() for pair in args.pairs.split(",") if pair.strip())}
+    exchange = SimulatedExchange(markets, latency=args.latency, jitter=args.jitter, ws_latency=args.ws_latency,
+                                 seed=args.seed, nonce_window=args.nonce_window)
+    exchange.start(args.host, args.port, args.ws_port, args.tick_interval)
+    logger.info("Run the bot with SIMULATION=1 API_DOMAIN=%s KRAKEN_WS_URL=%s KRAKEN_WS_AUTH_URL=%s",
+                exchange.base_url, exchange.ws_url, exchange.ws_url)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        exchange.stop()
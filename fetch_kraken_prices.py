@@ -1,4 +1,5 @@
 import requests
+from ohlcv import from_kraken_rows
 
 def get_latest_price(pair="XBTUSDT"):
     url = f"https://api.kraken.com/0/public/Ticker?pair={pair}"
@@ -15,7 +16,8 @@ def get_latest_price(pair="XBTUSDT"):
 
 def get_historical_prices(pair="XBTUSDT", interval=60):
     """
-    Get historical prices for the past 24 hours.
+    Get historical prices for the past 24 hours as an OHLCV record array with
+    time, open, high, low, close, vwap, volume and count columns.
     Interval options: 1 (minute), 5, 15, 30, 60 (hour), 240, 1440 (day), 10080 (week).
     """
     url = f"https://api.kraken.com/0/public/OHLC?pair={pair}&interval={interval}"
@@ -23,13 +25,8 @@ def get_historical_prices(pair="XBTUSDT", interval=60):
     data = response.json()
     
     if response.status_code == 200:
-        # Extract historical prices (timestamp, open, high, low, close)
-        historical_prices = [
-            {"time": entry[0], "open": float(entry[1]), "high": float(entry[2]), 
-             "low": float(entry[3]), "close": float(entry[4])}
-            for entry in data["result"][list(data["result"].keys())[0]]
-        ]
-        return historical_prices
+        # Each entry is [time, open, high, low, close, vwap, volume, count]
+        return from_kraken_rows(data["result"][list(data["result"].keys())[0]])
     else:
         print(f"Error: {data['error']}")
         return None
@@ -1,33 +1,134 @@
-import logging
-import openai
+import re
+import threading
 from authenticate import open_ai_auth
+from config import LLM_STREAM_DECISIONS, LLM_DECISION_DEADLINE
+from decision_cache import DecisionCache
+from logger_config import logger
 
-# Initialize logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
 
+# The OpenAI client and the decision cache are created on first use
+_ai_client = None
+_decision_cache = None
+_init_lock = threading.Lock()
 
 
-# Configure OpenAI API
-ai_client = open_ai_auth()
+def get_ai_client():
+    """
+    Returns the shared OpenAI client, authenticating on first use.
+    """
+    global _ai_client
+    if _ai_client is None:
+        with _init_lock:
+            if _ai_client is None:
+                _ai_client = open_ai_auth()
+    return _ai_client
+
+
+def get_decision_cache():
+    """
+    Returns the shared decision cache, loading it from disk on first use.
+    Decisions are reused while the inputs have not materially changed.
+    """
+    global _decision_cache
+    if _decision_cache is None:
+        with _init_lock:
+            if _decision_cache is None:
+                _decision_cache = DecisionCache()
+    return _decision_cache
+
+# Matches the structured action line requested from the model
+ACTION_PATTERN = re.compile(r"ACTION:\s*(BUY|HOLD|SELL)\b", re.IGNORECASE)
+# Fallback for a reply without the action line: the first action word in it
+ACTION_WORD_PATTERN = re.compile(r"\b(buy|hold|sell)\b", re.IGNORECASE)
+
+
+def _parse_action(text):
+    """
+    Returns "buy", "hold" or "sell" from a model reply, or None if it names none.
+    """
+    match = ACTION_PATTERN.search(text) or ACTION_WORD_PATTERN.search(text)
+    return match.group(1).lower() if match else None
 
-def gpt_trading_decision(latest_price, historical_prices, sentiment, moving_average, rsi, macd, signal_line, portfolio):
+
+def _stream_decision(prompt, deadline):
+    """
+    Streams the completion on a background thread and returns the action as soon as
+    the ACTION line has been parsed, while the reasoning keeps streaming into the log.
+    Returns None if no action arrived before the deadline.
+    """
+    action_ready = threading.Event()
+    state = {"action": None, "cancelled": False}
+
+    def consume():
+        text = ""
+        try:
+            response = get_ai_client().chat.completions.create(
+                model="gpt-4",
+                messages=[
+                    {"role": "system", "content": "You are a helpful and knowledgeable trading assistant."},
+                    {"role": "user", "content": prompt},
+                ],
+                stream=True,
+            )
+            for chunk in response:
+                if state["cancelled"]:
+                    response.close()
+                    return
+                if not chunk.choices:
+                    continue
+                text += chunk.choices[0].delta.content or ""
+                if state["action"] is None:
+                    match = ACTION_PATTERN.search(text)
+                    if match:
+                        state["action"] = match.group(1).lower()
+                        action_ready.set()
+            logger.info("Decision reasoning: %s", text.strip())
+        except Exception as e:
+            logger.error("Failed to stream trading decision: %s", str(e))
+        finally:
+            action_ready.set()
+
+    threading.Thread(target=consume, name="llm-decision", daemon=True).start()
+    if not action_ready.wait(deadline):
+        state["cancelled"] = True
+        logger.warning("No decision within %.2fs deadline. Holding.", deadline)
+        return None
+    return state["action"]
+
+
+def gpt_trading_decision(latest_price, historical_prices, sentiment, moving_average, rsi, macd, signal_line, portfolio,
+                         stream=LLM_STREAM_DECISIONS, deadline=LLM_DECISION_DEADLINE):
     """
     Uses OpenAI's GPT model to decide whether to Buy, Hold, or Sell Bitcoin.
     Parameters:
         - latest_price: The most recent Bitcoin price.
         - historical_prices: A list of historical price data (e.g., [float]).
         - sentiment: A tuple containing sentiment ("Positive", "Neutral", "Negative") and a confidence score.
+        - stream: Ask for a structured action line and return as soon as it is streamed.
+        - deadline: In streaming mode, seconds to wait for the action before holding.
     Returns:
-        - decision: A string ("buy", "hold", or "sell").
+        - decision: A string ("buy", "hold", or "sell"), which is also what gets cached.
     """
-    logger.info(f"Generating trading decision using ChatGPT API...")
-    
     # Prepare historical trend data
     trend = historical_prices[-1] - historical_prices[0]  # Use raw float values for the trend
     trend_direction = "upward" if trend > 0 else "downward" if trend < 0 else "flat"
     sentiment_score = sentiment
 
+    cache_inputs = {
+        "latest_price": latest_price,
+        "trend_pct": trend / historical_prices[0] * 100 if historical_prices[0] else 0.0,
+        "sentiment": sentiment_score,
+        "moving_average": moving_average,
+        "rsi": rsi,
+        "macd": macd,
+        "signal_line": signal_line,
+    }
+    cached_decision = get_decision_cache().lookup(cache_inputs, portfolio)
+    if cached_decision is not None:
+        return cached_decision
+
+    logger.info("Generating trading decision using ChatGPT API...")
+
     # Generate prompt
     prompt = (
         f"You are a trading expert. Based on the following data, decide whether to Buy, Hold, or Sell Bitcoin:\n\n"
@@ -37,11 +138,21 @@ def gpt_trading_decision(latest_price, historical_prices, sentiment, moving_aver
         f"- Technical Indicators: (moving average: {moving_average}, rsi: {rsi}, macd: {macd}, signal: {signal_line} \n"
         f"- Portfolio: Based on this portfolio, {portfolio}.\n\n"
         f"Provide your decision (Buy, Hold, or Sell). Explain the reasoning in under 100 words\n"
+        "Start your reply with a line of the form 'ACTION: BUY', 'ACTION: HOLD' or 'ACTION: SELL', "
+        "followed by a line starting with 'REASON:'.\n"
     )
 
+    if stream:
+        decision = _stream_decision(prompt, deadline)
+        if decision is None:
+            return "hold"
+        logger.info("Generated Decision: %s", decision)
+        get_decision_cache().store(cache_inputs, portfolio, decision)
+        return decision
+
     try:
         # Call OpenAI API
-        response = ai_client.chat.completions.create(
+        response = get_ai_client().chat.completions.create(
             model="gpt-4",
             messages=[
                 {"role": "system", "content": "You are a helpful and knowledgeable trading assistant."},
@@ -50,11 +161,16 @@ def gpt_trading_decision(latest_price, historical_prices, sentiment, moving_aver
         )
 
         # Parse the response
-        decision = response.choices[0].message.content.strip().lower()
-        logger.info(f"Generated Decision: {decision}")
-      
+        reply = response.choices[0].message.content.strip()
+        logger.info("Decision reasoning: %s", reply)
+        decision = _parse_action(reply)
+        if decision is None:
+            logger.warning("No action in the model's reply. Holding.")
+            return "hold"
+        logger.info("Generated Decision: %s", decision)
+        get_decision_cache().store(cache_inputs, portfolio, decision)
         return decision
 
     except Exception as e:
-        logger.error(f"Failed to generate trading decision: {str(e)}")
+        logger.error("Failed to generate trading decision: %s", str(e))
         return "hold"
@@ -0,0 +1,48 @@
+import threading
+from typing import Optional, Dict, Union
+import requests
+from requests.adapters import HTTPAdapter
+from config import HTTP_POOL_SIZE, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT
+
+
+class HTTPTransport:
+    """
+    Persistent, pooled HTTP session shared by the Kraken REST clients.
+    Connections are kept alive between calls so only the first request to a
+    host pays the TCP+TLS handshake.
+    """
+    def __init__(self, pool_size: int = HTTP_POOL_SIZE, connect_timeout: float = HTTP_CONNECT_TIMEOUT,
+                 read_timeout: float = HTTP_READ_TIMEOUT):
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        # Retries are handled by tenacity in KrakenAPI, not by urllib3
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Connection": "keep-alive"})
+
+    def get(self, url: str, headers: Optional[Dict] = None, params: Optional[Dict] = None) -> requests.Response:
+        return self.session.get(url, headers=headers, params=params, timeout=self.timeout)
+
+    def post(self, url: str, headers: Optional[Dict] = None, data: Optional[Union[Dict, str]] = None) -> requests.Response:
+        return self.session.post(url, headers=headers, data=data, timeout=self.timeout)
+
+    def close(self):
+        self.session.close()
+
+
+_default_transport = None
+_default_transport_lock = threading.Lock()
+
+
+def get_default_transport() -> HTTPTransport:
+    """
+    Returns the process-wide transport, creating it on first use.
+    """
+    global _default_transport
+    if _default_transport is None:
+        with _default_transport_lock:
+            if _default_transport is None:
+                _default_transport = HTTPTransport()
+    return _default_transport
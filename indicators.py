@@ -1,30 +1,56 @@
 import numpy as np
-import pandas as pd
-from typing import Optional, List
+from typing import Optional, List, Dict
 import os
-import logging
+import threading
 from dotenv import load_dotenv
 from datetime import date, datetime, timedelta
 import requests
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
-import nltk
+from sentiment_cache import SentimentStore, article_content
+from logger_config import logger
 
 
 # Load environment variables from the .env file
 load_dotenv()
 
-# Configure logger
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
 # Get News API credentials from environment variables with error handling
 NEWS_API_KEY = os.getenv("NEWS_API_KEY")
 
-# Ensure NLTK data is available
-nltk.download('vader_lexicon')
+# The sentiment analyzer and score store are created on first use, so importing
+# this module does no network or disk work. nltk is only imported when needed.
+_sid = None
+_sentiment_store = None
+_sentiment_lock = threading.Lock()
+
+
+def get_sentiment_analyzer():
+    """
+    Returns the shared VADER analyzer, downloading the lexicon only if it is missing.
+    """
+    global _sid
+    if _sid is None:
+        with _sentiment_lock:
+            if _sid is None:
+                import nltk
+                from nltk.sentiment.vader import SentimentIntensityAnalyzer
+                try:
+                    nltk.data.find('sentiment/vader_lexicon.zip')
+                except LookupError:
+                    nltk.download('vader_lexicon')
+                _sid = SentimentIntensityAnalyzer()
+    return _sid
+
+
+def get_sentiment_store() -> SentimentStore:
+    """
+    Returns the shared persistent per-article sentiment store.
+    """
+    global _sentiment_store
+    if _sentiment_store is None:
+        with _sentiment_lock:
+            if _sentiment_store is None:
+                _sentiment_store = SentimentStore()
+    return _sentiment_store
 
-# Set up Sentiment Intensity Analyzer
-sid = SentimentIntensityAnalyzer()
 
 # Cache for latest news
 news_cache = {
@@ -50,18 +76,18 @@ def fetch_latest_news(top_n: int = 10) -> Optional[list]:
         articles = response.json().get('articles', [])
         news_cache["timestamp"] = current_time
         news_cache["articles"] = articles
-        logger.info(f"Successfully fetched {len(articles)} news articles.")
+        logger.info("Successfully fetched %s news articles.", len(articles))
 
         # Log the titles and URLs of the articles
         for article in articles[:top_n]:  # Log only the top_n articles
             title = article.get('title', 'No Title Available')
             article_url = article.get('url', 'No URL Available')
-            logger.info(f"Article Title: {title}")
-            logger.info(f"Article URL: {article_url}")
+            logger.info("Article Title: %s", title)
+            logger.info("Article URL: %s", article_url)
 
         return articles[:top_n]  # Return only the top_n articles
     else:
-        logger.error(f"Failed to fetch news. Status code: {response.status_code}")
+        logger.error("Failed to fetch news. Status code: %s", response.status_code)
         return None
 
 
@@ -69,22 +95,18 @@ def fetch_latest_news(top_n: int = 10) -> Optional[list]:
 def calculate_sentiment(articles: Optional[list]) -> float:
     """
     Analyze the sentiment of news articles.
+    Scores are cached per article, so only articles not seen before are scored.
     """
-    total_sentiment = 0
     if not articles:
         logger.warning("No articles found for sentiment analysis.")
         return 0  # Neutral sentiment
 
-    for article in articles:
-        headline = article.get('title', '') or ''
-        description = article.get('description', '') or ''
-        content = headline + ". " + description
-
-        sentiment_score = sid.polarity_scores(content)['compound']
-        total_sentiment += sentiment_score
+    contents = [article_content(article) for article in articles]
+    scores = get_sentiment_store().score(
+        contents, lambda batch: [get_sentiment_analyzer().polarity_scores(content)['compound'] for content in batch])
 
-    average_sentiment = total_sentiment / len(articles)
-    logger.info(f"Calculated average sentiment score: {average_sentiment}")
+    average_sentiment = sum(scores) / len(articles)
+    logger.info("Calculated average sentiment score: %s", average_sentiment)
     return average_sentiment
 
 
@@ -112,6 +134,7 @@ def calculate_rsi(prices: List[float], window: int = 14) -> Optional[float]:
 def calculate_macd(prices: List[float], short_window: int = 12, long_window: int = 26, signal_window: int = 7) -> Optional[tuple]:
     if len(prices) < long_window:
         return None, None  # Not enough data points yet
+    import pandas as pd
     prices_series = pd.Series(prices)
     short_ema = prices_series.ewm(span=short_window, adjust=False).mean()
     long_ema = prices_series.ewm(span=long_window, adjust=False).mean()
@@ -119,6 +142,376 @@ def calculate_macd(prices: List[float], short_window: int = 12, long_window: int
     signal = macd.ewm(span=signal_window, adjust=False).mean()
     return float(macd.iloc[-1]), float(signal.iloc[-1])
 
+# Full-series indicators: each returns an array aligned with `prices`,
+# NaN where there is not enough data yet. `prices` may be 1-D (time) or
+# 2-D (time x pairs), in which case every column is computed at once.
+def _ewm(values: np.ndarray, **kwargs) -> np.ndarray:
+    import pandas as pd
+    frame = pd.DataFrame(values) if values.ndim == 2 else pd.Series(values)
+    return frame.ewm(adjust=False, **kwargs).mean().to_numpy(copy=True)
+
+def sma_series(prices: np.ndarray, window: int = 7) -> np.ndarray:
+    prices = np.asarray(prices, dtype=np.float64)
+    result = np.full(prices.shape, np.nan)
+    if len(prices) >= window:
+        cumulative = np.cumsum(np.concatenate((np.zeros((1,) + prices.shape[1:]), prices)), axis=0)
+        result[window - 1:] = (cumulative[window:] - cumulative[:-window]) / window
+    return result
+
+def ema_series(prices: np.ndarray, span: int) -> np.ndarray:
+    # Seeded with the first price, matching pandas ewm(adjust=False)
+    return _ewm(np.asarray(prices, dtype=np.float64), span=span)
+
+def wilder_averages(prices: np.ndarray, window: int = 14) -> tuple:
+    """
+    Wilder-smoothed average gain and loss per price change, seeded with simple
+    averages over the first window. Row i describes the change into price i + window.
+    """
+    delta = np.diff(np.asarray(prices, dtype=np.float64), axis=0)
+    gains = np.where(delta > 0, delta, 0.0)
+    losses = np.where(delta < 0, -delta, 0.0)
+    alpha = 1.0 / window
+    avg_gain = _ewm(np.concatenate((gains[:window].mean(axis=0, keepdims=True), gains[window:])), alpha=alpha)
+    avg_loss = _ewm(np.concatenate((losses[:window].mean(axis=0, keepdims=True), losses[window:])), alpha=alpha)
+    return avg_gain, avg_loss
+
+def rsi_series(prices: np.ndarray, window: int = 14) -> np.ndarray:
+    """
+    Wilder RSI, matching StreamingIndicators: simple averages over the first
+    window of price changes, Wilder smoothing afterwards.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    result = np.full(prices.shape, np.nan)
+    if len(prices) < window + 1:
+        return result
+    avg_gain, avg_loss = wilder_averages(prices, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100 - (100 / (1 + avg_gain / avg_loss))
+    result[window:] = np.where(avg_loss == 0, 100.0, rsi)
+    return result
+
+def macd_series(prices: np.ndarray, short_window: int = 12, long_window: int = 26, signal_window: int = 7) -> tuple:
+    prices = np.asarray(prices, dtype=np.float64)
+    macd = ema_series(prices, short_window) - ema_series(prices, long_window)
+    signal = ema_series(macd, signal_window)
+    macd[:long_window - 1] = np.nan
+    signal[:long_window - 1] = np.nan
+    return macd, signal
+
+
+class RingBuffer:
+    """
+    Fixed-capacity buffer of floats backed by a preallocated numpy array.
+    Appending overwrites the oldest value once the buffer is full, in O(1).
+    """
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError("RingBuffer capacity must be positive.")
+        self.capacity = capacity
+        self._data = np.empty(capacity, dtype=np.float64)
+        self._start = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, index: int) -> float:
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("RingBuffer index out of range")
+        return float(self._data[(self._start + index) % self.capacity])
+
+    def append(self, value: float) -> Optional[float]:
+        """
+        Appends a value and returns the evicted oldest value, if any.
+        """
+        evicted = None
+        if self._size < self.capacity:
+            self._data[(self._start + self._size) % self.capacity] = value
+            self._size += 1
+        else:
+            evicted = float(self._data[self._start])
+            self._data[self._start] = value
+            self._start = (self._start + 1) % self.capacity
+        return evicted
+
+    def clear(self):
+        self._start = 0
+        self._size = 0
+
+    def load(self, values: np.ndarray):
+        """
+        Replaces the contents with `values` (oldest first), keeping the newest
+        `capacity` of them.
+        """
+        values = np.asarray(values, dtype=np.float64)[-self.capacity:]
+        self._data[:len(values)] = values
+        self._start = 0
+        self._size = len(values)
+
+    def to_array(self) -> np.ndarray:
+        """
+        Returns the buffered values oldest-first as a new array.
+        """
+        end = self._start + self._size
+        if end <= self.capacity:
+            return self._data[self._start:end].copy()
+        return np.concatenate((self._data[self._start:], self._data[:end - self.capacity]))
+
+    def to_list(self) -> List[float]:
+        return self.to_array().tolist()
+
+
+class StreamingIndicators:
+    """
+    Incrementally maintained SMA, Wilder RSI and MACD/signal over a price stream.
+    Each update costs O(1) regardless of how much history has been seen.
+    """
+    def __init__(self, ma_window: int = 7, rsi_window: int = 14, short_window: int = 12,
+                 long_window: int = 26, signal_window: int = 7, capacity: int = 1000):
+        if capacity <= ma_window:
+            raise ValueError("capacity must be larger than the moving average window.")
+        self.ma_window = ma_window
+        self.rsi_window = rsi_window
+        self.short_window = short_window
+        self.long_window = long_window
+        self.signal_window = signal_window
+        self.prices = RingBuffer(capacity)
+
+        self._short_alpha = 2.0 / (short_window + 1)
+        self._long_alpha = 2.0 / (long_window + 1)
+        self._signal_alpha = 2.0 / (signal_window + 1)
+        self.reset()
+
+    def reset(self):
+        self.prices.clear()
+        self.count = 0
+        self._window_sum = 0.0
+        self._last_price = None
+        self._gain_sum = 0.0
+        self._loss_sum = 0.0
+        self._avg_gain = None
+        self._avg_loss = None
+        self._short_ema = None
+        self._long_ema = None
+        self._signal_ema = None
+
+    def update(self, price: float):
+        """
+        Feeds one new price into every indicator.
+        """
+        price = float(price)
+        self.count += 1
+
+        # SMA: running sum over the last ma_window prices. The buffer is larger
+        # than the window, so the price leaving the window is still available.
+        self._window_sum += price
+        if len(self.prices) >= self.ma_window:
+            self._window_sum -= self.prices[-self.ma_window]
+        self.prices.append(price)
+        if self.count % self.prices.capacity == 0:
+            # Periodically resync to stop floating point drift accumulating
+            self._window_sum = float(np.sum(self.prices.to_array()[-self.ma_window:]))
+
+        # Wilder RSI: simple average over the first window, smoothed afterwards
+        if self._last_price is not None:
+            delta = price - self._last_price
+            gain = delta if delta > 0 else 0.0
+            loss = -delta if delta < 0 else 0.0
+            n_deltas = self.count - 1
+            if n_deltas <= self.rsi_window:
+                self._gain_sum += gain
+                self._loss_sum += loss
+                if n_deltas == self.rsi_window:
+                    self._avg_gain = self._gain_sum / self.rsi_window
+                    self._avg_loss = self._loss_sum / self.rsi_window
+            else:
+                self._avg_gain = (self._avg_gain * (self.rsi_window - 1) + gain) / self.rsi_window
+                self._avg_loss = (self._avg_loss * (self.rsi_window - 1) + loss) / self.rsi_window
+        self._last_price = price
+
+        # EMAs seeded with the first price, matching pandas ewm(adjust=False)
+        if self._short_ema is None:
+            self._short_ema = self._long_ema = price
+            self._signal_ema = 0.0
+        else:
+            self._short_ema += self._short_alpha * (price - self._short_ema)
+            self._long_ema += self._long_alpha * (price - self._long_ema)
+            self._signal_ema += self._signal_alpha * ((self._short_ema - self._long_ema) - self._signal_ema)
+
+    def warm_up(self, prices: List[float]):
+        """
+        Resets the engine and replays a block of historical prices,
+        e.g. the closes returned by KrakenAPI.get_historical_prices.
+        """
+        self.reset()
+        for price in prices:
+            self.update(price)
+
+    # Scalars that, with the buffered prices, fully describe the engine
+    _STATE_FIELDS = ("count", "_window_sum", "_last_price", "_gain_sum", "_loss_sum",
+                     "_avg_gain", "_avg_loss", "_short_ema", "_long_ema", "_signal_ema")
+
+    def state(self) -> Dict:
+        """
+        Returns the running state (windows and accumulators) as plain values, e.g. for
+        a snapshot. The buffered prices are not included; see `prices.to_array()`.
+        """
+        state = {field.lstrip("_"): getattr(self, field) for field in self._STATE_FIELDS}
+        state["windows"] = [self.ma_window, self.rsi_window, self.short_window, self.long_window, self.signal_window]
+        return state
+
+    def restore(self, state: Dict, prices: np.ndarray):
+        """
+        Resumes from a `state()` and the prices buffered when it was taken, without
+        replaying history. Raises ValueError if the windows do not match this engine.
+        """
+        windows = [self.ma_window, self.rsi_window, self.short_window, self.long_window, self.signal_window]
+        if list(state["windows"]) != windows:
+            raise ValueError(f"Indicator state was taken with windows {state['windows']}, not {windows}.")
+        self.prices.load(prices)
+        for field in self._STATE_FIELDS:
+            setattr(self, field, state[field.lstrip("_")])
+
+    @property
+    def moving_average(self) -> Optional[float]:
+        if self.count < self.ma_window:
+            return None
+        return self._window_sum / self.ma_window
+
+    @property
+    def rsi(self) -> Optional[float]:
+        if self._avg_gain is None:
+            return None
+        if self._avg_loss == 0:
+            return 100.0
+        rs = self._avg_gain / self._avg_loss
+        return 100 - (100 / (1 + rs))
+
+    @property
+    def macd(self) -> Optional[tuple]:
+        if self.count < self.long_window:
+            return None, None
+        return self._short_ema - self._long_ema, self._signal_ema
+
+
+class BatchIndicators:
+    """
+    StreamingIndicators for many pairs at once. State is held in arrays with one
+    entry per pair, so each tick is a handful of vectorized operations no matter
+    how many pairs are tracked. Values are NaN until enough prices have been seen.
+    """
+    def __init__(self, n_pairs: int, ma_window: int = 7, rsi_window: int = 14, short_window: int = 12,
+                 long_window: int = 26, signal_window: int = 7):
+        self.n_pairs = n_pairs
+        self.ma_window = ma_window
+        self.rsi_window = rsi_window
+        self.short_window = short_window
+        self.long_window = long_window
+        self.signal_window = signal_window
+        self._short_alpha = 2.0 / (short_window + 1)
+        self._long_alpha = 2.0 / (long_window + 1)
+        self._signal_alpha = 2.0 / (signal_window + 1)
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        # Last ma_window prices per pair, written circularly
+        self._window = np.zeros((self.ma_window, self.n_pairs))
+        self._window_pos = 0
+        self._window_sum = np.zeros(self.n_pairs)
+        self._last_price = None
+        self._avg_gain = np.zeros(self.n_pairs)
+        self._avg_loss = np.zeros(self.n_pairs)
+        self._short_ema = None
+        self._long_ema = None
+        self._signal_ema = None
+
+    def warm_up(self, closes: np.ndarray):
+        """
+        Resets the engine from a (time x pairs) matrix of aligned historical closes,
+        computing every column in one vectorized pass.
+        """
+        closes = np.asarray(closes, dtype=np.float64)
+        self.reset()
+        if len(closes) <= self.rsi_window:
+            # Too short for the vectorized seeds; replay tick by tick instead
+            for row in closes:
+                self.update(row)
+            return
+        self.count = len(closes)
+        tail = closes[-self.ma_window:]
+        self._window[:len(tail)] = tail
+        self._window_pos = len(tail) % self.ma_window
+        self._window_sum = tail.sum(axis=0)
+        self._last_price = closes[-1].copy()
+        avg_gain, avg_loss = wilder_averages(closes, self.rsi_window)
+        self._avg_gain = avg_gain[-1].copy()
+        self._avg_loss = avg_loss[-1].copy()
+        self._short_ema = ema_series(closes, self.short_window)[-1]
+        self._long_ema = ema_series(closes, self.long_window)[-1]
+        self._signal_ema = ema_series(ema_series(closes, self.short_window) - ema_series(closes, self.long_window),
+                                      self.signal_window)[-1]
+
+    def update(self, prices: np.ndarray):
+        """
+        Feeds one new price per pair into every indicator.
+        """
+        prices = np.asarray(prices, dtype=np.float64)
+        self.count += 1
+
+        self._window_sum += prices - self._window[self._window_pos]
+        self._window[self._window_pos] = prices
+        self._window_pos = (self._window_pos + 1) % self.ma_window
+
+        if self._last_price is not None:
+            delta = prices - self._last_price
+            gain = np.maximum(delta, 0.0)
+            loss = np.maximum(-delta, 0.0)
+            n_deltas = self.count - 1
+            if n_deltas <= self.rsi_window:
+                # Accumulate sums for the simple-average seed
+                self._avg_gain += gain
+                self._avg_loss += loss
+                if n_deltas == self.rsi_window:
+                    self._avg_gain /= self.rsi_window
+                    self._avg_loss /= self.rsi_window
+            else:
+                self._avg_gain += (gain - self._avg_gain) / self.rsi_window
+                self._avg_loss += (loss - self._avg_loss) / self.rsi_window
+        self._last_price = prices.copy()
+
+        if self._short_ema is None:
+            self._short_ema = prices.copy()
+            self._long_ema = prices.copy()
+            self._signal_ema = np.zeros(self.n_pairs)
+        else:
+            self._short_ema += self._short_alpha * (prices - self._short_ema)
+            self._long_ema += self._long_alpha * (prices - self._long_ema)
+            self._signal_ema += self._signal_alpha * ((self._short_ema - self._long_ema) - self._signal_ema)
+
+    @property
+    def moving_average(self) -> np.ndarray:
+        if self.count < self.ma_window:
+            return np.full(self.n_pairs, np.nan)
+        return self._window_sum / self.ma_window
+
+    @property
+    def rsi(self) -> np.ndarray:
+        if self.count <= self.rsi_window:
+            return np.full(self.n_pairs, np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = 100 - (100 / (1 + self._avg_gain / self._avg_loss))
+        return np.where(self._avg_loss == 0, 100.0, rsi)
+
+    @property
+    def macd(self) -> tuple:
+        if self.count < self.long_window:
+            return np.full(self.n_pairs, np.nan), np.full(self.n_pairs, np.nan)
+        return self._short_ema - self._long_ema, self._signal_ema.copy()
+
+
 # Function to calculate potential profit or loss percentage
 def calculate_potential_profit_loss(current_price: float, previous_price: float) -> float:
     return ((current_price - previous_price) / previous_price) * 100.0
@@ -0,0 +1,303 @@
+import asyncio
+import json
+import sys
+import threading
+import time
+from typing import Optional, List, Dict, Callable
+import websockets
+from config import KRAKEN_WS_URL
+from logger_config import logger
+from order_book import OrderBook
+
+
+class KrakenMarketFeed:
+    """
+    Subscribes to Kraken's public WebSocket ticker, book and OHLC channels and keeps
+    the latest state in memory, so price, volume and order book lookups are served
+    locally instead of polling REST. Runs its own event loop in a background thread
+    and reconnects (resubscribing to every channel) whenever the socket drops.
+    """
+    def __init__(self, pair: str = "XBTUSDT", ws_pair: str = "XBT/USDT", url: str = KRAKEN_WS_URL,
+                 book_depth: int = 10, ohlc_interval: int = 60, max_age: float = 10.0):
+        self.pair = pair
+        self.ws_pair = ws_pair
+        self.url = url
+        self.book_depth = book_depth
+        self.ohlc_interval = ohlc_interval
+        # State older than max_age seconds is treated as stale and not served
+        self.max_age = max_age
+
+        self.ticker = None
+        self.book = OrderBook(book_depth)
+        # Guards the book, which is mutated on the feed thread and read elsewhere
+        self._book_lock = threading.Lock()
+        self.ohlc = None
+        self.last_update = {}
+        self.listeners: List[Callable[[str, float], None]] = []
+
+        self._loop = None
+        self._thread = None
+        self._websocket = None
+        self._stopped = threading.Event()
+        self._ready = threading.Event()
+
+    def subscriptions(self) -> List[Dict]:
+        return [
+            {"event": "subscribe", "pair": [self.ws_pair], "subscription": {"name": "ticker"}},
+            {"event": "subscribe", "pair": [self.ws_pair], "subscription": {"name": "book", "depth": self.book_depth}},
+            {"event": "subscribe", "pair": [self.ws_pair], "subscription": {"name": "ohlc", "interval": self.ohlc_interval}},
+        ]
+
+    def start(self):
+        """
+        Starts the feed in a background thread.
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._thread_main, name="kraken-ws", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stopped.set()
+        if self._loop and self._websocket:
+            asyncio.run_coroutine_threadsafe(self._websocket.close(), self._loop)
+        if self._thread:
+            self._thread.join(timeout)
+
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """
+        Blocks until ticker and book state have both been received.
+        """
+        return self._ready.wait(timeout)
+
+    def _thread_main(self):
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self.run())
+        finally:
+            self._loop.close()
+
+    async def run(self):
+        """
+        Connects, subscribes and consumes messages until stopped, reconnecting
+        with exponential backoff after any error, including a rejected handshake
+        or a message that cannot be applied.
+        """
+        backoff = 1.0
+        while not self._stopped.is_set():
+            try:
+                async with websockets.connect(self.url, ping_interval=20) as websocket:
+                    self._websocket = websocket
+                    logger.info("Connected to market data feed at %s", self.url)
+                    for subscription in self.subscriptions():
+                        await websocket.send(json.dumps(subscription))
+                    backoff = 1.0
+                    async for message in websocket:
+                        self.handle_message(message)
+            except (websockets.ConnectionClosed, OSError, asyncio.TimeoutError) as error:
+                if self._stopped.is_set():
+                    break
+                logger.warning("Market data feed disconnected: %s. Reconnecting in %.0fs.", error, backoff)
+            except Exception:
+                if self._stopped.is_set():
+                    break
+                logger.exception("Market data feed failed. Reconnecting in %.0fs.", backoff)
+            finally:
+                self._websocket = None
+                # Nothing is served as live until the new subscriptions deliver fresh state
+                self._ready.clear()
+                self.last_update.clear()
+            if not self._stopped.is_set():
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+
+    def handle_message(self, message: str):
+        """
+        Applies one raw WebSocket message to the in-memory state.
+        """
+        received_at = time.monotonic()
+        payload = json.loads(message)
+        if isinstance(payload, dict):
+            # Event messages: heartbeat, systemStatus, subscriptionStatus
+            if payload.get("event") == "subscriptionStatus" and payload.get("status") == "error":
+                logger.error("Subscription failed: %s", payload.get('errorMessage'))
+            return
+
+        channel_name = payload[-2]
+        if channel_name == "ticker":
+            self.ticker = payload[1]
+            channel = "ticker"
+        elif channel_name.startswith("book"):
+            if not self._apply_book_message(payload[1:-2]):
+                logger.warning("Order book checksum mismatch. Resubscribing to resync the book.")
+                self._resync()
+                return
+            channel = "book"
+        elif channel_name.startswith("ohlc"):
+            self.ohlc = payload[1]
+            channel = "ohlc"
+        else:
+            return
+
+        self.last_update[channel] = received_at
+        if "ticker" in self.last_update and "book" in self.last_update:
+            self._ready.set()
+        for listener in self.listeners:
+            listener(channel, received_at)
+
+    def _apply_book_message(self, updates: List[Dict]) -> bool:
+        # Snapshots use 'as'/'bs', incremental updates use 'a'/'b' and may be split
+        # over two objects, the last of which carries the checksum
+        with self._book_lock:
+            if any("as" in update or "bs" in update for update in updates):
+                snapshot = {key: value for update in updates for key, value in update.items()}
+                self.book.apply_snapshot(snapshot.get("as", []), snapshot.get("bs", []))
+                return True
+            asks = [level for update in updates for level in update.get("a", [])]
+            bids = [level for update in updates for level in update.get("b", [])]
+            checksum = next((update["c"] for update in updates if "c" in update), None)
+            return self.book.apply_update(asks, bids, checksum)
+
+    def _resync(self):
+        # Dropping the connection makes run() reconnect and receive a fresh snapshot
+        self.last_update.pop("book", None)
+        if self._websocket is not None:
+            asyncio.ensure_future(self._websocket.close())
+
+    def is_fresh(self, channel: str) -> bool:
+        updated = self.last_update.get(channel)
+        return updated is not None and time.monotonic() - updated <= self.max_age
+
+    def get_price(self) -> Optional[float]:
+        if not self.is_fresh("ticker"):
+            return None
+        return float(self.ticker["c"][0])
+
+    def get_volume(self) -> Optional[float]:
+        if not self.is_fresh("ticker"):
+            return None
+        return float(self.ticker["v"][1])
+
+    def get_book(self) -> Optional[OrderBook]:
+        """
+        Returns a copy of the local L2 book, safe to query from any thread.
+        """
+        if not self.is_fresh("book"):
+            return None
+        with self._book_lock:
+            return self.book.copy()
+
+    def get_order_book(self) -> Optional[Dict]:
+        """
+        Returns the book in the same shape as the REST Depth endpoint.
+        """
+        book = self.get_book()
+        return book.to_rest_dict() if book else None
+
+
+class ReplayServer:
+    """
+    Local stand-in for the Kraken WebSocket endpoint. Acknowledges subscriptions and
+    then replays recorded messages (one JSON message per line), so the feed can be
+    exercised and timed offline.
+    """
+    def __init__(self, messages: List[str], host: str = "127.0.0.1", port: int = 8765, interval: float = 0.0):
+        self.messages = messages
+        self.host = host
+        self.port = port
+        self.interval = interval
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "ReplayServer":
+        with open(path) as recording:
+            return cls([line.strip() for line in recording if line.strip()], **kwargs)
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    async def _handler(self, websocket, path=None):
+        async for message in websocket:
+            request = json.loads(message)
+            if request.get("event") != "subscribe":
+                continue
+            await websocket.send(json.dumps({
+                "event": "subscriptionStatus", "status": "subscribed",
+                "pair": request["pair"][0], "subscription": request["subscription"],
+            }))
+            # Start replaying once the last of the feed's subscriptions arrives
+            if request["subscription"]["name"] == "ohlc":
+                break
+        for message in self.messages:
+            await websocket.send(message)
+            if self.interval:
+                await asyncio.sleep(self.interval)
+        await websocket.wait_closed()
+
+    async def serve_forever(self):
+        async with websockets.serve(self._handler, self.host, self.port):
+            await asyncio.Future()
+
+
+async def record_messages(path: str, seconds: float, url: str = KRAKEN_WS_URL, ws_pair: str = "XBT/USDT"):
+    """
+    Records live market data messages to a file for later replay.
+    """
+    feed = KrakenMarketFeed(ws_pair=ws_pair, url=url)
+    deadline = time.monotonic() + seconds
+    async with websockets.connect(url) as websocket:
+        for subscription in feed.subscriptions():
+            await websocket.send(json.dumps(subscription))
+        with open(path, "w") as recording:
+            while time.monotonic() < deadline:
+                try:
+                    message = await asyncio.wait_for(websocket.recv(), deadline - time.monotonic())
+                except asyncio.TimeoutError:
+                    break
+                if isinstance(json.loads(message), list):
+                    recording.write(message + "\n")
+
+
+def measure_replay_latency(path: str, port: int = 8765) -> List[float]:
+    """
+    Replays a recording through a local server and returns the per-update latency
+    (seconds) between a message arriving and the feed serving it.
+    """
+    server = ReplayServer.from_file(path, port=port)
+    feed = KrakenMarketFeed(url=server.url)
+    latencies = []
+
+    def on_update(channel: str, received_at: float):
+        if channel == "ticker":
+            feed.get_price()
+        else:
+            feed.get_order_book()
+        latencies.append(time.monotonic() - received_at)
+
+    feed.listeners.append(on_update)
+
+    server_thread = threading.Thread(target=lambda: asyncio.run(server.serve_forever()), daemon=True)
+    server_thread.start()
+    time.sleep(0.2)
+    feed.start()
+    # Event messages such as heartbeats do not produce channel updates
+    expected = sum(1 for message in server.messages if isinstance(json.loads(message), list))
+    deadline = time.monotonic() + 30
+    while len(latencies) < expected and time.monotonic() < deadline:
+        time.sleep(0.05)
+    feed.stop()
+    return latencies
+
+
+if __name__ == "__main__":
+    # Usage: python kraken_ws.py record <file> <seconds> | python kraken_ws.py replay <file>
+    if len(sys.argv) >= 4 and sys.argv[1] == "record":
+        asyncio.run(record_messages(sys.argv[2], float(sys.argv[3])))
+    elif len(sys.argv) >= 3 and sys.argv[1] == "replay":
+        samples = sorted(measure_replay_latency(sys.argv[2]))
+        if samples:
+            logger.info("Replayed %s updates. p50 latency: %.1fus, p99 latency: %.1fus", len(samples),
+                        samples[len(samples) // 2] * 1e6, samples[int(len(samples) * 0.99)] * 1e6)
+    else:
+        print("Usage: python kraken_ws.py record <file> <seconds> | python kraken_ws.py replay <file>")
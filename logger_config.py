@@ -1,9 +1,91 @@
+import atexit
+import contextvars
+import itertools
+import json
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+from contextlib import contextmanager
+from datetime import datetime
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 import os
+from termcolor import colored
 
 # Set log level from environment variable, defaulting to INFO
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# "text" for the classic line format, "json" for one JSON object per line in the log file
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+
+# Correlation ID of the decision cycle the current thread or task is working on.
+# Executors started through contextvars.copy_context() inherit it.
+cycle_id: contextvars.ContextVar[str] = contextvars.ContextVar("cycle_id", default="-")
+_cycle_numbers = itertools.count(1)
+
+
+@contextmanager
+def correlation(prefix: str = "cycle"):
+    """
+    Stamps every record logged inside the block with a fresh ID such as "market-42",
+    so the lines of one cycle can be picked out of interleaved output.
+    """
+    token = cycle_id.set(f"{prefix}-{next(_cycle_numbers)}")
+    try:
+        yield cycle_id.get()
+    finally:
+        cycle_id.reset(token)
+
+
+class ColorFormatter(logging.Formatter):
+    """
+    Colors the message of records logged with extra={"color": ...}. Coloring happens
+    here, on the writer thread, and only for output that is actually emitted.
+    """
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        color = getattr(record, "color", None)
+        if color is None:
+            return super().formatMessage(record)
+        message = record.message
+        record.message = colored(message, color)
+        try:
+            return super().formatMessage(record)
+        finally:
+            record.message = message
+
+
+class JSONLinesFormatter(logging.Formatter):
+    """
+    One JSON object per record, for log shippers and ad-hoc `jq` queries.
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "cycle_id": getattr(record, "cycle_id", None),
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _CycleIdFilter(logging.Filter):
+    # Handler filters run in QueueHandler.handle on the calling thread, which is
+    # why the context variable is still visible here; stamp it before enqueueing
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.cycle_id = cycle_id.get()
+        return True
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    Enqueues the record untouched. The stock QueueHandler formats the message on the
+    calling thread; here message arguments are only merged and formatted by the
+    writer thread, so callers should pass values that are not mutated afterwards.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
 
 # Configure logger
 logger = logging.getLogger("trading_bot")
@@ -11,16 +93,28 @@ logger.setLevel(getattr(logging, LOG_LEVEL, logging.INFO))
 
 # Console handler for logger
 console_handler = logging.StreamHandler()
-console_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+console_formatter = ColorFormatter('%(asctime)s - %(name)s - %(levelname)s - [%(cycle_id)s] %(message)s')
 console_handler.setFormatter(console_formatter)
-logger.addHandler(console_handler)
 
 # Rotating file handler for persistent logging
 log_file = os.getenv("LOG_FILE", "trading_bot.log")
 log_handler = RotatingFileHandler(log_file, maxBytes=5*1024*1024, backupCount=2)
-file_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+if LOG_FORMAT == "json":
+    file_formatter = JSONLinesFormatter()
+else:
+    file_formatter = logging.Formatter('%(asctime)s - %(levelname)s - [%(cycle_id)s] %(message)s')
 log_handler.setFormatter(file_formatter)
-logger.addHandler(log_handler)
+
+# The trading threads only put records on a queue; a background listener does the
+# formatting and the console and disk writes, so I/O never stalls order placement
+log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+queue_handler = _DeferredQueueHandler(log_queue)
+queue_handler.addFilter(_CycleIdFilter())
+logger.addHandler(queue_handler)
+log_listener = QueueListener(log_queue, console_handler, log_handler, respect_handler_level=True)
+log_listener.start()
+# Drain whatever is still queued when the process exits
+atexit.register(log_listener.stop)
 
 # Disable propagation to prevent duplicate logs
-logger.propagate = False
\ No newline at end of file
+logger.propagate = False
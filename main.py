@@ -1,65 +1,83 @@
+import asyncio
+import sys
+import metrics
 from gpt_trading_decision import gpt_trading_decision
 from indicators import fetch_latest_news, calculate_sentiment, calculate_moving_average, calculate_rsi, calculate_macd
 from trading_strategy import trading_strategy
 from portfolio import rebalance_portfolio
-from api_kraken import KrakenAPI
-from logger_config import logger
-from config import API_KEY, API_SECRET, API_DOMAIN, SLEEP_DURATION
+from api_kraken import get_kraken_api
+from logger_config import logger, correlation
+from config import SLEEP_DURATION
+from runtime import TradingRuntime
 from version import __version__
 
-# Initialize Kraken API client
-kraken_api = KrakenAPI(API_KEY, API_SECRET, API_DOMAIN)
-
 
 def portfolio_manager():
-    
+    kraken_api = get_kraken_api()
+
     # Mock data for testing
-    latest_price = kraken_api.get_btc_price()
+    with metrics.span("get_btc_price"):
+        latest_price = kraken_api.get_btc_price()
     # Load initial historical data
     logger.info("Fetching historical BTC data...")
-    historical_prices = kraken_api.get_historical_prices()
+    with metrics.span("get_historical_prices"):
+        historical_prices = kraken_api.get_historical_prices()
     prices = historical_prices if historical_prices else []
     if not prices:
         logger.warning("No historical prices fetched, starting with an empty dataset.")
     else:
-        logger.info(f"Loaded {len(prices)} historical prices.")
+        logger.info("Loaded %s historical prices.", len(prices))
 
 
     # articles = fetch_latest_news()
     # sentiment = calculate_sentiment(articles)
     sentiment = 0.3 # Mock sentiment score
-    logger.info(f"Updated sentiment score: {sentiment}")
+    logger.info("Updated sentiment score: %s", sentiment)
 
     # Calculate technical indicators
     logger.info("Calculating technical indicators...")
-    moving_average = calculate_moving_average(prices)
-    rsi = calculate_rsi(prices)
-    macd, signal_line = calculate_macd(prices)
-    logger.info(f"Moving Average: {moving_average}")
-    logger.info(f"RSI: {rsi}")
-    logger.info(f"MACD: {macd}")
-    logger.info(f"Signal Line: {signal_line}")
+    with metrics.span("indicators"):
+        moving_average = calculate_moving_average(prices)
+        rsi = calculate_rsi(prices)
+        macd, signal_line = calculate_macd(prices)
+    logger.info("Moving Average: %s", moving_average)
+    logger.info("RSI: %s", rsi)
+    logger.info("MACD: %s", macd)
+    logger.info("Signal Line: %s", signal_line)
 
      # Rebalance the portfolio
     logger.info("Rebalancing portfolio...")
-    portfolio = rebalance_portfolio()
+    with metrics.span("rebalance_portfolio"):
+        portfolio = rebalance_portfolio()
 
 
-    decision = gpt_trading_decision(latest_price, historical_prices, sentiment, moving_average, rsi, macd, signal_line, portfolio)
+    with metrics.span("gpt_trading_decision"):
+        decision = gpt_trading_decision(latest_price, historical_prices, sentiment, moving_average, rsi, macd, signal_line, portfolio)
             # Display the current script version
     logger.info("Portfolio Manager %s", __version__)
     
         
    # Rebalance the portfolio
     logger.info("Rebalancing portfolio...")
-    rebalance_portfolio()
+    with metrics.span("rebalance_portfolio"):
+        rebalance_portfolio()
 
     # Execute the trading strategy
     logger.info("Executing trading strategy...")
-    logger.info(f"Trading Decision: {decision}")
+    logger.info("Trading Decision: %s", decision)
+    if metrics.enabled():
+        logger.info("Stage latencies: %s", metrics.summary())
   
     # trading_strategy(prices)
 
 
 if __name__ == "__main__":
-    portfolio_manager()
+    # `python main.py --once` runs a single pass; otherwise the bot runs until interrupted
+    if "--once" in sys.argv:
+        with correlation("once"):
+            portfolio_manager()
+    else:
+        try:
+            asyncio.run(TradingRuntime().run())
+        except KeyboardInterrupt:
+            logger.info("Runtime stopped.")
@@ -0,0 +1,280 @@
+import bisect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Dict, List, Tuple
+from config import METRICS_ENABLED, METRICS_HOST, METRICS_PORT
+from logger_config import logger
+
+# Bucket upper bounds in seconds, from sub-millisecond indicator math to slow LLM calls
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Quantiles estimated from each histogram and exported alongside it
+EXPORTED_QUANTILES = (0.5, 0.99)
+
+# Every recording call checks this first, so instrumentation costs one attribute
+# lookup and a branch while metrics are off
+_enabled = METRICS_ENABLED
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{str(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """
+    Monotonic counter with optional labels, e.g. calls per endpoint.
+    """
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues: str, amount: float = 1.0):
+        if not _enabled:
+            return
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def value(self, *labelvalues: str) -> float:
+        return self._values.get(labelvalues, 0.0)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labelvalues, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {value}")
+        return lines
+
+
+class Histogram:
+    """
+    Cumulative-bucket latency histogram in the Prometheus layout. Memory is fixed per
+    label set however many samples are observed, and quantiles are estimated by
+    interpolating within the bucket that contains them.
+    """
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last one is +Inf), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues: str):
+        if not _enabled:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *labelvalues: str) -> int:
+        series = self._series.get(labelvalues)
+        return series[2] if series else 0
+
+    def quantile(self, q: float, *labelvalues: str) -> Optional[float]:
+        """
+        Estimates the q-quantile (0 < q < 1) of the observed values, or None before
+        the first observation. Values beyond the largest bucket report its bound.
+        """
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if not series or not series[2]:
+                return None
+            counts, total = list(series[0]), series[2]
+        rank = q * total
+        cumulative = 0
+        for index, count in enumerate(counts):
+            if cumulative + count >= rank and count:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index]
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = sorted((labelvalues, list(series[0]), series[1], series[2])
+                              for labelvalues, series in self._series.items())
+        for labelvalues, counts, total_sum, total_count in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labelvalues, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {total_sum}")
+            lines.append(f"{self.name}_count{labels} {total_count}")
+        # Estimated quantiles go in a separate gauge family, since a histogram may not carry them
+        if snapshot:
+            quantile_name = f"{self.name}_quantile"
+            lines += [f"# HELP {quantile_name} Estimated quantiles of {self.name}",
+                      f"# TYPE {quantile_name} gauge"]
+            for labelvalues, _, _, _ in snapshot:
+                for q in EXPORTED_QUANTILES:
+                    labels = _format_labels(self.labelnames, labelvalues, f'quantile="{q}"')
+                    lines.append(f"{quantile_name}{labels} {self.quantile(q, *labelvalues)}")
+        return lines
+
+
+STAGE_SECONDS = Histogram("trading_bot_stage_seconds", "Time spent in each stage of the decision cycle", ("stage",))
+TICK_TO_ORDER_SECONDS = Histogram("trading_bot_tick_to_order_seconds",
+                                  "Time from receiving a price tick to the order being placed", ("pair",))
+API_REQUESTS = Counter("trading_bot_api_requests_total", "Kraken REST requests sent, per endpoint", ("endpoint",))
+API_CACHE_HITS = Counter("trading_bot_api_cache_hits_total", "Kraken REST calls answered from the response cache",
+                         ("endpoint",))
+API_RETRIES = Counter("trading_bot_api_retries_total", "Kraken REST requests retried after a failure", ("endpoint",))
+API_ERRORS = Counter("trading_bot_api_errors_total", "Kraken REST requests that failed, per endpoint and kind",
+                     ("endpoint", "kind"))
+API_REQUEST_SECONDS = Histogram("trading_bot_api_request_seconds", "Kraken REST round-trip time per endpoint",
+                                ("endpoint",))
+RULE_DECISIONS = Counter("trading_bot_rule_decisions_total",
+                         "Strategy decisions per rule set (live and shadow) and action", ("rule_set", "action"))
+
+REGISTRY = [STAGE_SECONDS, TICK_TO_ORDER_SECONDS, API_REQUESTS, API_CACHE_HITS, API_RETRIES, API_ERRORS,
+            API_REQUEST_SECONDS, RULE_DECISIONS]
+
+
+class _Span:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        STAGE_SECONDS.observe(time.perf_counter() - self.start, self.stage)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(stage: str):
+    """
+    Times a `with` block as one stage of the decision cycle. While metrics are off
+    this returns a shared no-op, so nothing is allocated or timed.
+    """
+    return _Span(stage) if _enabled else _NULL_SPAN
+
+
+def render() -> str:
+    """
+    Returns every metric in the Prometheus text exposition format.
+    """
+    lines = []
+    for metric in REGISTRY:
+        lines += metric.expose()
+    return "\n".join(lines) + "\n"
+
+
+def summary() -> str:
+    """
+    One-line p50/p99 digest of the stage and tick-to-order histograms, for the log.
+    """
+    parts = []
+    for prefix, histogram in (("", STAGE_SECONDS), ("tick_to_order ", TICK_TO_ORDER_SECONDS)):
+        for labelvalues in sorted(histogram._series):
+            p50, p99 = (histogram.quantile(q, *labelvalues) for q in EXPORTED_QUANTILES)
+            parts.append(f"{prefix}{'/'.join(labelvalues)}: p50={p50 * 1000:.1f}ms p99={p99 * 1000:.1f}ms")
+    return ", ".join(parts)
+
+
+def reset():
+    for metric in REGISTRY:
+        metric.reset()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("[metrics] %s %s", self.address_string(), format % args)
+
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+
+
+def start_server(host: str = METRICS_HOST, port: int = METRICS_PORT) -> ThreadingHTTPServer:
+    """
+    Enables metrics and serves them at http://host:port/metrics from a daemon thread.
+    Calling it again returns the running server.
+    """
+    global _server
+    with _server_lock:
+        if _server is None:
+            enable()
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+            logger.info("Serving metrics at http://%s:%s/metrics", host, _server.server_address[1])
+    return _server
+
+
+def stop_server():
+    global _server
+    with _server_lock:
+        if _server is not None:
+            _server.shutdown()
+            _server.server_close()
+            _server = None
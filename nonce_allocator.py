@@ -0,0 +1,87 @@
+import hashlib
+import os
+import threading
+import time
+from typing import Dict
+from config import KRAKEN_NONCE_FILE
+from logger_config import logger
+
+# Nonces reserved per write of the high-water mark. At most this many values are
+# skipped after a restart, and the file is written once per block, not per call.
+NONCE_RESERVE = 10_000
+
+
+class NonceAllocator:
+    """
+    Thread-safe source of strictly increasing nonces for one API key. Nonces follow
+    the millisecond clock but never repeat: calls within the same millisecond, from
+    any thread, get consecutive values ahead of it.
+
+    A reserved high-water mark is persisted with an atomic write, so nonces keep
+    increasing across restarts even if the clock steps back.
+    """
+    def __init__(self, path: str = KRAKEN_NONCE_FILE, reserve: int = NONCE_RESERVE):
+        self.path = path
+        self.reserve = reserve
+        self._lock = threading.Lock()
+        self._last = 0
+        self._reserved = 0
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as nonce_file:
+                self._last = self._reserved = int(nonce_file.read().strip() or 0)
+        except (OSError, ValueError) as error:
+            logger.warning("Ignoring unreadable nonce file %s: %s", self.path, error)
+
+    def _save(self, reserved: int):
+        if not self.path:
+            return
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w") as nonce_file:
+                nonce_file.write(str(reserved))
+                nonce_file.flush()
+                os.fsync(nonce_file.fileno())
+            os.replace(tmp_path, self.path)
+        except OSError as error:
+            logger.warning("Could not persist nonce high-water mark: %s", error)
+
+    def next(self) -> int:
+        with self._lock:
+            nonce = max(int(time.time() * 1000), self._last + 1)
+            self._last = nonce
+            if nonce > self._reserved:
+                # Reserving ahead keeps disk writes off almost every call
+                self._reserved = nonce + self.reserve
+                self._save(self._reserved)
+            return nonce
+
+
+_allocators: Dict[str, NonceAllocator] = {}
+_allocators_lock = threading.Lock()
+
+
+def nonce_file_for(api_key: str, path: str = KRAKEN_NONCE_FILE) -> str:
+    """
+    Each key persists its own high-water mark: a short hash of the key is appended
+    to the configured path, so the key itself never ends up in a file name.
+    """
+    if not path:
+        return path
+    return f"{path}.{hashlib.sha256(api_key.encode()).hexdigest()[:16]}"
+
+
+def get_nonce_allocator(api_key: str, path: str = KRAKEN_NONCE_FILE) -> NonceAllocator:
+    """
+    Returns the process-wide allocator for an API key, so every client using the
+    key draws from one sequence.
+    """
+    with _allocators_lock:
+        allocator = _allocators.get(api_key)
+        if allocator is None:
+            allocator = _allocators[api_key] = NonceAllocator(nonce_file_for(api_key, path))
+        return allocator
@@ -0,0 +1,211 @@
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Optional, List, Dict, Tuple, Union, Callable
+import numpy as np
+from candle_store import OHLC_COLUMNS
+from indicators import sma_series, ema_series, rsi_series, macd_series, _ewm
+
+# One record per candle in Kraken's column order: 64 bytes a row, against several
+# hundred for a dict of Python floats
+OHLCV_DTYPE = np.dtype(list(OHLC_COLUMNS.items()))
+
+# Series (or candle arrays) whose indicator results are kept, least recently used first out
+MEMO_MAX_SERIES = 256
+
+Series = Union[np.ndarray, List[float]]
+
+
+def from_kraken_rows(rows: List[List]) -> np.ndarray:
+    """
+    Converts raw Kraken OHLC rows [time, open, high, low, close, vwap, volume, count]
+    (prices arrive as strings) into an OHLCV record array, one column at a time.
+    """
+    candles = np.empty(len(rows), dtype=OHLCV_DTYPE)
+    if rows:
+        table = np.array([row[:len(OHLC_COLUMNS)] for row in rows], dtype=object)
+        for index, (name, dtype) in enumerate(OHLC_COLUMNS.items()):
+            candles[name] = table[:, index].astype(np.float64).astype(dtype)
+    return candles
+
+
+def from_columns(columns: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    Packs column arrays (e.g. CandleStore.to_dict()) into an OHLCV record array.
+    """
+    length = len(columns["close"])
+    candles = np.empty(length, dtype=OHLCV_DTYPE)
+    for name in OHLC_COLUMNS:
+        if name in columns:
+            candles[name] = columns[name]
+    return candles
+
+
+# --- Memoization on series identity ---
+
+_memo: "OrderedDict[tuple, Tuple[weakref.ref, Dict]]" = OrderedDict()
+_memo_lock = threading.Lock()
+
+
+def _identity(array: np.ndarray) -> Tuple[tuple, np.ndarray]:
+    # Views of the same memory share a key, so candles["close"] taken twice still hits.
+    # The owning array is tracked so the entry goes away, and can never be matched
+    # by a new array at the same address, once the data is freed.
+    owner = array
+    while isinstance(owner.base, np.ndarray):
+        owner = owner.base
+    interface = array.__array_interface__
+    return (interface["data"][0], array.shape, array.strides, array.dtype.str), owner
+
+
+def _forget(key: tuple):
+    with _memo_lock:
+        _memo.pop(key, None)
+
+
+def _memoized(name: str, array: np.ndarray, params: tuple, compute: Callable[[], object]):
+    """
+    Returns the cached result of indicator `name` with `params` on this exact series,
+    computing it on the first call. Series are treated as immutable: results are
+    returned read-only, and a series modified in place must be passed as a new array.
+    """
+    key, owner = _identity(array)
+    with _memo_lock:
+        entry = _memo.get(key)
+        if entry is not None and entry[0]() is owner:
+            _memo.move_to_end(key)
+            results = entry[1]
+            if (name, params) in results:
+                return results[(name, params)]
+        else:
+            results = {}
+            try:
+                _memo[key] = (weakref.ref(owner, lambda _, key=key: _forget(key)), results)
+            except TypeError:
+                # Not weak-referenceable, so it cannot be tracked safely; compute every time
+                return compute()
+            while len(_memo) > MEMO_MAX_SERIES:
+                _memo.popitem(last=False)
+    result = compute()
+    for part in (result if isinstance(result, tuple) else (result,)):
+        part.setflags(write=False)
+    with _memo_lock:
+        results[(name, params)] = result
+    return result
+
+
+def clear_memo():
+    with _memo_lock:
+        _memo.clear()
+
+
+def closes_of(series: Series) -> np.ndarray:
+    array = np.asarray(series, dtype=np.float64) if not isinstance(series, np.ndarray) else series
+    if array.dtype.names:
+        return array["close"]
+    return array if array.dtype == np.float64 else array.astype(np.float64)
+
+
+# --- Indicators ---
+# Every function returns full series aligned with its input, NaN until enough data.
+# Single-series indicators take closes or an OHLCV array (its close column is used).
+
+def sma(series: Series, window: int = 7) -> np.ndarray:
+    closes = closes_of(series)
+    return _memoized("sma", closes, (window,), lambda: sma_series(closes, window))
+
+
+def ema(series: Series, span: int = 12) -> np.ndarray:
+    closes = closes_of(series)
+    return _memoized("ema", closes, (span,), lambda: ema_series(closes, span))
+
+
+def rsi(series: Series, window: int = 14) -> np.ndarray:
+    """
+    Wilder RSI, the same values StreamingIndicators produces tick by tick.
+    """
+    closes = closes_of(series)
+    return _memoized("rsi", closes, (window,), lambda: rsi_series(closes, window))
+
+
+def macd(series: Series, short_window: int = 12, long_window: int = 26, signal_window: int = 7) -> tuple:
+    """
+    Returns (macd, signal, histogram).
+    """
+    closes = closes_of(series)
+
+    def compute():
+        line, signal = macd_series(closes, short_window, long_window, signal_window)
+        return line, signal, line - signal
+    return _memoized("macd", closes, (short_window, long_window, signal_window), compute)
+
+
+def bollinger(series: Series, window: int = 20, num_std: float = 2.0) -> tuple:
+    """
+    Returns (middle, upper, lower): the SMA plus and minus `num_std` population
+    standard deviations over the same window.
+    """
+    closes = closes_of(series)
+
+    def compute():
+        middle = sma(closes, window)
+        deviation = np.full(closes.shape, np.nan)
+        if len(closes) >= window:
+            deviation[window - 1:] = np.lib.stride_tricks.sliding_window_view(closes, window).std(axis=1)
+        return middle, middle + num_std * deviation, middle - num_std * deviation
+    return _memoized("bollinger", closes, (window, num_std), compute)
+
+
+def true_range(candles: np.ndarray) -> np.ndarray:
+    def compute():
+        high, low, close = candles["high"], candles["low"], candles["close"]
+        ranges = high - low
+        if len(candles) > 1:
+            previous = close[:-1]
+            ranges[1:] = np.maximum.reduce((ranges[1:], np.abs(high[1:] - previous), np.abs(low[1:] - previous)))
+        return ranges
+    return _memoized("true_range", candles, (), compute)
+
+
+def atr(candles: np.ndarray, window: int = 14) -> np.ndarray:
+    """
+    Wilder's average true range: a simple mean of the first `window` true ranges,
+    Wilder-smoothed afterwards.
+    """
+    def compute():
+        ranges = true_range(candles)
+        result = np.full(len(candles), np.nan)
+        if len(candles) >= window:
+            seeded = np.concatenate(([ranges[:window].mean()], ranges[window:]))
+            result[window - 1:] = _ewm(seeded, alpha=1.0 / window)
+        return result
+    return _memoized("atr", candles, (window,), compute)
+
+
+def vwap(candles: np.ndarray, window: Optional[int] = None) -> np.ndarray:
+    """
+    Volume-weighted average price from each candle's own vwap and volume, cumulative
+    from the first candle or over a rolling `window`. NaN while no volume has traded.
+    """
+    def compute():
+        traded = np.cumsum(candles["vwap"] * candles["volume"])
+        volume = np.cumsum(candles["volume"])
+        if window is not None:
+            traded[window:] = traded[window:] - traded[:-window]
+            volume[window:] = volume[window:] - volume[:-window]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result = np.where(volume > 0, traded / volume, np.nan)
+        if window is not None:
+            result[:window - 1] = np.nan
+        return result
+    return _memoized("vwap", candles, (window,), compute)
+
+
+def obv(candles: np.ndarray) -> np.ndarray:
+    """
+    On-balance volume, starting from 0 at the first candle.
+    """
+    def compute():
+        direction = np.sign(np.diff(candles["close"]))
+        return np.concatenate(([0.0], np.cumsum(direction * candles["volume"][1:])))
+    return _memoized("obv", candles, (), compute)
@@ -0,0 +1,118 @@
+import json
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from logger_config import logger
+
+
+class OpenAIStubServer:
+    """
+    Local stand-in for the OpenAI chat completions endpoint. Replies with a scripted
+    message, streamed token by token when the request asks for it, with configurable
+    time-to-first-token and per-token delays. Point the bot at it with
+    OPENAI_BASE_URL=http://127.0.0.1:<port>/v1.
+    """
+    def __init__(self, reply: str = "ACTION: HOLD\nREASON: Indicators are mixed and sentiment is neutral.",
+                 host: str = "127.0.0.1", port: int = 8900, first_token_delay: float = 0.2, token_delay: float = 0.02):
+        self.reply = reply
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.requests = []
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="openai-stub", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _tokens(self):
+        # Split on whitespace but keep it, so the streamed text reassembles exactly
+        token = ""
+        for char in self.reply:
+            token += char
+            if char.isspace():
+                yield token
+                token = ""
+        if token:
+            yield token
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                stub.requests.append(body)
+                if not self.path.endswith("/chat/completions"):
+                    self.send_error(404)
+                    return
+                time.sleep(stub.first_token_delay)
+                if body.get("stream"):
+                    self._stream(body)
+                else:
+                    self._complete(body)
+
+            def _complete(self, body):
+                payload = json.dumps({
+                    "id": "chatcmpl-stub", "object": "chat.completion", "created": int(time.time()),
+                    "model": body.get("model", "gpt-4"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": stub.reply}, "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                }).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _stream(self, body):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+
+                def send_chunk(delta, finish_reason=None):
+                    chunk = {
+                        "id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                        "model": body.get("model", "gpt-4"),
+                        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.flush()
+
+                try:
+                    send_chunk({"role": "assistant", "content": ""})
+                    for token in stub._tokens():
+                        send_chunk({"content": token})
+                        time.sleep(stub.token_delay)
+                    send_chunk({}, "stop")
+                    self.wfile.write(b"data: [DONE]\n\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client stopped reading, e.g. after its deadline passed
+                    pass
+
+        return Handler
+
+
+if __name__ == "__main__":
+    # Usage: python openai_stub.py [port]
+    server = OpenAIStubServer(port=int(sys.argv[1]) if len(sys.argv) > 1 else 8900)
+    server.start()
+    logger.info("OpenAI stand-in listening at %s", server.base_url)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
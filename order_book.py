@@ -0,0 +1,156 @@
+import operator
+import zlib
+from itertools import islice
+from typing import Optional, List, Dict
+from sortedcontainers import SortedDict
+
+
+def _checksum_field(value: str) -> str:
+    # Kraken checksums use the price/volume strings with the decimal point
+    # and leading zeros removed
+    return value.replace('.', '').lstrip('0')
+
+
+class OrderBook:
+    """
+    In-memory L2 order book. Price levels are kept sorted (asks ascending, bids
+    descending) with O(log n) insert and delete, and incremental updates can be
+    validated against Kraken's CRC32 book checksum.
+    """
+    def __init__(self, depth: int = 10):
+        self.depth = depth
+        # price -> (price string, volume string); strings are kept for checksums
+        self.asks = SortedDict()
+        self.bids = SortedDict(operator.neg)
+
+    @classmethod
+    def from_rest(cls, order_book: Dict, depth: Optional[int] = None) -> "OrderBook":
+        """
+        Builds a book from a REST Depth result ({'asks': [[price, volume, ts], ...], 'bids': ...}).
+        """
+        book = cls(depth or max(len(order_book.get('asks', [])), len(order_book.get('bids', [])), 1))
+        book.apply_snapshot(order_book.get('asks', []), order_book.get('bids', []))
+        return book
+
+    def copy(self) -> "OrderBook":
+        book = OrderBook(self.depth)
+        book.asks.update(self.asks)
+        book.bids.update(self.bids)
+        return book
+
+    def apply_snapshot(self, asks: List[List], bids: List[List]):
+        self.asks.clear()
+        self.bids.clear()
+        self._apply_levels(self.asks, asks)
+        self._apply_levels(self.bids, bids)
+        self._truncate()
+
+    def apply_update(self, asks: Optional[List[List]] = None, bids: Optional[List[List]] = None,
+                     checksum: Optional[str] = None) -> bool:
+        """
+        Applies incremental level updates. Returns False when a checksum is supplied
+        and does not match the resulting book, meaning the book must be resynced.
+        """
+        self._apply_levels(self.asks, asks or [])
+        self._apply_levels(self.bids, bids or [])
+        self._truncate()
+        if checksum is not None:
+            return self.checksum() == int(checksum)
+        return True
+
+    @staticmethod
+    def _apply_levels(side: SortedDict, levels: List[List]):
+        for level in levels:
+            price_str, volume_str = str(level[0]), str(level[1])
+            price = float(price_str)
+            if float(volume_str) == 0:
+                side.pop(price, None)
+            else:
+                side[price] = (price_str, volume_str)
+
+    def _truncate(self):
+        for side in (self.asks, self.bids):
+            while len(side) > self.depth:
+                side.popitem()
+
+    def checksum(self) -> int:
+        """
+        CRC32 of the top 10 asks followed by the top 10 bids.
+        """
+        parts = []
+        for side in (self.asks, self.bids):
+            for price_str, volume_str in islice(side.values(), 10):
+                parts.append(_checksum_field(price_str))
+                parts.append(_checksum_field(volume_str))
+        return zlib.crc32(''.join(parts).encode()) & 0xffffffff
+
+    def best_ask(self) -> Optional[float]:
+        return self.asks.peekitem(0)[0] if self.asks else None
+
+    def best_bid(self) -> Optional[float]:
+        return self.bids.peekitem(0)[0] if self.bids else None
+
+    def mid_price(self) -> Optional[float]:
+        best_ask, best_bid = self.best_ask(), self.best_bid()
+        if best_ask is None or best_bid is None:
+            return None
+        return (best_ask + best_bid) / 2
+
+    def spread(self) -> Optional[float]:
+        best_ask, best_bid = self.best_ask(), self.best_bid()
+        if best_ask is None or best_bid is None:
+            return None
+        return best_ask - best_bid
+
+    def spread_bps(self) -> Optional[float]:
+        spread, mid = self.spread(), self.mid_price()
+        if spread is None or not mid:
+            return None
+        return spread / mid * 10000
+
+    def average_fill_price(self, side: str, volume: float) -> Optional[float]:
+        """
+        Volume-weighted average price for immediately filling `volume` against the book.
+        A buy walks the asks and a sell walks the bids. Returns None if the visible
+        depth cannot absorb the whole volume.
+        """
+        levels = self.asks if side == "buy" else self.bids
+        remaining = volume
+        cost = 0.0
+        for price, (_, volume_str) in levels.items():
+            fill = min(remaining, float(volume_str))
+            cost += fill * price
+            remaining -= fill
+            if remaining <= 0:
+                return cost / volume
+        return None
+
+    def depth_within_bps(self, side: str, bps: float) -> float:
+        """
+        Total volume resting within `bps` basis points of the mid price on one side.
+        """
+        mid = self.mid_price()
+        if mid is None:
+            return 0.0
+        if side == "buy":
+            levels, limit = self.asks, mid * (1 + bps / 10000)
+            within = operator.le
+        else:
+            levels, limit = self.bids, mid * (1 - bps / 10000)
+            within = operator.ge
+        total = 0.0
+        # Levels are sorted best-first, so stop at the first one outside the band
+        for price, (_, volume_str) in levels.items():
+            if not within(price, limit):
+                break
+            total += float(volume_str)
+        return total
+
+    def to_rest_dict(self) -> Dict:
+        """
+        Returns the book in the same shape as the REST Depth endpoint (without timestamps).
+        """
+        return {
+            'asks': [[price_str, volume_str] for price_str, volume_str in self.asks.values()],
+            'bids': [[price_str, volume_str] for price_str, volume_str in self.bids.values()],
+        }
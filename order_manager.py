@@ -0,0 +1,432 @@
+import asyncio
+import itertools
+import json
+import threading
+import time
+from typing import Optional, List, Dict, Callable
+import websockets
+from api_kraken import KrakenAPI, get_kraken_api
+from config import KRAKEN_WS_AUTH_URL, ORDER_REPRICE_BPS
+from logger_config import logger
+from order_book import OrderBook
+from private_dispatcher import PrivateDispatcher
+
+# Kraken order statuses after which an order can no longer fill
+CLOSED_STATUSES = ("closed", "canceled", "expired")
+
+# AddOrderBatch accepts between 2 and 15 orders for a single pair
+MAX_BATCH_SIZE = 15
+
+
+class Order:
+    """
+    Local view of one exchange order, kept current from the private WebSocket feed.
+    """
+    def __init__(self, pair: str, side: str, volume: float, price: Optional[float], ordertype: str = "limit",
+                 userref: Optional[int] = None):
+        self.pair = pair
+        self.side = side
+        self.volume = volume
+        self.price = price
+        self.ordertype = ordertype
+        self.userref = userref
+        self.txid = None
+        self.status = "pending"
+        self.filled_volume = 0.0
+        self.avg_price = None
+        self.fee = 0.0
+        # tradeid -> (price, volume) for every fill seen on ownTrades
+        self.fills: Dict[str, tuple] = {}
+        self.replaced_by = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+
+    @property
+    def remaining(self) -> float:
+        return max(0.0, self.volume - self.filled_volume)
+
+    @property
+    def is_open(self) -> bool:
+        return self.status in ("pending", "open")
+
+    def __repr__(self) -> str:
+        return (f"Order({self.txid}, {self.side} {self.volume} {self.pair} @ {self.price}, {self.status}, "
+                f"filled {self.filled_volume})")
+
+
+class OrderManager:
+    """
+    Submits, cancels and reprices orders through the REST API and tracks their state
+    and fills from Kraken's private openOrders and ownTrades WebSocket channels, so
+    fill confirmation never needs OpenOrders polling.
+
+    Listeners are called as listener(order, event) with event one of "fill",
+    "closed", "canceled", "expired" or "replaced", on the WebSocket thread for
+    stream events and on the caller's thread for REST ones.
+    """
+    def __init__(self, kraken_api: Optional[KrakenAPI] = None, ws_url: str = KRAKEN_WS_AUTH_URL,
+                 reprice_bps: float = ORDER_REPRICE_BPS):
+        self.kraken_api = kraken_api if kraken_api else get_kraken_api()
+        # Batches and reprices go out concurrently; the client keeps their nonces ordered
+        self.dispatcher = PrivateDispatcher(self.kraken_api)
+        self.ws_url = ws_url
+        self.reprice_bps = reprice_bps
+        self.orders: Dict[str, Order] = {}
+        self.listeners: List[Callable[[Order, str], None]] = []
+        # Orders submitted but not yet acknowledged with a txid, by userref
+        self._pending: Dict[int, Order] = {}
+        # Stream updates that arrived before the AddOrder reply that names their txid
+        self._early_updates: Dict[str, List[tuple]] = {}
+        self._userrefs = itertools.count(int(time.time()) % 1_000_000 * 1000)
+        self._lock = threading.RLock()
+
+        self._loop = None
+        self._thread = None
+        self._websocket = None
+        self._stopped = threading.Event()
+        self._ready = threading.Event()
+
+    # --- REST ---
+
+    def _next_userref(self) -> int:
+        # userref is a signed 32-bit integer on Kraken
+        return next(self._userrefs) % 2_147_483_647
+
+    def _order_fields(self, order: Order) -> Dict:
+        fields = {"type": order.side, "ordertype": order.ordertype, "volume": order.volume, "userref": order.userref}
+        if order.price is not None:
+            fields["price"] = order.price
+        return fields
+
+    def _register(self, order: Order, txid: str):
+        with self._lock:
+            order.txid = txid
+            if order.status == "pending":
+                order.status = "open"
+            self.orders[txid] = order
+            self._pending.pop(order.userref, None)
+            early = self._early_updates.pop(txid, [])
+            if not self._pending:
+                # Nothing else is awaiting a txid, so the rest belong to other clients
+                self._early_updates.clear()
+        for channel, info in early:
+            self._apply(order, channel, info)
+
+    def optimal_price(self, pair: str, side: str, volume: float, book: Optional[OrderBook] = None) -> Optional[float]:
+        if book is None:
+            feed = self.kraken_api._feed_for(pair)
+            book = feed.get_book() if feed else None
+        if book is None:
+            book = self.kraken_api.get_order_book(pair)
+        if not book:
+            return None
+        return self.kraken_api.get_optimal_price(book, side, volume=volume)
+
+    def submit(self, side: str, volume: float, price: Optional[float] = None, pair: str = "XBTUSDT",
+               ordertype: str = "limit") -> Optional[Order]:
+        """
+        Places one order. Limit orders without a price are priced from the current book.
+        """
+        if ordertype == "limit" and price is None:
+            price = self.optimal_price(pair, side, volume)
+            if price is None:
+                logger.error("No order book for %s; not placing %s order.", pair, side)
+                return None
+        order = Order(pair, side, volume, price, ordertype, self._next_userref())
+        with self._lock:
+            self._pending[order.userref] = order
+        result = self.kraken_api._make_request(method="AddOrder", path="/0/private/",
+                                               data=dict(self._order_fields(order), pair=pair), is_private=True)
+        if not result or not result.get("txid"):
+            with self._lock:
+                self._pending.pop(order.userref, None)
+            order.status = "rejected"
+            logger.error("Order rejected: %s %s %s @ %s", side, volume, pair, price)
+            return None
+        self._register(order, result["txid"][0])
+        logger.info("Placed %s", order)
+        return order
+
+    def submit_batch(self, orders: List[Dict], pair: str = "XBTUSDT") -> List[Optional[Order]]:
+        """
+        Places several orders on one pair with as few AddOrderBatch calls as possible,
+        sending the batches concurrently. Each entry holds side, volume and optionally
+        price and ordertype. The returned list matches the input, with None for any
+        order the exchange rejected.
+        """
+        chunks = [self.dispatcher.run(self._submit_chunk, orders[start:start + MAX_BATCH_SIZE], pair)
+                  for start in range(0, len(orders), MAX_BATCH_SIZE)]
+        placed = [order for chunk in chunks for order in chunk.result()]
+        logger.info("Placed %s/%s batch orders on %s.", sum(order is not None for order in placed), len(orders), pair)
+        return placed
+
+    def _submit_chunk(self, chunk: List[Dict], pair: str) -> List[Optional[Order]]:
+        slots: List[Optional[Order]] = []
+        for entry in chunk:
+            price = entry.get("price")
+            ordertype = entry.get("ordertype", "limit")
+            if ordertype == "limit" and price is None:
+                price = self.optimal_price(pair, entry["side"], entry["volume"])
+                if price is None:
+                    logger.error("No order book for %s; leaving %s %s out of the batch.", pair, entry["side"],
+                                 entry["volume"])
+                    slots.append(None)
+                    continue
+            slots.append(Order(pair, entry["side"], entry["volume"], price, ordertype, self._next_userref()))
+        batch = [order for order in slots if order is not None]
+        if len(batch) < 2:
+            # AddOrderBatch takes at least two orders
+            return [self.submit(order.side, order.volume, order.price, pair, order.ordertype)
+                    if order is not None else None for order in slots]
+        data = {"pair": pair}
+        with self._lock:
+            for index, order in enumerate(batch):
+                self._pending[order.userref] = order
+                for field, value in self._order_fields(order).items():
+                    # AddOrderBatch names the order side "type" like AddOrder does
+                    data[f"orders[{index}][{field}]"] = value
+        result = self.kraken_api._make_request(method="AddOrderBatch", path="/0/private/", data=data,
+                                               is_private=True)
+        replies = (result or {}).get("orders", [])
+        for index, order in enumerate(batch):
+            reply = replies[index] if index < len(replies) else {}
+            if reply.get("txid"):
+                self._register(order, reply["txid"])
+            else:
+                with self._lock:
+                    self._pending.pop(order.userref, None)
+                order.status = "rejected"
+                logger.error("Batch order rejected: %s (%s)", order, reply.get('error'))
+        return [order if order is not None and order.status != "rejected" else None for order in slots]
+
+    def cancel(self, txid: str) -> bool:
+        result = self.kraken_api._make_request(method="CancelOrder", path="/0/private/", data={"txid": txid},
+                                               is_private=True)
+        if not result or not result.get("count"):
+            return False
+        with self._lock:
+            order = self.orders.get(txid)
+        if order is not None and order.is_open:
+            self._set_status(order, "canceled")
+        return True
+
+    def replace(self, txid: str, price: float, volume: Optional[float] = None) -> Optional[Order]:
+        """
+        Moves an open order to a new price with EditOrder. The replacement carries the
+        unfilled volume unless a new volume is given.
+        """
+        with self._lock:
+            order = self.orders.get(txid)
+        if order is None or not order.is_open:
+            return None
+        new_volume = volume if volume is not None else order.remaining
+        replacement = Order(order.pair, order.side, new_volume, price, order.ordertype, self._next_userref())
+        with self._lock:
+            self._pending[replacement.userref] = replacement
+        result = self.kraken_api._make_request(method="EditOrder", path="/0/private/", data={
+            "txid": txid, "pair": order.pair, "price": price, "volume": new_volume, "userref": replacement.userref,
+        }, is_private=True)
+        if not result or not result.get("txid"):
+            with self._lock:
+                self._pending.pop(replacement.userref, None)
+            logger.warning("Could not reprice %s to %s.", txid, price)
+            return None
+        order.replaced_by = result["txid"]
+        self._set_status(order, "replaced")
+        self._register(replacement, result["txid"])
+        logger.info("Repriced %s -> %s", txid, replacement)
+        return replacement
+
+    def open_orders(self, pair: Optional[str] = None) -> List[Order]:
+        with self._lock:
+            return [order for order in self.orders.values() if order.is_open and (pair is None or order.pair == pair)]
+
+    def reprice(self, pair: Optional[str] = None) -> int:
+        """
+        Replaces every open limit order whose price is more than `reprice_bps` away
+        from the current optimal price, with the EditOrder calls in flight together.
+        Returns the number of orders replaced.
+        """
+        replacements = []
+        for order in self.open_orders(pair):
+            if order.ordertype != "limit" or not order.price or not order.remaining:
+                continue
+            target = self.optimal_price(order.pair, order.side, order.remaining)
+            if target is None or abs(target - order.price) / order.price * 10_000 <= self.reprice_bps:
+                continue
+            replacements.append(self.dispatcher.run(self.replace, order.txid, target))
+        return sum(1 for replacement in replacements if replacement.result())
+
+    # --- Private WebSocket ---
+
+    def start(self):
+        """
+        Starts tracking orders and fills in a background thread.
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._thread_main, name="kraken-ws-auth", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stopped.set()
+        if self._loop and self._websocket:
+            asyncio.run_coroutine_threadsafe(self._websocket.close(), self._loop)
+        if self._thread:
+            self._thread.join(timeout)
+
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """
+        Blocks until the openOrders snapshot has been received.
+        """
+        return self._ready.wait(timeout)
+
+    def _thread_main(self):
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self.run())
+        finally:
+            self._loop.close()
+
+    async def run(self):
+        """
+        Fetches a WebSocket token, subscribes to openOrders and ownTrades and consumes
+        updates until stopped, reconnecting with a fresh token after any error.
+        """
+        backoff = 1.0
+        while not self._stopped.is_set():
+            try:
+                result = await asyncio.get_running_loop().run_in_executor(
+                    None, lambda: self.kraken_api._make_request(method="GetWebSocketsToken", path="/0/private/",
+                                                                is_private=True))
+                if not result or not result.get("token"):
+                    raise OSError("no WebSocket token returned")
+                async with websockets.connect(self.ws_url, ping_interval=20) as websocket:
+                    self._websocket = websocket
+                    logger.info("Connected to private order feed at %s", self.ws_url)
+                    for name in ("openOrders", "ownTrades"):
+                        await websocket.send(json.dumps({"event": "subscribe",
+                                                         "subscription": {"name": name, "token": result["token"]}}))
+                    backoff = 1.0
+                    async for message in websocket:
+                        self.handle_message(message)
+            except (websockets.ConnectionClosed, OSError, asyncio.TimeoutError) as error:
+                if self._stopped.is_set():
+                    break
+                logger.warning("Private order feed disconnected: %s. Reconnecting in %.0fs.", error, backoff)
+            except Exception:
+                # A rejected handshake (InvalidStatus) or a message the handler cannot
+                # parse must not end fill tracking; resubscribing resyncs the orders
+                if self._stopped.is_set():
+                    break
+                logger.exception("Private order feed failed. Reconnecting in %.0fs.", backoff)
+            finally:
+                self._websocket = None
+            if not self._stopped.is_set():
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+
+    def handle_message(self, message: str):
+        """
+        Applies one raw private WebSocket message to the tracked orders.
+        """
+        payload = json.loads(message)
+        if isinstance(payload, dict):
+            if payload.get("event") == "subscriptionStatus" and payload.get("status") == "error":
+                logger.error("Private subscription failed: %s", payload.get('errorMessage'))
+            return
+
+        channel = payload[1]
+        if channel not in ("openOrders", "ownTrades"):
+            return
+        for entries in payload[0]:
+            for key, info in entries.items():
+                if channel == "openOrders":
+                    self._route(key, channel, info)
+                else:
+                    self._route(info.get("ordertxid"), channel, dict(info, tradeid=key))
+        if channel == "openOrders":
+            self._ready.set()
+
+    def _route(self, txid: str, channel: str, info: Dict):
+        with self._lock:
+            order = self.orders.get(txid)
+            if order is None and "userref" in info:
+                order = self._pending.get(info["userref"])
+                if order is not None and txid:
+                    # Learn the txid from the stream if it beats the AddOrder reply
+                    order.txid = txid
+                    self.orders[txid] = order
+            if order is None:
+                if self._pending:
+                    # Possibly one of ours whose AddOrder reply has not arrived yet
+                    self._early_updates.setdefault(txid, []).append((channel, info))
+                return
+        self._apply(order, channel, info)
+
+    def _apply(self, order: Order, channel: str, info: Dict):
+        if channel == "ownTrades":
+            with self._lock:
+                if info["tradeid"] in order.fills:
+                    return
+                order.fills[info["tradeid"]] = (float(info["price"]), float(info["vol"]))
+                order.fee += float(info.get("fee", 0))
+                filled = sum(volume for _, volume in order.fills.values())
+                if filled > order.filled_volume:
+                    order.filled_volume = filled
+                    order.avg_price = sum(price * volume for price, volume in order.fills.values()) / filled
+                order.updated_at = time.time()
+            self._notify(order, "fill")
+            return
+
+        filled_before = order.filled_volume
+        with self._lock:
+            if "vol_exec" in info:
+                vol_exec = float(info["vol_exec"])
+                if vol_exec > order.filled_volume:
+                    order.filled_volume = vol_exec
+                    if float(info.get("avg_price", 0)):
+                        order.avg_price = float(info["avg_price"])
+            order.updated_at = time.time()
+        if order.filled_volume > filled_before and not order.fills:
+            # openOrders reported execution before any ownTrades message did
+            self._notify(order, "fill")
+        status = info.get("status")
+        if status == "open" and order.status == "pending":
+            order.status = "open"
+        elif status in CLOSED_STATUSES and order.status != "replaced":
+            self._set_status(order, status)
+
+    def _set_status(self, order: Order, status: str):
+        with self._lock:
+            if order.status == status:
+                return
+            order.status = status
+            order.updated_at = time.time()
+        logger.info("Order %s %s: filled %s of %s at %s",
+                    order.txid, status, order.filled_volume, order.volume, order.avg_price)
+        self._notify(order, status)
+
+    def _notify(self, order: Order, event: str):
+        for listener in self.listeners:
+            try:
+                listener(order, event)
+            except Exception as error:
+                logger.error("Order listener failed on %s for %s: %s", event, order.txid, error)
+
+
+_default_order_manager = None
+_default_order_manager_lock = threading.Lock()
+
+
+def get_order_manager() -> OrderManager:
+    """
+    Returns the process-wide OrderManager, creating it on first use.
+    """
+    global _default_order_manager
+    if _default_order_manager is None:
+        with _default_order_manager_lock:
+            if _default_order_manager is None:
+                _default_order_manager = OrderManager()
+    return _default_order_manager
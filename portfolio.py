@@ -1,7 +1,8 @@
+import threading
+from typing import Optional
 from config import ALLOCATIONS
 from logger_config import logger
-from config import API_KEY, API_SECRET, API_DOMAIN
-from api_kraken import KrakenAPI
+from api_kraken import get_kraken_api
 
 # Portfolio balances
 class Portfolio:
@@ -19,15 +20,93 @@ class Portfolio:
         self.portfolio['HODL'] = self.total_btc * self.allocations['HODL']
         self.portfolio['YIELD'] = self.total_btc * self.allocations['YIELD']
         self.portfolio['TRADING'] = self.total_btc * self.allocations['TRADING']
-        logger.info(f"Portfolio rebalanced: {self.portfolio}")
+        logger.info("Portfolio rebalanced: %s", self.portfolio)
 
-    
+    def state(self) -> dict:
+        return {"total_btc": self.total_btc, "buckets": dict(self.portfolio)}
+
+    def sync_balance(self, total_btc: float):
+        """
+        Scales the buckets to a freshly fetched balance, keeping their proportions,
+        e.g. after fills or transfers made while the bot was not running.
+        """
+        held = sum(self.portfolio.values())
+        if held == total_btc:
+            return
+        for bucket in self.portfolio:
+            self.portfolio[bucket] = self.portfolio[bucket] * total_btc / held if held else \
+                total_btc * self.allocations[bucket]
+        self.total_btc = total_btc
+        logger.info("Portfolio synced to balance %s: %s", total_btc, self.portfolio)
+
+    @classmethod
+    def from_state(cls, allocations: dict, state: dict) -> "Portfolio":
+        portfolio = cls(allocations, state["total_btc"])
+        portfolio.portfolio.update(state["buckets"])
+        return portfolio
+
+
+# The portfolio is initialized from the account balance on first use, not at import
+_portfolio = None
+_portfolio_lock = threading.Lock()
+
+
+def get_portfolio() -> Portfolio:
+    global _portfolio
+    if _portfolio is None:
+        with _portfolio_lock:
+            if _portfolio is None:
+                total_btc = get_kraken_api().get_total_btc_balance()
+                logger.info("Your total BTC balance is: %s", total_btc)
+                _portfolio = Portfolio(ALLOCATIONS, total_btc)
+    return _portfolio
+
+
+def current_portfolio() -> Optional[Portfolio]:
+    """
+    Returns the portfolio if it has been initialized, without fetching the balance.
+    """
+    return _portfolio
+
+
+def restore_portfolio(state: dict, refresh: bool = True) -> Portfolio:
+    """
+    Installs a portfolio saved by a snapshot, so startup skips the balance lookup.
+    The balance is then refreshed in the background, since it may have changed
+    while the bot was down. An already initialized portfolio is kept.
+    """
+    global _portfolio
+    with _portfolio_lock:
+        if _portfolio is not None:
+            return _portfolio
+        _portfolio = Portfolio.from_state(ALLOCATIONS, state)
+        logger.info("Restored portfolio: %s", _portfolio.portfolio)
+    if refresh:
+        threading.Thread(target=refresh_balance, name="portfolio-refresh", daemon=True).start()
+    return _portfolio
+
+
+def refresh_balance() -> bool:
+    """
+    Fetches the account balance and syncs the portfolio buckets to it.
+    """
+    total_btc = get_kraken_api().get_total_btc_balance()
+    if total_btc is None:
+        logger.warning("Could not refresh the balance of the restored portfolio; keeping the snapshot's buckets.")
+        return False
+    with _portfolio_lock:
+        if _portfolio is None:
+            return False
+        _portfolio.sync_balance(total_btc)
+    return True
+
+
+def __getattr__(name):
+    # Keeps `portfolio.portfolio` working for existing callers
+    if name == "portfolio":
+        return get_portfolio()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-# Initialize Portfolio
-kraken_api = KrakenAPI(API_KEY, API_SECRET, API_DOMAIN)
-total_btc = kraken_api.get_total_btc_balance()
-logger.info(f"Your total BTC balance is: {total_btc}")
-portfolio = Portfolio(ALLOCATIONS, total_btc)
 
 def rebalance_portfolio():
-    portfolio.rebalance()
\ No newline at end of file
+    get_portfolio().rebalance()
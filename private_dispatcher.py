@@ -0,0 +1,47 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Dict
+from api_kraken import KrakenAPI, get_kraken_api
+from config import KRAKEN_PRIVATE_WORKERS
+
+PRIVATE_PATH = "/0/private/"
+
+
+class PrivateDispatcher:
+    """
+    Runs private Kraken calls concurrently on a small worker pool. Each call takes its
+    nonce from the client's shared allocator just before it is signed, and the
+    client re-signs any call the exchange rejects for an out-of-order nonce, so
+    calls no longer have to wait for each other. Setting a nonce window on the API
+    key lets Kraken accept slightly reordered calls and makes re-signing rare.
+    """
+    def __init__(self, kraken_api: Optional[KrakenAPI] = None, max_workers: int = KRAKEN_PRIVATE_WORKERS):
+        self.kraken_api = kraken_api if kraken_api else get_kraken_api()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="kraken-private")
+
+    def run(self, func, *args, **kwargs) -> Future:
+        """
+        Runs any callable that makes private calls, e.g. OrderManager.replace.
+        """
+        return self._executor.submit(func, *args, **kwargs)
+
+    def submit(self, method: str, data: Optional[Dict] = None) -> Future:
+        return self.run(self.kraken_api._make_request, method=method, path=PRIVATE_PATH, data=data, is_private=True)
+
+    def balance(self) -> Future:
+        return self.submit("Balance")
+
+    def open_orders(self) -> Future:
+        return self.submit("OpenOrders")
+
+    def add_order(self, pair: str, side: str, volume: float, price: Optional[float] = None,
+                  ordertype: str = "limit", **fields) -> Future:
+        data = dict(fields, pair=pair, type=side, ordertype=ordertype, volume=volume)
+        if price is not None:
+            data["price"] = price
+        return self.submit("AddOrder", data)
+
+    def cancel_order(self, txid: str) -> Future:
+        return self.submit("CancelOrder", {"txid": txid})
+
+    def close(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,180 @@
+import threading
+import time
+from typing import Callable, Dict, Hashable, Any
+from config import (
+    KRAKEN_PUBLIC_COUNTER_MAX,
+    KRAKEN_PUBLIC_DECAY_RATE,
+    KRAKEN_PRIVATE_COUNTER_MAX,
+    KRAKEN_PRIVATE_DECAY_RATE,
+    REQUEST_COALESCE_WINDOW,
+)
+from logger_config import logger
+
+# Private endpoints that cost more (or less) than one point on Kraken's REST call counter.
+# Order placement is governed by the separate per-pair trading limits, not this counter.
+PRIVATE_CALL_COSTS = {
+    "Ledgers": 2,
+    "QueryLedgers": 2,
+    "TradesHistory": 2,
+    "QueryTrades": 2,
+    "AddOrder": 0,
+    "AddOrderBatch": 0,
+    "EditOrder": 0,
+    "CancelOrder": 0,
+    "CancelAll": 0,
+}
+
+
+class CallCounter:
+    """
+    Client-side model of a Kraken call counter: each call adds its cost, the counter
+    decays at a fixed rate per second, and calls wait while it would exceed the max.
+    """
+    def __init__(self, max_counter: float, decay_rate: float, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.max_counter = max_counter
+        self.decay_rate = decay_rate
+        self.clock = clock
+        self.sleep = sleep
+        self.counter = 0.0
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def _decay(self, now: float):
+        self.counter = max(0.0, self.counter - (now - self._last) * self.decay_rate)
+        self._last = now
+
+    def acquire(self, cost: float = 1.0) -> float:
+        """
+        Blocks until the call fits under the limit. Returns the time spent waiting.
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._decay(self.clock())
+                if self.counter + cost <= self.max_counter:
+                    self.counter += cost
+                    return waited
+                delay = (self.counter + cost - self.max_counter) / self.decay_rate
+            self.sleep(delay)
+            waited += delay
+
+    def penalize(self):
+        """
+        Marks the counter full, e.g. after the exchange reported a rate limit error.
+        """
+        with self._lock:
+            self._decay(self.clock())
+            self.counter = self.max_counter
+
+
+class KrakenRateLimiter:
+    """
+    Separate counters for public and private endpoints, shared by every KrakenAPI
+    client in the process since Kraken tracks limits per IP and per API key.
+    """
+    def __init__(self, public_max: float = KRAKEN_PUBLIC_COUNTER_MAX, public_decay: float = KRAKEN_PUBLIC_DECAY_RATE,
+                 private_max: float = KRAKEN_PRIVATE_COUNTER_MAX, private_decay: float = KRAKEN_PRIVATE_DECAY_RATE,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        self.public = CallCounter(public_max, public_decay, clock, sleep)
+        self.private = CallCounter(private_max, private_decay, clock, sleep)
+
+    def acquire(self, method: str, is_private: bool):
+        if is_private:
+            waited = self.private.acquire(PRIVATE_CALL_COSTS.get(method, 1))
+        else:
+            waited = self.public.acquire(1)
+        if waited:
+            logger.debug("Rate limiter delayed %s by %.2fs", method, waited)
+
+    def penalize(self, is_private: bool):
+        (self.private if is_private else self.public).penalize()
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.finished_at = None
+
+
+class RequestCoalescer:
+    """
+    Merges identical requests: callers that ask for a key while a call for it is in
+    flight, or within `window` seconds of it finishing, share that call's result
+    instead of issuing their own.
+    """
+    def __init__(self, window: float = REQUEST_COALESCE_WINDOW, clock: Callable[[], float] = time.monotonic):
+        self.window = window
+        self.clock = clock
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def call(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None and flight.finished_at is not None \
+                    and self.clock() - flight.finished_at > self.window:
+                flight = None
+            if flight is None:
+                self._prune()
+                flight = _Flight()
+                self._flights[key] = flight
+                leader = True
+            else:
+                leader = False
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = func()
+        except Exception as error:
+            flight.error = error
+            # Failures are not shared with later callers
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            raise
+        finally:
+            flight.finished_at = self.clock()
+            flight.done.set()
+        if flight.result is None:
+            # Nothing worth sharing beyond the callers already waiting
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+        return flight.result
+
+    def _prune(self):
+        # Drop finished flights that can no longer be shared; caller holds the lock
+        now = self.clock()
+        stale = [key for key, flight in self._flights.items()
+                 if flight.finished_at is not None and now - flight.finished_at > self.window]
+        for key in stale:
+            del self._flights[key]
+
+
+_default_rate_limiter = None
+_default_coalescer = None
+_defaults_lock = threading.Lock()
+
+
+def get_default_rate_limiter() -> KrakenRateLimiter:
+    global _default_rate_limiter
+    with _defaults_lock:
+        if _default_rate_limiter is None:
+            _default_rate_limiter = KrakenRateLimiter()
+        return _default_rate_limiter
+
+
+def get_default_coalescer() -> RequestCoalescer:
+    global _default_coalescer
+    with _defaults_lock:
+        if _default_coalescer is None:
+            _default_coalescer = RequestCoalescer()
+        return _default_coalescer
@@ -0,0 +1,84 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Hashable, Any, Tuple, Callable
+from config import RESPONSE_CACHE_MAX_ENTRIES
+
+# Seconds each public endpoint's response stays valid. Endpoints not listed are not cached.
+DEFAULT_TTLS = {
+    "Ticker": 2.0,
+    "Depth": 1.0,
+    "OHLC": 30.0,
+    "AssetPairs": 3600.0,
+    "Assets": 3600.0,
+}
+
+
+class ResponseCache:
+    """
+    Bounded TTL cache for public Kraken responses with LRU eviction and hit/miss
+    counters. Only public endpoints should ever be stored here.
+    """
+    def __init__(self, ttls: Optional[Dict[str, float]] = None, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.max_entries = max_entries
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def is_cacheable(self, endpoint: str) -> bool:
+        return self.max_entries > 0 and self.ttls.get(endpoint, 0) > 0
+
+    def get(self, key: Hashable, endpoint: str) -> Tuple[bool, Any]:
+        """
+        Returns (hit, value). Expired entries count as misses and are dropped.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if self.clock() < expires_at:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def set(self, key: Hashable, endpoint: str, value: Any):
+        ttl = self.ttls.get(endpoint, 0)
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self.clock() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "entries": len(self._entries)}
+
+
+_default_response_cache = None
+_default_response_cache_lock = threading.Lock()
+
+
+def get_default_response_cache() -> ResponseCache:
+    """
+    Returns the process-wide cache shared by every KrakenAPI client.
+    """
+    global _default_response_cache
+    with _default_response_cache_lock:
+        if _default_response_cache is None:
+            _default_response_cache = ResponseCache()
+        return _default_response_cache
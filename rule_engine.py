@@ -0,0 +1,299 @@
+import json
+import operator
+import re
+from typing import Optional, List, Dict, Tuple, Union
+import numpy as np
+
+# Action codes shared by the live strategy and the backtester
+NO_ACTION, BUY, SELL, PARTIAL_SELL = 0, 1, 2, 3
+ACTIONS = {"none": NO_ACTION, "buy": BUY, "sell": SELL, "partial_sell": PARTIAL_SELL}
+ACTION_NAMES = {code: name for name, code in ACTIONS.items()}
+
+# Thresholds of the sentiment ladder the strategy has always traded on
+LADDER_THRESHOLDS = {
+    "strong_positive_sentiment": 0.5,
+    "moderate_positive_sentiment": 0.1,
+    "strong_negative_sentiment": -0.5,
+    "moderate_negative_sentiment": -0.1,
+    "strong_buy_rsi": 65,
+    "strong_buy_macd_multiplier": 0.9,
+    "moderate_buy_rsi": 60,
+    "strong_sell_rsi": 50,
+    "strong_sell_macd_multiplier": 1.1,
+    "moderate_sell_rsi": 45,
+    "neutral_buy_rsi": 40,
+    "neutral_sell_rsi": 60,
+}
+
+# A condition compares two terms, each a number, a feature name, or "<number> * <feature>"
+_NUMBER = r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?"
+_TERM = rf"(?:({_NUMBER})\s*\*\s*)?([A-Za-z_]\w*|{_NUMBER})"
+_CONDITION = re.compile(rf"^\s*{_TERM}\s*(<=|>=|<|>)\s*{_TERM}\s*$")
+_OPERATORS = {"<": np.less, "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal}
+_SCALAR_OPERATORS = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+
+# Up to this many distinct conditions, a single tick is decided in plain Python, which
+# beats the fixed overhead of the array pass; larger books use the vectorized path
+SCALAR_MAX_CONDITIONS = 128
+
+# Row of ones in the feature matrix; constants are coefficients on it
+_ONE = "1"
+
+RuleSet = List[Dict]
+
+
+def sentiment_ladder(params: Optional[Dict] = None) -> RuleSet:
+    """
+    The strategy's MACD/RSI rules bucketed by news sentiment, as a rule set.
+    `params` overrides LADDER_THRESHOLDS, e.g. for a parameter sweep.
+    """
+    p = dict(LADDER_THRESHOLDS, **(params or {}))
+    return [
+        {"name": "strong positive sentiment", "when": [f"sentiment > {p['strong_positive_sentiment']}"],
+         "rules": [{"if": [f"macd > {p['strong_buy_macd_multiplier']} * signal", f"rsi < {p['strong_buy_rsi']}"],
+                    "then": "buy"}]},
+        {"name": "moderate positive sentiment", "when": [f"sentiment > {p['moderate_positive_sentiment']}",
+                                                         f"sentiment <= {p['strong_positive_sentiment']}"],
+         "rules": [{"if": ["macd > signal", f"rsi < {p['moderate_buy_rsi']}"], "then": "buy"}]},
+        {"name": "strong negative sentiment", "when": [f"sentiment < {p['strong_negative_sentiment']}"],
+         "rules": [{"if": [f"macd < {p['strong_sell_macd_multiplier']} * signal", f"rsi > {p['strong_sell_rsi']}"],
+                    "then": "sell"}]},
+        {"name": "moderate negative sentiment", "when": [f"sentiment >= {p['strong_negative_sentiment']}",
+                                                         f"sentiment < {p['moderate_negative_sentiment']}"],
+         "rules": [{"if": ["macd < signal", f"rsi > {p['moderate_sell_rsi']}"], "then": "sell"}]},
+        {"name": "neutral sentiment", "when": [],
+         "rules": [{"if": ["macd > signal", f"rsi < {p['neutral_buy_rsi']}"], "then": "buy"},
+                   {"if": ["macd < signal", f"rsi > {p['neutral_sell_rsi']}"], "then": "partial_sell"}]},
+    ]
+
+
+def load_rules(path: str) -> Tuple[RuleSet, Dict[str, RuleSet]]:
+    """
+    Reads a JSON rule file: either one rule set, or {"live": rule set, "shadow":
+    {name: rule set}} to evaluate candidate variants alongside the live rules.
+    """
+    with open(path) as rules_file:
+        rules = json.load(rules_file)
+    if isinstance(rules, list):
+        return rules, {}
+    return rules["live"], rules.get("shadow", {})
+
+
+def _pad(rows: List, fill: int) -> np.ndarray:
+    # Ragged lists of ids as a rectangular array
+    width = max((len(row) for row in rows), default=0)
+    return np.array([list(row) + [fill] * (width - len(row)) for row in rows], dtype=np.intp).reshape(len(rows), width)
+
+
+class Decision:
+    __slots__ = ("action", "branch", "rule")
+
+    def __init__(self, action: int, branch: Optional[str], rule: Optional[str]):
+        self.action = action
+        self.branch = branch
+        self.rule = rule
+
+    @property
+    def action_name(self) -> str:
+        return ACTION_NAMES[self.action]
+
+    def __repr__(self) -> str:
+        return f"Decision({self.action_name}, branch={self.branch!r}, rule={self.rule!r})"
+
+
+class RuleBook:
+    """
+    Compiles one or more rule sets into a single vectorized evaluation.
+
+    A rule set is an ordered list of branches. The first branch whose "when"
+    conditions all hold claims the tick, and the first of its rules whose "if"
+    conditions all hold decides the action ("then"); a claimed tick with no matching
+    rule is NO_ACTION, and later branches are not consulted. Conditions are strings
+    such as "rsi < 65" or "macd > 0.9 * signal" over named features.
+
+    Each distinct condition across all rule sets is compared once per evaluation,
+    and every set walks its branches in lockstep with the others, so evaluating many
+    rule sets over many ticks costs a handful of array operations per branch position.
+    """
+    def __init__(self, rule_sets: List[RuleSet], names: Optional[List[str]] = None):
+        self.names = list(names) if names else [f"rules-{i}" for i in range(len(rule_sets))]
+        if len(self.names) != len(rule_sets):
+            raise ValueError("Need one name per rule set.")
+        self.features: List[str] = [_ONE]
+        self._conditions: Dict[tuple, int] = {}  # (lhs, lhs coefficient, operator, rhs, rhs coefficient) -> row
+        self._clauses: Dict[tuple, int] = {}     # sorted condition rows -> clause row
+        self.branch_names: List[str] = []
+        self.rule_names: List[str] = []
+        set_branches: List[List[int]] = []       # branch ids of each set, in order
+        branch_clauses: List[int] = []           # "when" clause of each branch
+        branch_rules: List[List[int]] = []       # rule ids of each branch, in order
+        rule_clauses: List[int] = []             # "if" clause of each rule
+        rule_actions: List[int] = []
+        for rule_set in rule_sets:
+            set_branches.append([])
+            for branch_index, branch in enumerate(rule_set):
+                set_branches[-1].append(len(self.branch_names))
+                branch_clauses.append(self._clause(branch.get("when", [])))
+                self.branch_names.append(branch.get("name", f"branch-{branch_index}"))
+                branch_rules.append([])
+                for rule_index, rule in enumerate(branch.get("rules", [])):
+                    if rule["then"] not in ACTIONS:
+                        raise ValueError(f"Unknown action {rule['then']!r}; expected one of {sorted(ACTIONS)}.")
+                    branch_rules[-1].append(len(self.rule_names))
+                    rule_clauses.append(self._clause(rule.get("if", [])))
+                    rule_actions.append(ACTIONS[rule["then"]])
+                    self.rule_names.append(rule.get("name", f"{self.branch_names[-1]} #{rule_index + 1}"))
+
+        conditions = list(self._conditions)
+        self._condition_list = [(_OPERATORS[c[2]], c[0], c[1], c[3], c[4]) for c in conditions]
+        self._lhs = np.array([c[0] for c in conditions], dtype=np.intp)
+        self._lhs_coef = np.array([c[1] for c in conditions], dtype=np.float64)
+        self._rhs = np.array([c[3] for c in conditions], dtype=np.intp)
+        self._rhs_coef = np.array([c[4] for c in conditions], dtype=np.float64)
+        self._operator_rows = [(_OPERATORS[op], np.flatnonzero([c[2] == op for c in conditions]))
+                               for op in _OPERATORS if any(c[2] == op for c in conditions)]
+        # Padding points at an extra always-true condition row and always-false clause
+        # row, and -1 ids index the NO_ACTION sentinel at the end of the action codes
+        self._clause_members = _pad(list(self._clauses), len(conditions))
+        self._set_branches = _pad(set_branches, -1)
+        self._set_branch_clauses = np.where(self._set_branches >= 0,
+                                            np.array(branch_clauses + [0], dtype=np.intp)[self._set_branches],
+                                            len(self._clauses))
+        self._branch_rules = _pad(branch_rules, -1)
+        self._branch_rule_clauses = np.where(self._branch_rules >= 0,
+                                             np.array(rule_clauses + [0], dtype=np.intp)[self._branch_rules],
+                                             len(self._clauses))
+        self._codes = np.array(rule_actions + [NO_ACTION], dtype=np.int64)
+        # The same tables as plain lists, for deciding a single tick
+        self._scalar_conditions = [(_SCALAR_OPERATORS[c[2]], c[0], c[1], c[3], c[4]) for c in conditions]
+        self._scalar_clauses = list(self._clauses)
+        self._scalar_sets = [[(branch_clauses[b], [(rule_clauses[r], r) for r in branch_rules[b]], b)
+                              for b in branches] for branches in set_branches]
+        self._rule_actions = rule_actions
+
+    def _feature(self, name: str) -> int:
+        if name not in self.features:
+            self.features.append(name)
+        return self.features.index(name)
+
+    def _term(self, coefficient: Optional[str], operand: str) -> Tuple[int, float]:
+        scale = float(coefficient) if coefficient else 1.0
+        if re.fullmatch(_NUMBER, operand):
+            return 0, scale * float(operand)
+        return self._feature(operand), scale
+
+    def _clause(self, clause: List[str]) -> int:
+        rows = []
+        for text in clause:
+            match = _CONDITION.match(text)
+            if match is None:
+                raise ValueError(f"Cannot parse rule condition {text!r}.")
+            lhs_coef, lhs, operator, rhs_coef, rhs = match.groups()
+            condition = (*self._term(lhs_coef, lhs), operator, *self._term(rhs_coef, rhs))
+            rows.append(self._conditions.setdefault(condition, len(self._conditions)))
+        return self._clauses.setdefault(tuple(sorted(set(rows))), len(self._clauses))
+
+    def _values(self, features: Dict[str, Union[float, np.ndarray, None]]) -> Tuple[List[np.ndarray], tuple]:
+        values = [np.float64(1.0)] + [np.asarray(np.nan if features.get(name) is None else features[name],
+                                                 dtype=np.float64) for name in self.features[1:]]
+        return values, np.broadcast_shapes(*(value.shape for value in values))
+
+    def evaluate(self, features: Dict[str, Union[float, np.ndarray, None]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Evaluates every rule set over features given as scalars or aligned arrays
+        (None or NaN never satisfies a comparison). Returns (actions, branches, rules),
+        each shaped (rule sets, *feature shape): the action code, and the id of the
+        claiming branch and the deciding rule, or -1.
+        """
+        values, shape = self._values(features)
+        column = (-1,) + (1,) * len(shape)
+        held = np.empty((len(self._lhs) + 1,) + shape, dtype=bool)
+        held[-1] = True
+        with np.errstate(invalid='ignore'):
+            if int(np.prod(shape)) >= len(self._lhs):
+                # Long series: one comparison per condition, without large temporaries
+                for row, (operator, lhs, lhs_coef, rhs, rhs_coef) in enumerate(self._condition_list):
+                    left = values[lhs] if lhs_coef == 1.0 else values[lhs] * lhs_coef
+                    right = values[rhs] if rhs_coef == 1.0 else values[rhs] * rhs_coef
+                    operator(left, right, out=held[row])
+            else:
+                # Many conditions over few ticks: compare all conditions of an operator at once
+                matrix = np.empty((len(values),) + shape)
+                for row, value in enumerate(values):
+                    matrix[row] = value
+                for operator, rows in self._operator_rows:
+                    lhs = matrix[self._lhs[rows]] * self._lhs_coef[rows].reshape(column)
+                    rhs = matrix[self._rhs[rows]] * self._rhs_coef[rows].reshape(column)
+                    held[rows] = operator(lhs, rhs)
+
+        clauses = np.empty((len(self._clause_members) + 1,) + shape, dtype=bool)
+        clauses[-1] = False
+        clauses[:-1] = held[self._clause_members[:, 0]] if self._clause_members.shape[1] else True
+        for position in range(1, self._clause_members.shape[1]):
+            clauses[:-1] &= held[self._clause_members[:, position]]
+
+        # The first matching rule of each branch, then the first claiming branch of each
+        # set. Ids are accumulated off by one, so 0 (-1 after the shift) means none.
+        flat = clauses.reshape(len(clauses), -1)
+        picked = np.zeros((len(self._branch_rules) + 1, flat.shape[1]), dtype=np.int32)
+        pending = np.ones((len(self._branch_rules), flat.shape[1]), dtype=bool)
+        for position in range(self._branch_rules.shape[1]):
+            hit = pending & flat[self._branch_rule_clauses[:, position]]
+            picked[:-1] += hit * (self._branch_rules[:, position, None] + 1).astype(np.int32)
+            pending &= ~hit
+        branches = np.zeros((len(self.names), flat.shape[1]), dtype=np.int32)
+        pending = np.ones(branches.shape, dtype=bool)
+        for position in range(self._set_branches.shape[1]):
+            claims = pending & flat[self._set_branch_clauses[:, position]]
+            branches += claims * (self._set_branches[:, position, None] + 1).astype(np.int32)
+            pending &= ~claims
+        branches -= 1
+        rules = np.take_along_axis(picked, branches, axis=0) - 1
+        shape = (len(self.names),) + shape
+        return self._codes[rules].reshape(shape), branches.reshape(shape), rules.reshape(shape)
+
+    def decide(self, **features: Optional[float]) -> List[Decision]:
+        """
+        Evaluates one tick against every rule set, returning one Decision per set.
+        """
+        if len(self._scalar_conditions) <= SCALAR_MAX_CONDITIONS:
+            return self._decide_scalar(features)
+        actions, branches, rules = self.evaluate(features)
+        return [Decision(int(action), self.branch_names[branch] if branch >= 0 else None,
+                         self.rule_names[rule] if rule >= 0 else None)
+                for action, branch, rule in zip(actions.tolist(), branches.tolist(), rules.tolist())]
+
+    def _decide_scalar(self, features: Dict[str, Optional[float]]) -> List[Decision]:
+        # Conditions and clauses are evaluated lazily and at most once, shared by all sets
+        nan = float("nan")
+        values = [1.0] + [nan if features.get(name) is None else float(features[name]) for name in self.features[1:]]
+        held: List[Optional[bool]] = [None] * len(self._scalar_conditions)
+        clauses: List[Optional[bool]] = [None] * len(self._scalar_clauses)
+
+        def holds(clause: int) -> bool:
+            result = clauses[clause]
+            if result is None:
+                result = True
+                for row in self._scalar_clauses[clause]:
+                    if held[row] is None:
+                        compare, lhs, lhs_coef, rhs, rhs_coef = self._scalar_conditions[row]
+                        held[row] = compare(lhs_coef * values[lhs], rhs_coef * values[rhs])
+                    if not held[row]:
+                        result = False
+                        break
+                clauses[clause] = result
+            return result
+
+        decisions = []
+        for branches in self._scalar_sets:
+            decision = Decision(NO_ACTION, None, None)
+            for guard, rules, branch in branches:
+                if holds(guard):
+                    decision.branch = self.branch_names[branch]
+                    for clause, rule in rules:
+                        if holds(clause):
+                            decision.action, decision.rule = self._rule_actions[rule], self.rule_names[rule]
+                            break
+                    break
+            decisions.append(decision)
+        return decisions
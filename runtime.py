@@ -0,0 +1,234 @@
+import asyncio
+import contextvars
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+import metrics
+from api_kraken import get_kraken_api
+from config import (
+    GLOBAL_TRADE_COOLDOWN,
+    MARKET_DATA_INTERVAL,
+    SENTIMENT_INTERVAL,
+    LLM_MIN_INTERVAL,
+    REBALANCE_INTERVAL,
+    METRICS_ENABLED,
+    STATE_SNAPSHOT_FILE,
+    STATE_SNAPSHOT_INTERVAL,
+)
+from gpt_trading_decision import gpt_trading_decision
+from indicators import fetch_latest_news, calculate_sentiment
+from kraken_ws import KrakenMarketFeed
+from logger_config import logger, correlation
+from order_manager import OrderManager, get_order_manager
+from portfolio import get_portfolio, rebalance_portfolio
+from state_snapshot import capture, write_snapshot, save_snapshot, restore_snapshot
+from trading_strategy import TradingStrategy
+
+
+class TradingRuntime:
+    """
+    Long-running asyncio runtime that drives market data, sentiment, LLM decisions and
+    rebalancing as independent periodic tasks. Blocking work runs on separate executors
+    so a slow news fetch or LLM call never holds up the reaction to a new price:
+
+    - network calls share an I/O pool,
+    - CPU-bound sentiment scoring has its own worker,
+    - the LLM has its own worker and is woken only by new market data,
+    - trade execution and repricing share a single worker, and a tick whose
+      predecessor is still executing is skipped rather than queued.
+
+    Prices and order books come from a KrakenMarketFeed attached to the shared
+    client, which falls back to REST whenever the feed is disconnected or stale.
+
+    Orders go through an OrderManager, so fills are confirmed over the private feed
+    and resting orders are repriced when the book moves away from them. With
+    METRICS_ENABLED, tick durations and tick-to-order latency are served at /metrics.
+
+    Strategy, indicator and portfolio state is snapshotted to STATE_SNAPSHOT_FILE
+    periodically and on shutdown; a restart resumes from it and fetches only the
+    candles it missed, instead of downloading and replaying the full history.
+    """
+    def __init__(self, pair: str = "XBTUSDT", interval: int = 60, market_interval: float = MARKET_DATA_INTERVAL,
+                 sentiment_interval: float = SENTIMENT_INTERVAL, llm_min_interval: float = LLM_MIN_INTERVAL,
+                 rebalance_interval: float = REBALANCE_INTERVAL, trade_cooldown: float = GLOBAL_TRADE_COOLDOWN,
+                 io_workers: int = 4, order_manager: Optional[OrderManager] = None,
+                 market_feed: Optional[KrakenMarketFeed] = None):
+        self.pair = pair
+        self.interval = interval
+        self.market_interval = market_interval
+        self.sentiment_interval = sentiment_interval
+        self.llm_min_interval = llm_min_interval
+        self.rebalance_interval = rebalance_interval
+        self.order_manager = order_manager if order_manager else get_order_manager()
+        self.market_feed = market_feed
+        self.strategy = TradingStrategy(pair=pair, trade_cooldown=trade_cooldown, order_manager=self.order_manager)
+        self.latest_price: Optional[float] = None
+        self.llm_decision: Optional[str] = None
+        self._io_executor = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="runtime-io")
+        self._cpu_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="runtime-cpu")
+        self._llm_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="runtime-llm")
+        self._trade_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="runtime-trade")
+        self._trade_future: Optional[asyncio.Future] = None
+        self._market_changed: Optional[asyncio.Event] = None
+        self._tasks = []
+
+    async def _run(self, executor: ThreadPoolExecutor, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        # Run in a copy of the task's context so the worker logs under the same cycle ID
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(executor, functools.partial(context.run, func, *args, **kwargs))
+
+    async def _every(self, name: str, period: float, tick):
+        """
+        Calls `tick` every `period` seconds. A tick that overruns its period is followed
+        immediately by the next one instead of a burst of catch-up ticks, and errors
+        are logged without stopping the task.
+        """
+        while True:
+            start = time.monotonic()
+            try:
+                with correlation(name), metrics.span(f"runtime.{name}"):
+                    await tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                logger.error("[%s] tick failed: %s", name, error)
+            elapsed = time.monotonic() - start
+            if elapsed > period:
+                logger.warning("[%s] tick took %.2fs, longer than its %.2fs period", name, elapsed, period)
+            await asyncio.sleep(max(0.0, period - elapsed))
+
+    async def market_tick(self):
+        price = await self._run(self._io_executor, get_kraken_api().get_price, self.pair)
+        if price is None:
+            logger.error("Failed to retrieve %s price.", self.pair)
+            return
+        tick_started = time.perf_counter()
+        self.latest_price = price
+        self.strategy.indicators.update(price)
+        self._market_changed.set()
+
+        if self._trade_future is not None and not self._trade_future.done():
+            # Backpressure: the previous decision is still placing its order
+            logger.debug("[market] previous decision still executing; skipping this tick")
+            return
+        macd, signal = self.strategy.indicators.macd
+        self._trade_future = asyncio.ensure_future(self._run(
+            self._trade_executor, self._decide_and_reprice, tick_started, price,
+            self.strategy.indicators.moving_average, self.strategy.indicators.rsi, macd, signal))
+        self._trade_future.add_done_callback(self._log_trade_error)
+
+    def _decide_and_reprice(self, tick_started: float, price: float, moving_avg, rsi, macd, signal):
+        self.strategy.tick_started = tick_started
+        self.strategy.decide(price, moving_avg, rsi, macd, signal)
+        if self.order_manager.open_orders(self.pair):
+            self.order_manager.reprice(self.pair)
+
+    @staticmethod
+    def _log_trade_error(future: asyncio.Future):
+        if not future.cancelled() and future.exception() is not None:
+            logger.error("[market] strategy decision failed: %s", future.exception())
+
+    async def sentiment_tick(self):
+        articles = await self._run(self._io_executor, fetch_latest_news)
+        self.strategy.sentiment_score = await self._run(self._cpu_executor, calculate_sentiment, articles)
+        logger.info("Updated sentiment score: %s", self.strategy.sentiment_score)
+
+    async def llm_loop(self):
+        """
+        Asks the LLM for a decision whenever new market data has arrived, at most once
+        per `llm_min_interval`. Ticks that arrive meanwhile collapse into one wake-up,
+        and unchanged inputs are answered by the decision cache without a call.
+        """
+        while True:
+            await self._market_changed.wait()
+            self._market_changed.clear()
+            start = time.monotonic()
+            with correlation("llm"):
+                await self._ask_llm()
+            await asyncio.sleep(max(0.0, self.llm_min_interval - (time.monotonic() - start)))
+
+    async def _ask_llm(self):
+        indicators = self.strategy.indicators
+        macd, signal = indicators.macd
+        if len(indicators.prices) and indicators.moving_average is not None and indicators.rsi is not None \
+                and macd is not None:
+            try:
+                with metrics.span("gpt_trading_decision"):
+                    self.llm_decision = await self._run(
+                        self._llm_executor, gpt_trading_decision, self.latest_price, indicators.prices.to_list(),
+                        self.strategy.sentiment_score, indicators.moving_average, indicators.rsi, macd, signal,
+                        dict(get_portfolio().portfolio))
+                logger.info("Trading Decision: %s", self.llm_decision)
+            except Exception as error:
+                logger.error("[llm] decision failed: %s", error)
+
+    async def rebalance_tick(self):
+        await self._run(self._io_executor, rebalance_portfolio)
+
+    async def snapshot_tick(self):
+        # Captured on the loop thread, which is where the indicators are updated
+        meta, prices = capture(self.strategy)
+        await self._run(self._io_executor, write_snapshot, STATE_SNAPSHOT_FILE, meta, prices)
+
+    def start_market_feed(self):
+        """
+        Starts the WebSocket market feed for the pair and attaches it to the shared
+        client. Without the pair's WebSocket name, market data stays on REST.
+        """
+        kraken_api = get_kraken_api()
+        if self.market_feed is None:
+            currencies = kraken_api.get_pair_currencies(self.pair)
+            if currencies is None:
+                logger.warning("No WebSocket name for %s; polling market data over REST.", self.pair)
+                return
+            self.market_feed = KrakenMarketFeed(pair=self.pair, ws_pair="/".join(currencies),
+                                                ohlc_interval=self.interval)
+        self.market_feed.start()
+        kraken_api.attach_market_feed(self.market_feed)
+
+    async def run(self):
+        self._market_changed = asyncio.Event()
+        if METRICS_ENABLED:
+            metrics.start_server()
+        await self._run(self._io_executor, self.start_market_feed)
+        # Restoring (or else warming up) and the first balance lookup block startup;
+        # everything after is periodic. A restored portfolio skips the lookup.
+        if not await self._run(self._io_executor, restore_snapshot, self.strategy, self.interval):
+            await self._run(self._io_executor, self.strategy.warm_up, None, self.interval)
+        await self._run(self._io_executor, get_portfolio)
+        self.order_manager.start()
+        self._tasks = [
+            asyncio.create_task(self._every("market", self.market_interval, self.market_tick), name="market"),
+            asyncio.create_task(self._every("sentiment", self.sentiment_interval, self.sentiment_tick), name="sentiment"),
+            asyncio.create_task(self.llm_loop(), name="llm"),
+            asyncio.create_task(self._every("rebalance", self.rebalance_interval, self.rebalance_tick), name="rebalance"),
+        ]
+        if STATE_SNAPSHOT_FILE:
+            self._tasks.append(asyncio.create_task(
+                self._every("snapshot", STATE_SNAPSHOT_INTERVAL, self.snapshot_tick), name="snapshot"))
+        logger.info("Runtime started for %s: market every %ss, sentiment every %ss, LLM at most every %ss, "
+                    "rebalance every %ss.", self.pair, self.market_interval, self.sentiment_interval,
+                    self.llm_min_interval, self.rebalance_interval)
+        try:
+            await asyncio.gather(*self._tasks)
+        finally:
+            self.stop()
+
+    def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self.order_manager.stop(timeout=0)
+        if self.market_feed is not None:
+            self.market_feed.stop(timeout=0)
+        save_snapshot(self.strategy)
+        for executor in (self._io_executor, self._cpu_executor, self._llm_executor, self._trade_executor):
+            executor.shutdown(wait=False)
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(TradingRuntime().run())
+    except KeyboardInterrupt:
+        logger.info("Runtime stopped.")
@@ -0,0 +1,138 @@
+import sys
+import time
+from typing import List, Dict, Optional
+import numpy as np
+import metrics
+from api_kraken import get_kraken_api
+from config import SCAN_PAIRS
+from indicators import BatchIndicators, fetch_latest_news, calculate_sentiment
+from logger_config import logger, correlation
+from trading_strategy import TradingStrategy
+
+
+def _value(array: np.ndarray, index: int) -> Optional[float]:
+    # Strategies expect None, not NaN, while an indicator is still warming up
+    value = float(array[index])
+    return None if np.isnan(value) else value
+
+
+class MultiPairScanner:
+    """
+    Runs the trading strategy over many pairs at once. Each pair keeps its own
+    TradingStrategy state, while prices come from one batched Ticker call and the
+    indicators of every pair are updated together as one vectorized step. The
+    portfolio's TRADING bucket is split evenly between the pairs.
+    """
+    def __init__(self, pairs: List[str] = SCAN_PAIRS, interval: int = 60, history: int = 1000):
+        self.pairs = list(pairs)
+        self.interval = interval
+        self.history = history
+        self.strategies: Dict[str, TradingStrategy] = {pair: TradingStrategy(pair=pair) for pair in self.pairs}
+        self._reset_pairs()
+
+    def _reset_pairs(self):
+        for strategy in self.strategies.values():
+            strategy.allocation = 1.0 / len(self.pairs)
+        self.indicators = BatchIndicators(len(self.pairs))
+        self._last_prices = np.full(len(self.pairs), np.nan)
+
+    def drop_pairs(self, pairs: List[str]):
+        """
+        Stops scanning `pairs`; the remaining pairs share the TRADING bucket. The
+        batch indicators start over, so warm_up has to run again afterwards.
+        """
+        self.pairs = [pair for pair in self.pairs if pair not in pairs]
+        for pair in pairs:
+            self.strategies.pop(pair, None)
+        self._reset_pairs()
+
+    def warm_up(self):
+        """
+        Fetches the history of every pair concurrently and seeds the batch engine
+        with the most recent candles they all have in common. A pair whose history
+        cannot be fetched, even on a retry of its own, is dropped from the scan.
+        """
+        api = get_kraken_api()
+        closes = api.get_historical_closes_many(self.pairs, self.interval)
+        for pair in [pair for pair in self.pairs if not len(closes[pair])]:
+            try:
+                closes[pair] = api.get_historical_closes(pair, self.interval)
+            except Exception as error:
+                logger.error("Could not fetch history for %s: %s", pair, error)
+        failed = [pair for pair in self.pairs if not len(closes[pair])]
+        if failed:
+            logger.error("No history for %s; dropping them from the scan.", failed)
+            self.drop_pairs(failed)
+        if not self.pairs:
+            logger.error("No pair has any history; nothing to scan.")
+            return
+        length = min(min(len(closes[pair]) for pair in self.pairs), self.history)
+        matrix = np.column_stack([np.asarray(closes[pair][len(closes[pair]) - length:], dtype=np.float64)
+                                  for pair in self.pairs]) if length else np.empty((0, len(self.pairs)))
+        self.indicators.warm_up(matrix)
+        if length:
+            self._last_prices = matrix[-1].copy()
+        logger.info("Warmed up %s pairs with %s aligned historical prices.", len(self.pairs), length)
+
+    def update_sentiment(self):
+        # News sentiment is market-wide, so it is computed once per scan
+        sentiment_score = calculate_sentiment(fetch_latest_news())
+        for strategy in self.strategies.values():
+            strategy.sentiment_score = sentiment_score
+        logger.info("Updated sentiment score: %s", sentiment_score)
+
+    def scan(self):
+        """
+        One tick for every pair: a single Ticker call, one batch indicator update,
+        then each pair's strategy decides on its own values.
+        """
+        if not self.pairs:
+            return
+        with correlation("scan"):
+            self.update_sentiment()
+
+            with metrics.span("get_tickers"):
+                tickers = get_kraken_api().get_tickers(self.pairs)
+            tick_started = time.perf_counter()
+            prices = np.array([float(tickers[pair]['c'][0]) if pair in tickers else np.nan for pair in self.pairs])
+            missing = np.isnan(prices)
+            if missing.any():
+                logger.warning("No price for %s; carrying their last price forward.",
+                               [pair for pair, gap in zip(self.pairs, missing) if gap])
+                prices = np.where(missing, self._last_prices, prices)
+            if np.isnan(prices).any():
+                logger.error("Some pairs have never had a price; skipping this scan.")
+                return
+            self._last_prices = prices
+
+            with metrics.span("indicators"):
+                self.indicators.update(prices)
+                moving_avg = self.indicators.moving_average
+                rsi = self.indicators.rsi
+                macd, signal = self.indicators.macd
+
+            for index, pair in enumerate(self.pairs):
+                if missing[index]:
+                    continue
+                strategy = self.strategies[pair]
+                try:
+                    # v[1] is the 24-hour volume
+                    strategy.market_volume = float(tickers[pair]['v'][1])
+                except (KeyError, ValueError, IndexError):
+                    strategy.market_volume = None
+                strategy.tick_started = tick_started
+                strategy.decide(prices[index], _value(moving_avg, index), _value(rsi, index),
+                                _value(macd, index), _value(signal, index))
+
+
+if __name__ == "__main__":
+    # Usage: python scanner.py [interval] [seconds between scans]
+    interval = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    period = float(sys.argv[2]) if len(sys.argv) > 2 else 60
+    scanner = MultiPairScanner(SCAN_PAIRS, interval)
+    scanner.warm_up()
+    while True:
+        start = time.perf_counter()
+        scanner.scan()
+        logger.info("Scanned %s pairs in %.3fs", len(scanner.pairs), time.perf_counter() - start)
+        time.sleep(period)
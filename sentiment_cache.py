@@ -0,0 +1,131 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, List, Dict, Callable
+from config import SENTIMENT_CACHE_FILE, SENTIMENT_CACHE_MAX_ENTRIES
+from logger_config import logger
+
+# Analyzer used by backfill worker processes, created once per process
+_worker_analyzer = None
+
+
+def article_content(article: Dict) -> str:
+    """
+    The text that gets scored for an article: its headline and description.
+    """
+    headline = article.get('title', '') or ''
+    description = article.get('description', '') or ''
+    return headline + ". " + description
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def _init_scoring_worker():
+    global _worker_analyzer
+    from nltk.sentiment.vader import SentimentIntensityAnalyzer
+    _worker_analyzer = SentimentIntensityAnalyzer()
+
+
+def _score_batch(contents: List[str]) -> List[float]:
+    return [_worker_analyzer.polarity_scores(content)['compound'] for content in contents]
+
+
+class SentimentStore:
+    """
+    SQLite-backed cache of VADER compound scores keyed by a hash of the scored text,
+    so each article is scored once no matter how many cycles it is seen in. The store
+    is bounded: once it holds more than `max_entries` rows, the least recently used
+    are evicted.
+    """
+    def __init__(self, path: str = SENTIMENT_CACHE_FILE, max_entries: int = SENTIMENT_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sentiment ("
+            "hash TEXT PRIMARY KEY, score REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS sentiment_last_used ON sentiment(last_used)")
+        self._db.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM sentiment").fetchone()[0]
+
+    def get_many(self, hashes: List[str]) -> Dict[str, float]:
+        if not hashes:
+            return {}
+        found = {}
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                found.update(self._db.execute(
+                    f"SELECT hash, score FROM sentiment WHERE hash IN ({placeholders})", chunk).fetchall())
+                self._db.execute(
+                    f"UPDATE sentiment SET last_used = ? WHERE hash IN ({placeholders})", [time.time()] + chunk)
+            self._db.commit()
+        return found
+
+    def put_many(self, scores: Dict[str, float]):
+        if not scores:
+            return
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO sentiment (hash, score, last_used) VALUES (?, ?, ?)",
+                [(key, score, now) for key, score in scores.items()],
+            )
+            excess = self._db.execute("SELECT COUNT(*) FROM sentiment").fetchone()[0] - self.max_entries
+            if excess > 0:
+                self._db.execute(
+                    "DELETE FROM sentiment WHERE hash IN "
+                    "(SELECT hash FROM sentiment ORDER BY last_used LIMIT ?)", (excess,))
+            self._db.commit()
+
+    def score(self, contents: List[str], scorer: Callable[[List[str]], List[float]]) -> List[float]:
+        """
+        Returns a score per content string, calling `scorer` once with the batch of
+        texts that are not in the store yet.
+        """
+        hashes = [content_hash(content) for content in contents]
+        known = self.get_many(list(set(hashes)))
+        missing = {key: content for key, content in zip(hashes, contents) if key not in known}
+        if missing:
+            new_scores = dict(zip(missing, scorer(list(missing.values()))))
+            self.put_many(new_scores)
+            known.update(new_scores)
+        logger.debug("Sentiment store: %s cached, %s newly scored.", len(contents) - len(missing), len(missing))
+        return [known[key] for key in hashes]
+
+    def backfill(self, contents: List[str], workers: Optional[int] = None, batch_size: int = 500) -> int:
+        """
+        Scores a large body of texts (e.g. archived headlines for backtests) on a
+        process pool, storing everything not already cached. Returns how many were scored.
+        """
+        hashes = [content_hash(content) for content in contents]
+        known = self.get_many(list(set(hashes)))
+        missing = {key: content for key, content in zip(hashes, contents) if key not in known}
+        keys, texts = list(missing), list(missing.values())
+        batches = [texts[start:start + batch_size] for start in range(0, len(texts), batch_size)]
+        if not batches:
+            return 0
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_scoring_worker) as executor:
+            offset = 0
+            for batch_scores in executor.map(_score_batch, batches):
+                self.put_many(dict(zip(keys[offset:offset + len(batch_scores)], batch_scores)))
+                offset += len(batch_scores)
+        logger.info("Backfilled sentiment for %s texts (%s cached or duplicate).", len(keys), len(contents) - len(keys))
+        return len(keys)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,74 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from version import __version__
+
+# Modules timed individually, each in a fresh interpreter
+MODULES = ["config", "api_kraken", "indicators", "portfolio", "gpt_trading_decision", "trading_strategy", "main"]
+
+IMPORT_SCRIPT = """
+import time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+"""
+
+# Import the strategy, warm it up from 720 candles of history and reach a decision.
+# History is synthetic and the trade calls are recorded instead of sent, so this
+# measures the bot's own startup cost rather than network latency.
+FIRST_DECISION_SCRIPT = """
+import time
+start = time.perf_counter()
+import numpy as np
+from trading_strategy import TradingStrategy
+prices = (60000 + np.cumsum(np.random.default_rng(0).normal(0, 50, 720))).tolist()
+strategy = TradingStrategy(prices)
+decisions = []
+strategy._execute_buy = lambda price: decisions.append("buy")
+strategy._execute_sell = lambda price: decisions.append("sell")
+strategy._execute_partial_sell = lambda price: decisions.append("partial_sell")
+macd, signal = strategy.indicators.macd
+strategy._determine_trade_action(prices[-1], macd, signal, strategy.indicators.rsi)
+print(time.perf_counter() - start)
+"""
+
+
+def _run(script: str) -> float:
+    """
+    Runs a snippet in a fresh interpreter and returns the time it reports.
+    """
+    result = subprocess.run([sys.executable, "-c", script], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def run_benchmark(runs: int = 5) -> dict:
+    imports = {module: statistics.median(_run(IMPORT_SCRIPT.format(module=module)) for _ in range(runs))
+               for module in MODULES}
+    first_decision = statistics.median(_run(FIRST_DECISION_SCRIPT) for _ in range(runs))
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "version": __version__,
+        "python": sys.version.split()[0],
+        "runs": runs,
+        "import_seconds": imports,
+        "first_decision_seconds": first_decision,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure import time and time-to-first-decision.")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per measurement (median is kept)")
+    parser.add_argument("--output", default="startup_benchmark.jsonl", help="file the result is appended to")
+    args = parser.parse_args()
+
+    result = run_benchmark(args.runs)
+    for module, seconds in result["import_seconds"].items():
+        print(f"import {module:<22} {seconds * 1000:8.1f} ms")
+    print(f"time to first decision      {result['first_decision_seconds'] * 1000:8.1f} ms")
+    with open(args.output, "a") as output:
+        output.write(json.dumps(result) + "\n")
@@ -0,0 +1,125 @@
+import json
+import os
+import struct
+import time
+import zlib
+from typing import Optional, Dict, Tuple
+import numpy as np
+from api_kraken import get_kraken_api
+from config import STATE_SNAPSHOT_FILE
+from logger_config import logger
+from portfolio import current_portfolio, restore_portfolio
+
+# File layout: fixed header, JSON metadata padded to 8 bytes, then the buffered
+# prices as raw little-endian float64, so they can be memory-mapped in place.
+# Header: magic, format version, metadata length, price count, CRC-32 of the body.
+MAGIC = b"TBSNAP\x00\x00"
+VERSION = 1
+_HEADER = struct.Struct("<8sIIQI")
+_ALIGN = 8
+
+
+def capture(strategy) -> Tuple[Dict, np.ndarray]:
+    """
+    Takes a consistent copy of the strategy, indicator and portfolio state. Call it
+    from the thread that updates the indicators; writing can then happen anywhere.
+    """
+    portfolio = current_portfolio()
+    meta = {
+        "saved_at": time.time(),
+        "strategy": strategy.state(),
+        "portfolio": portfolio.state() if portfolio is not None else None,
+    }
+    return meta, strategy.indicators.prices.to_array()
+
+
+def write_snapshot(path: str, meta: Dict, prices: np.ndarray) -> int:
+    """
+    Writes a snapshot atomically: a crash mid-write leaves the previous snapshot in
+    place. Returns the number of bytes written.
+    """
+    body = json.dumps(meta, separators=(",", ":")).encode()
+    body += b"\x00" * (-(_HEADER.size + len(body)) % _ALIGN)
+    payload = np.ascontiguousarray(prices, dtype="<f8").tobytes()
+    checksum = zlib.crc32(payload, zlib.crc32(body))
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as snapshot_file:
+        snapshot_file.write(_HEADER.pack(MAGIC, VERSION, len(body), len(prices), checksum))
+        snapshot_file.write(body)
+        snapshot_file.write(payload)
+        snapshot_file.flush()
+        os.fsync(snapshot_file.fileno())
+    os.replace(tmp_path, path)
+    return _HEADER.size + len(body) + len(payload)
+
+
+def read_snapshot(path: str) -> Optional[Tuple[Dict, np.ndarray]]:
+    """
+    Returns (metadata, prices) with the prices memory-mapped read-only from the file,
+    or None if there is no usable snapshot.
+    """
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as snapshot_file:
+            magic, version, meta_length, count, checksum = _HEADER.unpack(snapshot_file.read(_HEADER.size))
+            body = snapshot_file.read(meta_length)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a version %d snapshot" % VERSION)
+        prices = np.memmap(path, dtype="<f8", mode="r", offset=_HEADER.size + meta_length, shape=(count,)) \
+            if count else np.empty(0)
+        if zlib.crc32(prices, zlib.crc32(body)) != checksum:
+            raise ValueError("checksum mismatch")
+        return json.loads(body.rstrip(b"\x00")), prices
+    except (OSError, ValueError, struct.error) as error:
+        logger.warning("Ignoring unusable state snapshot %s: %s", path, error)
+        return None
+
+
+def save_snapshot(strategy, path: str = STATE_SNAPSHOT_FILE) -> Optional[int]:
+    if not path:
+        return None
+    try:
+        return write_snapshot(path, *capture(strategy))
+    except OSError as error:
+        logger.warning("Could not write state snapshot: %s", error)
+        return None
+
+
+def restore_snapshot(strategy, interval: int = 60, path: str = STATE_SNAPSHOT_FILE, kraken_api=None) -> bool:
+    """
+    Resumes the strategy (prices, indicators, last trades, cooldown) and the portfolio
+    buckets from the snapshot, then feeds in only the candles that started after it
+    was taken. Returns False, leaving the strategy untouched, if there is no usable
+    snapshot, the gap is longer than the price buffer or the missed candles cannot be
+    fetched, so a full warm-up is needed.
+    """
+    snapshot = read_snapshot(path)
+    if snapshot is None:
+        return False
+    meta, prices = snapshot
+    saved_at = meta["saved_at"]
+    gap = time.time() - saved_at
+    if gap > strategy.indicators.prices.capacity * interval * 60:
+        logger.info("State snapshot is %.0fs old, more than the price buffer covers; warming up instead.", gap)
+        return False
+    # The missed candles are fetched first, so a failed fetch leaves the strategy
+    # untouched for a full warm-up rather than resuming across a silent gap
+    rows, _ = (kraken_api or get_kraken_api()).get_ohlc(strategy.pair, interval, since=int(saved_at))
+    if rows is None:
+        logger.warning("Could not fetch the candles missed since the state snapshot; warming up instead.")
+        return False
+    try:
+        strategy.restore(meta["strategy"], prices)
+    except (KeyError, ValueError) as error:
+        logger.warning("Could not restore state snapshot: %s", error)
+        strategy.indicators.reset()
+        return False
+    if meta.get("portfolio"):
+        restore_portfolio(meta["portfolio"])
+
+    missed = [float(row[4]) for row in rows if row[0] >= saved_at]
+    for price in missed:
+        strategy.indicators.update(price)
+    logger.info("Restored state from %.0fs ago (%s prices) and %s missed candles.", gap, len(prices), len(missed))
+    return True
@@ -0,0 +1,144 @@
+import itertools
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Optional, List, Dict, Union
+import numpy as np
+from backtest import run_backtest
+from logger_config import logger
+
+# Metrics returned per configuration; the per-candle arrays stay in the worker
+SUMMARY_KEYS = ("pnl", "return_pct", "trades", "buys", "sells", "fees", "max_drawdown", "max_drawdown_pct")
+
+# Worker-side state, set once per process by _init_worker
+_shared_blocks = []
+_closes = None
+_sentiment = None
+_backtest_kwargs = {}
+
+
+def grid_configurations(space: Dict[str, List]) -> List[Dict]:
+    """
+    Every combination of the listed values, e.g. {"neutral_buy_rsi": [30, 35, 40]}.
+    """
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+
+def random_configurations(space: Dict[str, Union[List, tuple]], count: int, seed: Optional[int] = None) -> List[Dict]:
+    """
+    Random samples from the space. Lists are sampled uniformly; (low, high) tuples
+    draw integers when both bounds are ints and floats otherwise.
+    """
+    rng = random.Random(seed)
+    configurations = []
+    for _ in range(count):
+        configuration = {}
+        for name, values in space.items():
+            if isinstance(values, tuple):
+                low, high = values
+                configuration[name] = rng.randint(low, high) if isinstance(low, int) and isinstance(high, int) else rng.uniform(low, high)
+            else:
+                configuration[name] = rng.choice(values)
+        configurations.append(configuration)
+    return configurations
+
+
+def _share_array(array: np.ndarray) -> tuple:
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+    return block, (block.name, array.shape, array.dtype.str)
+
+
+def _attach_array(spec: tuple) -> np.ndarray:
+    name, shape, dtype = spec
+    block = shared_memory.SharedMemory(name=name)
+    # Keep a reference so the mapping outlives this function
+    _shared_blocks.append(block)
+    return np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+
+
+def _init_worker(closes_spec: tuple, sentiment_spec: Optional[tuple], sentiment_value: float, backtest_kwargs: Dict):
+    global _closes, _sentiment, _backtest_kwargs
+    _closes = _attach_array(closes_spec)
+    _sentiment = _attach_array(sentiment_spec) if sentiment_spec else sentiment_value
+    _backtest_kwargs = backtest_kwargs
+
+
+def _evaluate(params: Dict) -> Dict:
+    result = run_backtest(_closes, sentiment=_sentiment, params=params, **_backtest_kwargs)
+    return dict({key: result[key] for key in SUMMARY_KEYS}, params=params)
+
+
+def run_sweep(closes: np.ndarray, configurations: List[Dict], sentiment: Union[float, np.ndarray] = 0.0,
+              rank_by: str = "pnl", workers: Optional[int] = None, chunksize: Optional[int] = None,
+              **backtest_kwargs) -> List[Dict]:
+    """
+    Backtests every configuration on a process pool and returns the results ranked
+    best-first by `rank_by`. The price (and sentiment) history is placed in shared
+    memory once, so workers map it instead of receiving a pickled copy per task.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunksize = chunksize or max(1, len(configurations) // (workers * 8))
+    closes = np.ascontiguousarray(closes, dtype=np.float64)
+    blocks = []
+    try:
+        closes_block, closes_spec = _share_array(closes)
+        blocks.append(closes_block)
+        sentiment_spec = None
+        sentiment_value = 0.0
+        if np.ndim(sentiment):
+            sentiment_block, sentiment_spec = _share_array(np.ascontiguousarray(sentiment, dtype=np.float64))
+            blocks.append(sentiment_block)
+        else:
+            sentiment_value = float(sentiment)
+
+        logger.info("Sweeping %s configurations over %s candles on %s workers.",
+                    len(configurations), len(closes), workers)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(closes_spec, sentiment_spec, sentiment_value, backtest_kwargs)) as executor:
+            results = list(executor.map(_evaluate, configurations, chunksize=chunksize))
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    results.sort(key=lambda result: result[rank_by], reverse=True)
+    return results
+
+
+if __name__ == "__main__":
+    # Usage: python sweep.py [pair] [interval] [samples]
+    from candle_store import CandleStore
+    from config import CANDLE_CACHE_DIR
+
+    pair = sys.argv[1] if len(sys.argv) > 1 else "XBTUSDT"
+    interval = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+    samples = int(sys.argv[3]) if len(sys.argv) > 3 else 10000
+    space = {
+        "strong_positive_sentiment": (0.3, 0.7),
+        "moderate_positive_sentiment": (0.05, 0.25),
+        "strong_negative_sentiment": (-0.7, -0.3),
+        "moderate_negative_sentiment": (-0.25, -0.05),
+        "strong_buy_rsi": (55, 75),
+        "strong_buy_macd_multiplier": (0.8, 1.0),
+        "moderate_buy_rsi": (50, 70),
+        "strong_sell_rsi": (40, 60),
+        "strong_sell_macd_multiplier": (1.0, 1.2),
+        "moderate_sell_rsi": (35, 55),
+        "neutral_buy_rsi": (25, 45),
+        "neutral_sell_rsi": (55, 75),
+        "rsi_window": (7, 21),
+        "short_window": (6, 16),
+        "long_window": (20, 40),
+        "signal_window": (5, 12),
+        "stop_loss_percent": [None, 0.02, 0.03, 0.05],
+        "take_profit_percent": [None, 0.1, 0.15, 0.2],
+    }
+    store = CandleStore(CANDLE_CACHE_DIR, pair, interval)
+    ranked = run_sweep(store.column("close"), random_configurations(space, samples, seed=0))
+    for rank, result in enumerate(ranked[:10], start=1):
+        logger.info("#%s: PnL %.2f, trades %s, max drawdown %.2f%%, params %s",
+                    rank, result['pnl'], result['trades'], result['max_drawdown_pct'], result['params'])
@@ -0,0 +1,81 @@
+import time
+from types import SimpleNamespace
+import numpy as np
+import pytest
+import backtest
+import trading_strategy
+from trading_strategy import TradingStrategy
+
+TRADE_VOLUME = 0.01
+# Live ticks are replayed one candle apart on a fake clock
+CANDLE_SECONDS = 60
+
+
+class RecordingKrakenAPI:
+    def __init__(self):
+        self.trades = []
+
+    def execute_trade(self, volume: float, side: str, pair: str = "XBTUSDT"):
+        self.trades.append((side, volume))
+
+
+class FixedPortfolio:
+    portfolio = {"HODL": 0.0, "YIELD": 0.0, "TRADING": TRADE_VOLUME}
+
+
+def replay_live(closes: np.ndarray, sentiment: float, cooldown: float, monkeypatch) -> list:
+    """
+    Feeds the prices to TradingStrategy one tick at a time, CANDLE_SECONDS apart,
+    and returns its trades as (tick index, side, volume).
+    """
+    api = RecordingKrakenAPI()
+    clock = SimpleNamespace(now=0.0)
+    monkeypatch.setattr(trading_strategy, "get_kraken_api", lambda: api)
+    monkeypatch.setattr(trading_strategy, "get_portfolio", lambda: FixedPortfolio)
+    monkeypatch.setattr(trading_strategy, "time", SimpleNamespace(time=lambda: clock.now,
+                                                                  perf_counter=time.perf_counter))
+    strategy = TradingStrategy(trade_cooldown=cooldown, rules=backtest.sentiment_ladder(), shadow_rules={})
+    strategy.sentiment_score = sentiment
+    strategy.market_volume = 1000.0
+    trades = []
+    for index, price in enumerate(closes.tolist()):
+        clock.now = index * CANDLE_SECONDS
+        strategy.indicators.update(price)
+        macd, signal = strategy.indicators.macd
+        strategy.decide(price, strategy.indicators.moving_average, strategy.indicators.rsi, macd, signal)
+        trades.extend((index, side, volume) for side, volume in api.trades)
+        api.trades.clear()
+    return trades
+
+
+@pytest.mark.parametrize("cooldown", [0, 5 * CANDLE_SECONDS, 90])
+@pytest.mark.parametrize("sentiment", [0.6, 0.3, 0.0, -0.3, -0.6])
+def test_backtest_matches_live_strategy_tick_by_tick(sentiment, cooldown, monkeypatch):
+    closes = 30000 + np.cumsum(np.random.default_rng(11).normal(0, 80, 3000))
+    result = backtest.run_backtest(closes, sentiment=sentiment, trade_volume=TRADE_VOLUME, cooldown=cooldown,
+                                   candle_seconds=CANDLE_SECONDS)
+    simulated = [(int(index), "buy" if side > 0 else "sell", float(size))
+                 for index, side, size in zip(result["trade_index"], result["trade_side"], result["trade_size"])]
+    live = replay_live(closes, sentiment, cooldown, monkeypatch)
+    assert live
+    assert simulated == live
+
+
+def test_cooldown_in_candles_spaces_out_trades():
+    closes = 30000 + np.cumsum(np.random.default_rng(11).normal(0, 80, 3000))
+    free = backtest.run_backtest(closes, sentiment=0.6, trade_volume=TRADE_VOLUME)
+    cooled = backtest.run_backtest(closes, sentiment=0.6, trade_volume=TRADE_VOLUME, cooldown=20)
+    assert np.min(np.diff(free["trade_index"])) < 20
+    assert np.min(np.diff(cooled["trade_index"])) >= 20
+    assert 0 < cooled["trades"] < free["trades"]
+
+
+def test_pnl_reconciles_with_trades_and_fees():
+    closes = 30000 + np.cumsum(np.random.default_rng(2).normal(0, 80, 3000))
+    result = backtest.run_backtest(closes, sentiment=0.0, trade_volume=TRADE_VOLUME)
+    notional = result["trade_size"] * result["trade_price"]
+    fees = notional * backtest.DEFAULT_PARAMS["transaction_fee_percentage"] / 100.0
+    position = np.sum(result["trade_side"] * result["trade_size"])
+    assert result["trades"] > 0
+    assert result["fees"] == pytest.approx(fees.sum())
+    assert result["pnl"] == pytest.approx(-np.sum(result["trade_side"] * notional) - fees.sum() + position * closes[-1])
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+from candle_engine import CandleEngine, resample
+from ohlcv import from_kraken_rows
+
+TIMEFRAMES = (5, 15, 60)
+# Aligned to every timeframe, so the first bar of each is complete
+START = 1_700_000_000 // 3600 * 3600
+
+
+def random_rows(count: int, seed: int, start: int = START) -> list:
+    rng = np.random.default_rng(seed)
+    closes = 30000 + np.cumsum(rng.normal(0, 20, count))
+    rows = []
+    for index, close in enumerate(closes):
+        open_ = close - rng.normal(0, 10)
+        high, low = max(open_, close) + rng.uniform(0, 15), min(open_, close) - rng.uniform(0, 15)
+        volume = rng.uniform(0, 3) if index % 17 else 0.0
+        rows.append([start + index * 60, f"{open_:.1f}", f"{high:.1f}", f"{low:.1f}", f"{close:.1f}",
+                     f"{rng.uniform(low, high):.1f}", f"{volume:.8f}", int(rng.integers(0, 40))])
+    return rows
+
+
+def assert_bars_equal(bars: np.ndarray, expected: np.ndarray):
+    assert len(bars) == len(expected)
+    assert np.array_equal(bars["time"], expected["time"]) and np.array_equal(bars["count"], expected["count"])
+    for field in ("open", "high", "low", "close", "vwap", "volume"):
+        np.testing.assert_allclose(bars[field], expected[field], rtol=1e-12, err_msg=field)
+
+
+def forming(row: list, close: float) -> list:
+    # The same minute later on: a new close, a wider range and more volume
+    return [row[0], row[1], f"{max(float(row[2]), close):.1f}", f"{min(float(row[3]), close):.1f}", f"{close:.1f}",
+            row[5], f"{float(row[6]) + 0.5:.8f}", row[7] + 3]
+
+
+def test_incremental_bars_match_resampled_base():
+    rows = random_rows(600, seed=1)
+    engine = CandleEngine(timeframes=TIMEFRAMES, history=1000)
+    # One bulk load, then small batches down the incremental path
+    engine.add_candles(rows[:200])
+    position = 200
+    rng = np.random.default_rng(2)
+    while position < len(rows):
+        step = int(rng.integers(1, 12))
+        engine.add_candles(rows[position:position + step])
+        position += step
+        base = from_kraken_rows(rows[:position])
+        for tf in TIMEFRAMES:
+            assert_bars_equal(engine.candles(tf), resample(base, tf * 60))
+    assert_bars_equal(engine.candles(1), from_kraken_rows(rows))
+
+
+def test_forming_last_bar_is_rebuilt_in_place():
+    rows = random_rows(307, seed=3)
+    engine = CandleEngine(timeframes=TIMEFRAMES)
+    engine.add_candles(rows)
+    for close in (30500.0, 29400.0, 30010.0):
+        rows[-1] = forming(rows[-1], close)
+        # Kraken sends the forming minute again along with the cursor's candle
+        assert engine.add_candles(rows[-2:]) == 0
+        base = from_kraken_rows(rows)
+        for tf in TIMEFRAMES:
+            expected = resample(base, tf * 60)
+            assert_bars_equal(engine.candles(tf), expected)
+            assert engine.closes(tf)[-1] == close
+            # 307 minutes leave every timeframe with a partial last bar
+            assert_bars_equal(engine.candles(tf, include_partial=False), expected[:-1])
+            closed_average = engine.indicators(tf, include_partial=False)["moving_average"]
+            if len(expected) > 7:
+                assert closed_average == pytest.approx(np.mean(expected["close"][-8:-1]))
+            else:
+                assert closed_average is None
+
+
+def test_base_starting_mid_bucket_leaves_out_the_incomplete_first_bar():
+    rows = random_rows(200, seed=4, start=START + 7 * 60)
+    engine = CandleEngine(timeframes=TIMEFRAMES)
+    for row in rows:
+        engine.add_candles([row])
+    base = from_kraken_rows(rows)
+    for tf in TIMEFRAMES:
+        assert_bars_equal(engine.candles(tf), resample(base, tf * 60)[1:])
@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+from candle_store import CandleStore
+
+INTERVAL = 60
+START = 1_700_000_000 - 1_700_000_000 % (INTERVAL * 60)
+
+
+def candle(index: int, close: float) -> list:
+    # Kraken sends time as an int, prices and volume as strings
+    return [START + index * INTERVAL * 60, f"{close - 1:.1f}", f"{close + 2:.1f}", f"{close - 2:.1f}",
+            f"{close:.1f}", f"{close:.1f}", "1.50000000", 10 + index]
+
+
+class FakeKrakenAPI:
+    """
+    Serves OHLC rows from a list, starting at the requested cursor like Kraken.
+    """
+    def __init__(self, rows: list):
+        self.rows = rows
+        self.calls = []
+
+    def get_ohlc(self, pair: str, interval: int, since=None):
+        self.calls.append(since)
+        rows = [row for row in self.rows if since is None or row[0] >= since]
+        return rows, rows[-1][0] if rows else since
+
+
+def test_incremental_sync_appends_only_new_rows(tmp_path):
+    api = FakeKrakenAPI([candle(i, 100.0 + i) for i in range(5)])
+    store = CandleStore(str(tmp_path), "XBTUSDT", INTERVAL)
+    assert store.sync(api) == 5
+    earlier = store.column("close")
+    api.rows += [candle(i, 100.0 + i) for i in range(5, 8)]
+    # The cursor's candle comes back, still forming, along with the three new ones
+    assert store.sync(api) == 3
+    assert api.calls == [None, START + 4 * INTERVAL * 60]
+    assert store.column("close").tolist() == [100.0 + i for i in range(8)]
+    assert store.column("count").tolist() == [10 + i for i in range(8)]
+    assert earlier.tolist() == [100.0 + i for i in range(5)]
+    assert not store.breaks
+
+    reopened = CandleStore(str(tmp_path), "XBTUSDT", INTERVAL)
+    assert len(reopened) == 8 and reopened.last == store.last
+    assert np.array_equal(reopened.column("time"), store.column("time"))
+
+
+def test_overlapping_newest_candle_replaces_the_last_row(tmp_path):
+    store = CandleStore(str(tmp_path), "XBTUSDT", INTERVAL)
+    store.append([candle(i, 100.0 + i) for i in range(4)], None)
+    earlier = store.column("close")
+    assert store.append([candle(3, 250.0), candle(4, 251.0)], None) == 1
+    assert store.column("close").tolist() == [100.0, 101.0, 102.0, 250.0, 251.0]
+    assert store.column("high")[3] == 252.0
+    # Views handed out before the replace still see the old file
+    assert earlier.tolist() == [100.0, 101.0, 102.0, 103.0]
+
+
+def test_gap_is_recorded_as_a_hole(tmp_path):
+    store = CandleStore(str(tmp_path), "XBTUSDT", INTERVAL)
+    store.append([candle(i, 100.0) for i in range(3)], None)
+    store.append([candle(i, 100.0) for i in range(10, 12)], None)
+    assert store.breaks == [3] and store.contiguous_start == 3
+    assert CandleStore(str(tmp_path), "XBTUSDT", INTERVAL).breaks == [3]
+    # Rewriting from before the hole drops it
+    store.append([candle(i, 100.0) for i in range(2, 5)], None)
+    assert store.breaks == [] and store.contiguous_start == 0
+
+
+@pytest.mark.parametrize("rows", [[candle(4, 104.0), candle(5, 105.0)], [candle(2, 202.0), candle(3, 203.0)]],
+                         ids=["append", "replace"])
+def test_interrupted_write_leaves_previous_columns_readable(tmp_path, monkeypatch, rows):
+    store = CandleStore(str(tmp_path), "XBTUSDT", INTERVAL)
+    store.append([candle(i, 100.0 + i) for i in range(4)], 1234)
+    write_column = store._write_column
+    written = []
+
+    def crash_midway(name, keep, values):
+        if len(written) == 3:
+            raise OSError("disk full")
+        written.append(name)
+        write_column(name, keep, values)
+
+    monkeypatch.setattr(store, "_write_column", crash_midway)
+    with pytest.raises(OSError):
+        store.append(rows, 5678)
+
+    reopened = CandleStore(str(tmp_path), "XBTUSDT", INTERVAL)
+    assert len(reopened) == 4 and reopened.last == 1234
+    assert reopened.column("close").tolist() == [100.0, 101.0, 102.0, 103.0]
+    assert reopened.column("time").tolist() == [candle(i, 0)[0] for i in range(4)]
+    # The next write repairs the partly written columns
+    reopened.append(rows, 5678)
+    first = (rows[0][0] - START) // (INTERVAL * 60)
+    expected = [100.0 + i for i in range(first)] + [float(row[4]) for row in rows]
+    for name in ("close", "time", "count", "volume"):
+        assert len(reopened.column(name)) == len(expected)
+    assert reopened.column("close").tolist() == expected
@@ -0,0 +1,74 @@
+import time
+from types import SimpleNamespace
+import pytest
+import decision_cache
+from decision_cache import DecisionCache
+
+INPUTS = {"latest_price": 60000.0, "trend_pct": 1.0, "sentiment": 0.2, "moving_average": 59800.0, "rsi": 55.0,
+          "macd": 40.0, "signal_line": 35.0}
+PORTFOLIO = {"HODL": 0.5, "YIELD": 0.2, "TRADING": 0.3}
+
+
+def moved(**changes) -> dict:
+    return dict(INPUTS, **changes)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(value=time.time())
+    monkeypatch.setattr(decision_cache, "time", SimpleNamespace(time=lambda: now.value))
+    return now
+
+
+def test_inputs_within_one_step_share_a_key():
+    cache = DecisionCache(path=None)
+    key = cache.make_key(INPUTS, PORTFOLIO)
+    # Relative fields quantize on a log scale, absolute ones in fixed steps
+    assert cache.make_key(moved(latest_price=60010.0, rsi=55.4, sentiment=0.21), PORTFOLIO) == key
+    assert cache.make_key(moved(latest_price=60300.0), PORTFOLIO) != key
+    assert cache.make_key(moved(rsi=58.0), PORTFOLIO) != key
+    assert cache.make_key(moved(macd=None), PORTFOLIO) != key
+    assert cache.make_key(INPUTS, dict(PORTFOLIO, TRADING=0.30001)) == key
+    assert cache.make_key(INPUTS, dict(PORTFOLIO, TRADING=0.31)) != key
+    # A Portfolio object keys the same as its buckets
+    assert cache.make_key(INPUTS, SimpleNamespace(portfolio=dict(PORTFOLIO))) == key
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = DecisionCache(path=None, ttl=60)
+    cache.store(INPUTS, PORTFOLIO, "buy")
+    # A material change skips the gate; the keyed entry still answers within the TTL
+    cache.store(moved(rsi=70.0), PORTFOLIO, "sell")
+    assert cache.lookup(INPUTS, PORTFOLIO) == "buy"
+    clock.value += 61
+    assert cache.lookup(INPUTS, PORTFOLIO) is None
+    assert cache.hits == 1 and cache.misses == 1
+
+
+def test_material_change_gate(clock):
+    cache = DecisionCache(path=None, ttl=600)
+    assert cache.has_material_change(INPUTS, PORTFOLIO)
+    cache.store(INPUTS, PORTFOLIO, "hold")
+    # Small drifts that cross a bucket edge still reuse the last decision
+    assert not cache.has_material_change(moved(latest_price=60100.0, rsi=56.5), PORTFOLIO)
+    assert cache.lookup(moved(latest_price=60100.0, rsi=56.5), PORTFOLIO) == "hold"
+    assert cache.has_material_change(moved(latest_price=60200.0), PORTFOLIO)
+    assert cache.has_material_change(moved(macd=None), PORTFOLIO)
+    assert cache.has_material_change(INPUTS, dict(PORTFOLIO, HODL=0.6))
+
+
+@pytest.mark.parametrize("portfolio", [None, SimpleNamespace(portfolio=dict(PORTFOLIO))],
+                         ids=["absent", "object"])
+def test_gate_holds_without_a_portfolio_dict(clock, portfolio):
+    cache = DecisionCache(path=None, ttl=600)
+    cache.store(INPUTS, portfolio, "hold")
+    assert not cache.has_material_change(INPUTS, portfolio)
+    assert cache.lookup(moved(rsi=56.0), portfolio) == "hold"
+
+
+def test_cache_survives_a_restart(tmp_path):
+    path = str(tmp_path / "decisions.json")
+    DecisionCache(path=path).store(INPUTS, PORTFOLIO, "buy")
+    restarted = DecisionCache(path=path)
+    assert not restarted.has_material_change(INPUTS, PORTFOLIO)
+    assert restarted.lookup(INPUTS, PORTFOLIO) == "buy"
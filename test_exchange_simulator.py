@@ -0,0 +1,99 @@
+import pytest
+from exchange_simulator import MatchingEngine, SimulatedOrder
+from order_book import OrderBook
+
+FEE_RATE = 0.001
+
+
+class Recorder:
+    def __init__(self):
+        self.trades = []
+        self.orders = []
+
+    def engine(self, balances: dict) -> MatchingEngine:
+        engine = MatchingEngine("XBTUSDT", balances, FEE_RATE, lambda: 1000.0, self.trades.append,
+                                lambda order: self.orders.append((order.txid, order.status)))
+        engine.update_market(market(asks=[["100.0", "1.0"], ["101.0", "2.0"]], bids=[["99.0", "1.0"], ["98.0", "2.0"]]))
+        return engine
+
+
+def market(asks: list, bids: list) -> OrderBook:
+    book = OrderBook(depth=10)
+    book.apply_snapshot(asks, bids)
+    return book
+
+
+def order(txid: str, side: str, volume: float, price=None, ordertype: str = "limit") -> SimulatedOrder:
+    return SimulatedOrder(txid, "XBTUSDT", side, ordertype, volume, price, None, 1000.0)
+
+
+def test_limit_buy_walks_market_levels_up_to_its_price_then_rests():
+    recorder = Recorder()
+    balances = {"XBT": 0.0, "USDT": 10000.0}
+    engine = recorder.engine(balances)
+    buy = order("O1", "buy", 2.5, 100.5)
+    engine.add(buy)
+    assert [(trade["price"], trade["vol"]) for trade in recorder.trades] == [("100.00000000", "1.00000000")]
+    assert buy.status == "open" and buy.vol_exec == pytest.approx(1.0)
+    assert engine.bids[100.5][0] is buy
+    assert balances["XBT"] == pytest.approx(1.0)
+    assert balances["USDT"] == pytest.approx(10000.0 - 100.0 * (1 + FEE_RATE))
+
+
+def test_resting_order_fills_when_the_market_crosses_it():
+    recorder = Recorder()
+    engine = recorder.engine({"XBT": 0.0, "USDT": 10000.0})
+    buy = order("O1", "buy", 1.0, 99.5)
+    engine.add(buy)
+    assert not recorder.trades
+    engine.update_market(market(asks=[["99.4", "3.0"]], bids=[["99.0", "1.0"]]))
+    assert buy.status == "closed"
+    assert recorder.trades[-1]["price"] == "99.40000000" and recorder.trades[-1]["maker"] is False
+    assert 99.5 not in engine.bids
+
+
+def test_resting_orders_match_in_price_time_priority_before_the_market():
+    recorder = Recorder()
+    engine = recorder.engine({"XBT": 10.0, "USDT": 10000.0})
+    first, second = order("S1", "sell", 0.5, 100.0), order("S2", "sell", 0.5, 100.0)
+    engine.add(first)
+    engine.add(second)
+    engine.add(order("B1", "buy", 0.7, 100.0))
+    fills = [(trade["ordertxid"], trade["vol"]) for trade in recorder.trades]
+    assert fills == [("S1", "0.50000000"), ("B1", "0.50000000"), ("S2", "0.20000000"), ("B1", "0.20000000")]
+    assert first.status == "closed" and second.remaining == pytest.approx(0.3)
+    assert [entry for entry in engine.asks[100.0]] == [second]
+
+
+def test_market_order_takes_what_the_book_has_and_never_rests():
+    recorder = Recorder()
+    balances = {"XBT": 10.0, "USDT": 0.0}
+    engine = recorder.engine(balances)
+    sell = order("M1", "sell", 5.0, ordertype="market")
+    engine.add(sell)
+    assert sell.status == "closed" and sell.vol_exec == pytest.approx(3.0)
+    assert not engine.asks and not engine.bids
+    proceeds = 99.0 * 1.0 + 98.0 * 2.0
+    assert balances["USDT"] == pytest.approx(proceeds * (1 - FEE_RATE))
+    assert balances["XBT"] == pytest.approx(7.0)
+    # The taken liquidity stays gone until the next market update
+    assert not engine.market_book.bids
+
+
+def test_cancel_removes_a_resting_order():
+    recorder = Recorder()
+    engine = recorder.engine({"XBT": 0.0, "USDT": 10000.0})
+    buy = order("O1", "buy", 1.0, 95.0)
+    engine.add(buy)
+    assert engine.cancel(buy)
+    assert buy.status == "canceled" and not engine.bids
+    assert not engine.cancel(buy)
+    assert recorder.orders[-1] == ("O1", "canceled")
+
+
+def test_check_funds_includes_fees():
+    engine = Recorder().engine({"XBT": 1.0, "USDT": 100.0})
+    assert engine.check_funds("sell", 1.0, None)
+    assert not engine.check_funds("sell", 1.5, None)
+    assert engine.check_funds("buy", 0.99, 100.0)
+    assert not engine.check_funds("buy", 1.0, 100.0)
@@ -0,0 +1,63 @@
+import time
+import openai
+import pytest
+import gpt_trading_decision
+from decision_cache import DecisionCache
+from gpt_trading_decision import gpt_trading_decision as decide
+from openai_stub import OpenAIStubServer
+
+REASON = "REASON: " + "Momentum is fading while sentiment turns negative. " * 8
+PRICES = [59000.0, 59500.0, 60000.0]
+PORTFOLIO = {"HODL": 0.5, "YIELD": 0.2, "TRADING": 0.3}
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    server = OpenAIStubServer(port=0, first_token_delay=0.05, token_delay=0.03)
+    server.start()
+    monkeypatch.setattr(gpt_trading_decision, "_ai_client",
+                        openai.OpenAI(api_key="stub", base_url=server.base_url, max_retries=0))
+    monkeypatch.setattr(gpt_trading_decision, "_decision_cache", DecisionCache(path=None))
+    yield server
+    server.stop()
+
+
+def ask(stream: bool, deadline: float = 5.0) -> str:
+    return decide(60000.0, PRICES, 0.1, 59800.0, 55.0, 40.0, 35.0, PORTFOLIO, stream=stream, deadline=deadline)
+
+
+def test_stream_returns_once_the_action_line_is_parsed(stub):
+    stub.reply = "ACTION: SELL\n" + REASON
+    started = time.monotonic()
+    assert ask(stream=True) == "sell"
+    elapsed = time.monotonic() - started
+    # The reasoning takes over a second to stream in full
+    assert elapsed < len(list(stub._tokens())) * stub.token_delay / 2
+    assert stub.requests[-1]["stream"] is True
+
+
+def test_stream_holds_when_the_deadline_passes(stub):
+    stub.first_token_delay = 1.0
+    stub.reply = "ACTION: BUY\n" + REASON
+    started = time.monotonic()
+    assert ask(stream=True, deadline=0.2) == "hold"
+    assert time.monotonic() - started < 0.8
+    # A deadline miss is not remembered as a decision
+    assert gpt_trading_decision.get_decision_cache()._last is None
+
+
+@pytest.mark.parametrize("reply, action", [("ACTION: BUY\n" + REASON, "buy"),
+                                           ("I would sell here: momentum is fading.", "sell")])
+def test_both_modes_cache_the_normalized_action(stub, reply, action):
+    stub.reply = reply
+    assert ask(stream=False) == action
+    assert gpt_trading_decision.get_decision_cache()._last["decision"] == action
+    # The streaming path reuses the same cached action without calling the model
+    assert ask(stream=True) == action
+    assert len(stub.requests) == 1
+
+
+def test_reply_without_an_action_holds_and_is_not_cached(stub):
+    stub.reply = "The market is unclear."
+    assert ask(stream=False) == "hold"
+    assert gpt_trading_decision.get_decision_cache()._last is None
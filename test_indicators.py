@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from indicators import RingBuffer, StreamingIndicators, ema_series, macd_series, rsi_series, sma_series
+
+
+def random_prices(count: int, seed: int) -> np.ndarray:
+    # Flat stretches exercise zero price changes in the RSI
+    steps = np.random.default_rng(seed).normal(0, 40, count)
+    steps[::25] = 0.0
+    return 30000 + np.cumsum(steps)
+
+
+def assert_matches(value, expected: float):
+    if np.isnan(expected):
+        assert value is None
+    else:
+        assert value == pytest.approx(expected, rel=1e-9, abs=1e-9)
+
+
+@pytest.mark.parametrize("capacity", [30, 257])
+def test_streaming_matches_series_tick_by_tick(capacity):
+    prices = random_prices(3000, seed=capacity)
+    sma = sma_series(prices, 7)
+    rsi = rsi_series(prices, 14)
+    macd, signal = macd_series(prices, 12, 26, 7)
+    short_ema, long_ema = ema_series(prices, 12), ema_series(prices, 26)
+    engine = StreamingIndicators(capacity=capacity)
+    for index, price in enumerate(prices.tolist()):
+        engine.update(price)
+        assert_matches(engine.moving_average, sma[index])
+        assert_matches(engine.rsi, rsi[index])
+        assert_matches(engine.macd[0], macd[index])
+        assert_matches(engine.macd[1], signal[index])
+        assert engine._short_ema == pytest.approx(short_ema[index], rel=1e-12)
+        assert engine._long_ema == pytest.approx(long_ema[index], rel=1e-12)
+    # The buffer has wrapped many times and holds the newest prices in order
+    assert len(engine.prices) == capacity
+    assert np.array_equal(engine.prices.to_array(), prices[-capacity:])
+
+
+def test_ring_buffer_wraps_and_evicts_oldest():
+    buffer = RingBuffer(3)
+    assert [buffer.append(value) for value in (1.0, 2.0, 3.0, 4.0, 5.0)] == [None, None, None, 1.0, 2.0]
+    assert buffer.to_list() == [3.0, 4.0, 5.0]
+    assert buffer[-1] == 5.0 and buffer[0] == 3.0
+    with pytest.raises(IndexError):
+        buffer[3]
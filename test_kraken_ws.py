@@ -0,0 +1,70 @@
+import asyncio
+import json
+import socket
+import threading
+import pytest
+import requests
+from api_kraken import KrakenAPI
+from config import API_KEY, API_SECRET
+from kraken_ws import KrakenMarketFeed, ReplayServer
+from nonce_allocator import NonceAllocator
+from response_cache import ResponseCache
+
+ASKS = [["61000.0", "0.50000000", "1700000000.0"], ["61001.0", "2.00000000", "1700000000.0"]]
+BIDS = [["60999.0", "1.00000000", "1700000000.0"], ["60998.0", "3.00000000", "1700000000.0"]]
+MESSAGES = [
+    json.dumps({"event": "heartbeat"}),
+    json.dumps([1, {"c": ["60999.5", "0.01"], "v": ["10.0", "1234.5"]}, "ticker", "XBT/USDT"]),
+    json.dumps([2, {"as": ASKS, "bs": BIDS}, "book-10", "XBT/USDT"]),
+]
+
+
+class CountingTransport:
+    """
+    Stands in for the HTTP session; every call is counted and fails.
+    """
+    def __init__(self):
+        self.calls = []
+
+    def get(self, url, headers=None, params=None):
+        self.calls.append(url)
+        raise requests.ConnectionError("no network in this test")
+
+    def post(self, url, headers=None, data=None):
+        self.calls.append(url)
+        raise requests.ConnectionError("no network in this test")
+
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+@pytest.fixture
+def feed():
+    server = ReplayServer(MESSAGES, port=free_port())
+    threading.Thread(target=lambda: asyncio.run(server.serve_forever()), daemon=True).start()
+    market_feed = KrakenMarketFeed(url=server.url)
+    market_feed.start()
+    assert market_feed.wait_until_ready(10)
+    yield market_feed
+    market_feed.stop()
+
+
+def test_attached_feed_serves_prices_and_books_without_http(feed, tmp_path):
+    transport = CountingTransport()
+    api = KrakenAPI(API_KEY, API_SECRET, "http://127.0.0.1:1", transport=transport, cache=ResponseCache(),
+                    nonce_allocator=NonceAllocator(str(tmp_path / "nonce.txt")))
+    api.attach_market_feed(feed)
+    assert api.get_btc_price() == 60999.5
+    assert api.get_market_volume() == 1234.5
+    assert api.get_optimal_price(api.get_btc_order_book(), "buy") == round(61000.0 - 0.05, 1)
+    assert api.get_optimal_price(feed.get_book(), "sell", volume=2.0) == round((60999.0 + 60998.0) / 2 + 0.05, 1)
+    assert transport.calls == []
+
+    # Disconnected, the client falls back to REST
+    feed.stop()
+    assert api.get_btc_price() is None
+    assert transport.calls and all(url.endswith("/0/public/Ticker") or url.endswith("/0/public/AssetPairs")
+                                   for url in transport.calls)
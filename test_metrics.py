@@ -0,0 +1,88 @@
+import urllib.error
+import urllib.request
+import numpy as np
+import pytest
+import metrics
+from metrics import Counter, Histogram
+
+BUCKETS = tuple(float(bound) for bound in range(1, 11))
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(metrics, "_enabled", True)
+    yield
+    metrics.reset()
+
+
+def test_quantile_interpolates_within_buckets(enabled):
+    histogram = Histogram("test_seconds", "Test", buckets=BUCKETS)
+    assert histogram.quantile(0.5) is None
+    # One value in the middle of each bucket: quantiles land exactly on q * 10
+    for value in np.arange(0.5, 10, 1.0):
+        histogram.observe(value)
+    assert histogram.quantile(0.5) == pytest.approx(5.0)
+    assert histogram.quantile(0.99) == pytest.approx(9.9)
+    assert histogram.quantile(0.05) == pytest.approx(0.5)
+
+
+def test_quantile_of_a_uniform_sample(enabled):
+    histogram = Histogram("test_seconds", "Test", ("stage",), buckets=BUCKETS)
+    for value in np.random.default_rng(9).uniform(0, 10, 20000):
+        histogram.observe(value, "decide")
+    assert histogram.count("decide") == 20000
+    assert histogram.quantile(0.5, "decide") == pytest.approx(5.0, abs=0.1)
+    assert histogram.quantile(0.99, "decide") == pytest.approx(9.9, abs=0.1)
+    # Values past the largest bucket report its bound
+    overflow = Histogram("test_overflow_seconds", "Test", buckets=BUCKETS)
+    for value in (20.0, 30.0):
+        overflow.observe(value)
+    assert overflow.quantile(0.5) == 10.0
+
+
+def test_metrics_endpoint_serves_the_text_format(enabled):
+    metrics.API_REQUESTS.inc("Ticker")
+    metrics.API_REQUESTS.inc("Ticker")
+    metrics.STAGE_SECONDS.observe(0.003, "decide")
+    server = metrics.start_server(port=0)
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with urllib.request.urlopen(url + "/metrics", timeout=5) as response:
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            lines = response.read().decode().splitlines()
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(url + "/other", timeout=5)
+        assert error.value.code == 404
+    finally:
+        metrics.stop_server()
+
+    assert "# TYPE trading_bot_api_requests_total counter" in lines
+    assert 'trading_bot_api_requests_total{endpoint="Ticker"} 2.0' in lines
+    assert "# TYPE trading_bot_stage_seconds histogram" in lines
+    assert 'trading_bot_stage_seconds_bucket{stage="decide",le="0.0025"} 0' in lines
+    assert 'trading_bot_stage_seconds_bucket{stage="decide",le="0.005"} 1' in lines
+    assert 'trading_bot_stage_seconds_bucket{stage="decide",le="+Inf"} 1' in lines
+    assert 'trading_bot_stage_seconds_sum{stage="decide"} 0.003' in lines
+    assert 'trading_bot_stage_seconds_count{stage="decide"} 1' in lines
+    assert "# TYPE trading_bot_stage_seconds_quantile gauge" in lines
+    assert any(line.startswith('trading_bot_stage_seconds_quantile{stage="decide",quantile="0.99"} ')
+               for line in lines)
+    # Every sample line is "name{labels} value"
+    for line in lines:
+        if not line.startswith("#"):
+            float(line.rsplit(" ", 1)[1])
+
+
+def test_disabled_metrics_record_nothing(monkeypatch):
+    monkeypatch.setattr(metrics, "_enabled", False)
+    counter = Counter("test_total", "Test", ("endpoint",))
+    histogram = Histogram("test_seconds", "Test", buckets=BUCKETS)
+    counter.inc("Ticker")
+    histogram.observe(1.5)
+    assert counter.value("Ticker") == 0.0
+    assert histogram.count() == 0 and histogram.quantile(0.5) is None
+    # Spans share one no-op instead of timing anything
+    with metrics.span("decide") as span:
+        assert span is metrics.span("fetch") is metrics._NULL_SPAN
+    assert metrics.STAGE_SECONDS.count("decide") == 0
+    assert counter.expose() == ["# HELP test_total Test", "# TYPE test_total counter"]
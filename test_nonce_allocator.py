@@ -0,0 +1,51 @@
+import os
+import threading
+import time
+from nonce_allocator import NonceAllocator, get_nonce_allocator, nonce_file_for
+
+
+def test_nonces_are_unique_and_increasing_across_threads(tmp_path):
+    allocator = NonceAllocator(str(tmp_path / "nonce.txt"), reserve=50)
+    per_thread = {}
+
+    def draw(name: str):
+        per_thread[name] = [allocator.next() for _ in range(2000)]
+
+    threads = [threading.Thread(target=draw, args=(f"worker-{i}",)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    every = [nonce for nonces in per_thread.values() for nonce in nonces]
+    assert len(set(every)) == len(every)
+    for nonces in per_thread.values():
+        assert nonces == sorted(nonces) and len(set(nonces)) == len(nonces)
+
+
+def test_restart_continues_above_every_issued_nonce(tmp_path):
+    path = str(tmp_path / "nonce.txt")
+    first = NonceAllocator(path, reserve=1000)
+    # Far ahead of the clock, as after the clock stepping back
+    first._last = int(time.time() * 1000) + 10_000_000
+    issued = [first.next() for _ in range(10)]
+    restarted = NonceAllocator(path, reserve=1000)
+    assert restarted.next() > max(issued)
+
+
+def test_unreadable_file_falls_back_to_clock(tmp_path):
+    path = tmp_path / "nonce.txt"
+    path.write_text("not a number")
+    before = int(time.time() * 1000)
+    assert NonceAllocator(str(path)).next() >= before
+
+
+def test_each_api_key_persists_its_own_mark(tmp_path):
+    path = str(tmp_path / "nonce.txt")
+    assert nonce_file_for("key-a", path) != nonce_file_for("key-b", path)
+    assert "key-a" not in nonce_file_for("key-a", path)
+    first, second = get_nonce_allocator("key-a", path), get_nonce_allocator("key-b", path)
+    assert get_nonce_allocator("key-a", path) is first
+    first.next()
+    second.next()
+    assert os.path.exists(first.path) and os.path.exists(second.path)
+    assert first.path != second.path
@@ -0,0 +1,63 @@
+import zlib
+import numpy as np
+from order_book import OrderBook
+
+
+def reference_checksum(asks: list, bids: list) -> int:
+    # Kraken's book checksum: the top 10 asks (lowest first) then the top 10 bids
+    # (highest first), each price and volume with the decimal point and leading
+    # zeros removed, concatenated and CRC32'd
+    def field(value: str) -> str:
+        return value.replace(".", "").lstrip("0")
+    top_asks = sorted(asks, key=lambda level: float(level[0]))[:10]
+    top_bids = sorted(bids, key=lambda level: -float(level[0]))[:10]
+    text = "".join(field(price) + field(volume) for price, volume in top_asks + top_bids)
+    return zlib.crc32(text.encode())
+
+
+def random_levels(rng: np.random.Generator, count: int, low: float, high: float) -> list:
+    prices = rng.choice(np.arange(int(low * 10), int(high * 10)), count, replace=False) / 10
+    return [[f"{price:.1f}", f"{volume:.8f}"] for price, volume in zip(prices, rng.uniform(0.0001, 5, count))]
+
+
+def test_checksum_matches_reference():
+    rng = np.random.default_rng(7)
+    for _ in range(200):
+        asks = random_levels(rng, 25, 60001, 60100)
+        bids = random_levels(rng, 25, 59900, 60000)
+        book = OrderBook(depth=25)
+        book.apply_snapshot(asks, bids)
+        assert book.checksum() == reference_checksum(asks, bids)
+
+
+def test_checksum_strips_leading_zeros():
+    book = OrderBook()
+    book.apply_snapshot([["0.05005", "0.00000500"]], [["0.05000", "0.00001000"]])
+    assert book.checksum() == zlib.crc32(b"5005500" + b"50001000")
+
+
+def test_updates_track_reference_and_detect_mismatch():
+    rng = np.random.default_rng(3)
+    asks = {price: volume for price, volume in random_levels(rng, 10, 60001, 60050)}
+    bids = {price: volume for price, volume in random_levels(rng, 10, 59950, 60000)}
+    book = OrderBook(depth=10)
+    book.apply_snapshot([[p, v] for p, v in asks.items()], [[p, v] for p, v in bids.items()])
+    for _ in range(500):
+        side = asks if rng.random() < 0.5 else bids
+        low, high = (60001, 60050) if side is asks else (59950, 60000)
+        price = f"{rng.integers(low * 10, high * 10) / 10:.1f}"
+        volume = "0.00000000" if price in side and rng.random() < 0.5 else f"{rng.uniform(0.0001, 5):.8f}"
+        if float(volume) == 0:
+            del side[price]
+        else:
+            side[price] = volume
+        # Levels past the subscribed depth drop out, as Kraken stops reporting them
+        for levels, descending in ((asks, False), (bids, True)):
+            for extra in sorted(levels, key=float, reverse=descending)[10:]:
+                del levels[extra]
+        expected = reference_checksum([[p, v] for p, v in asks.items()], [[p, v] for p, v in bids.items()])
+        update = [[price, volume]]
+        applied = book.apply_update(asks=update if side is asks else None, bids=update if side is bids else None,
+                                    checksum=str(expected))
+        assert applied
+    assert not book.apply_update(asks=[["60001.0", "1.00000000"]], checksum=str(expected))
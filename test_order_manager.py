@@ -0,0 +1,74 @@
+import pytest
+from api_kraken import KrakenAPI
+from config import API_KEY, API_SECRET
+from exchange_simulator import SimulatedExchange
+from nonce_allocator import NonceAllocator
+from order_manager import OrderManager
+from response_cache import ResponseCache
+
+
+@pytest.fixture
+def exchange():
+    # A slow clock keeps the market still for the length of a test
+    simulator = SimulatedExchange(seed=5)
+    simulator.start(port=0, ws_port=None, tick_interval=60)
+    yield simulator
+    simulator.stop()
+
+
+@pytest.fixture
+def manager(exchange, tmp_path):
+    api = KrakenAPI(API_KEY, API_SECRET, exchange.base_url, cache=ResponseCache(),
+                    nonce_allocator=NonceAllocator(str(tmp_path / "nonce.txt")))
+    return OrderManager(api)
+
+
+def test_submit_prices_from_the_book_and_rests_below_the_market(exchange, manager):
+    resting = manager.submit("buy", 0.01, 50000.0)
+    assert resting.status == "open" and exchange.orders[resting.txid].status == "open"
+    priced = manager.submit("sell", 0.01)
+    assert priced.price == pytest.approx(exchange.markets["XBTUSDT"].price, rel=0.01)
+    assert manager.submit("buy", 10_000.0, 50000.0) is None
+    assert resting in manager.open_orders()
+
+
+def test_batch_matches_input_order_and_leaves_priceless_orders_out(exchange, manager, monkeypatch):
+    placed = manager.submit_batch([{"side": "buy", "volume": 0.01, "price": 50000.0},
+                                   {"side": "buy", "volume": 10_000.0, "price": 50000.0},
+                                   {"side": "sell", "volume": 0.02, "price": 70000.0}])
+    assert [order.volume if order else None for order in placed] == [0.01, None, 0.02]
+    assert exchange.requests["AddOrderBatch"] == 1
+    assert {exchange.orders[order.txid].userref for order in placed if order} == \
+        {order.userref for order in placed if order}
+
+    real_optimal_price = manager.optimal_price
+    monkeypatch.setattr(manager, "optimal_price", lambda pair, side, volume, book=None:
+                        None if side == "sell" else real_optimal_price(pair, side, volume, book))
+    placed = manager.submit_batch([{"side": "sell", "volume": 0.01}, {"side": "buy", "volume": 0.01, "price": 50000.0},
+                                   {"side": "buy", "volume": 0.03, "price": 51000.0}])
+    assert placed[0] is None and [order.volume for order in placed[1:]] == [0.01, 0.03]
+    assert exchange.requests["AddOrderBatch"] == 2
+    assert [exchange.orders[order.txid].price for order in placed[1:]] == [50000.0, 51000.0]
+    assert len(exchange.orders) == 4
+
+
+def test_replace_moves_the_unfilled_volume_with_edit_order(exchange, manager):
+    events = []
+    manager.listeners.append(lambda order, event: events.append((order.txid, event)))
+    original = manager.submit("buy", 0.01, 50000.0)
+    replacement = manager.replace(original.txid, 51000.0)
+    assert replacement.price == 51000.0 and replacement.volume == pytest.approx(0.01)
+    assert original.status == "replaced" and original.replaced_by == replacement.txid
+    assert exchange.orders[original.txid].status == "canceled"
+    assert exchange.orders[replacement.txid].price == 51000.0
+    assert manager.open_orders() == [replacement]
+    assert events == [(original.txid, "replaced")]
+    assert manager.replace(original.txid, 52000.0) is None
+
+
+def test_cancel_closes_the_order_on_both_sides(exchange, manager):
+    order = manager.submit("buy", 0.01, 50000.0)
+    assert manager.cancel(order.txid)
+    assert order.status == "canceled" and exchange.orders[order.txid].status == "canceled"
+    assert not manager.open_orders()
+    assert not manager.cancel(order.txid)
@@ -0,0 +1,132 @@
+import threading
+import time
+import pytest
+from api_kraken import KrakenAPI
+from config import API_KEY, API_SECRET
+from nonce_allocator import NonceAllocator
+from rate_limiter import CallCounter, KrakenRateLimiter, RequestCoalescer
+from response_cache import ResponseCache
+
+
+class FakeClock:
+    """
+    Monotonic clock that only moves when told to, or when something sleeps on it.
+    """
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class Reply:
+    def __init__(self, payload: dict):
+        self.payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self) -> dict:
+        return self.payload
+
+
+class CountingTransport:
+    """
+    Answers every GET with the number of calls made so far. Calls block until
+    `release` is set, so concurrent callers pile up behind the first.
+    """
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+        self.release.set()
+        self._lock = threading.Lock()
+
+    def get(self, url, headers=None, params=None):
+        with self._lock:
+            self.calls.append(url)
+        self.release.wait(5)
+        return Reply({"error": [], "result": {"unixtime": len(self.calls)}})
+
+
+def client(tmp_path, transport, coalescer: RequestCoalescer, rate_limiter=None) -> KrakenAPI:
+    return KrakenAPI(API_KEY, API_SECRET, "http://127.0.0.1:1", transport=transport, coalescer=coalescer,
+                     rate_limiter=rate_limiter or KrakenRateLimiter(1e9, 1e9, 1e9, 1e9),
+                     cache=ResponseCache(max_entries=0), nonce_allocator=NonceAllocator(str(tmp_path / "nonce.txt")))
+
+
+def test_concurrent_identical_calls_make_one_request(tmp_path):
+    transport = CountingTransport()
+    transport.release.clear()
+    api = client(tmp_path, transport, RequestCoalescer(window=0.5, clock=FakeClock()))
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(api._make_request("Time", "/0/public/")))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.2)
+    transport.release.set()
+    for thread in threads:
+        thread.join()
+    assert len(transport.calls) == 1
+    assert results == [{"unixtime": 1}] * 8
+
+
+def test_coalesced_result_expires_after_the_window(tmp_path):
+    transport = CountingTransport()
+    clock = FakeClock()
+    api = client(tmp_path, transport, RequestCoalescer(window=0.5, clock=clock))
+    assert api._make_request("Time", "/0/public/") == {"unixtime": 1}
+    clock.now += 0.4
+    assert api._make_request("Time", "/0/public/") == {"unixtime": 1}
+    # Other parameters are a different request
+    assert api._make_request("Time", "/0/public/", {"pair": "ETHUSDT"}) == {"unixtime": 2}
+    clock.now += 0.2
+    assert api._make_request("Time", "/0/public/") == {"unixtime": 3}
+    assert len(transport.calls) == 3
+
+
+def test_failures_are_not_shared():
+    def fail():
+        raise OSError("down")
+
+    coalescer = RequestCoalescer(window=10, clock=FakeClock())
+    with pytest.raises(OSError):
+        coalescer.call("key", fail)
+    assert coalescer.call("key", lambda: None) is None
+    assert coalescer.call("key", lambda: "fresh") == "fresh"
+    assert coalescer.call("key", lambda: "later") == "fresh"
+
+
+def test_counter_blocks_past_the_tier_limit_and_decays():
+    clock = FakeClock()
+    counter = CallCounter(max_counter=5, decay_rate=0.5, clock=clock, sleep=clock.sleep)
+    assert [counter.acquire() for _ in range(5)] == [0.0] * 5
+    assert counter.acquire() == pytest.approx(2.0)
+    assert clock.sleeps == [pytest.approx(2.0)]
+    # Four seconds of decay make room for two more calls without waiting
+    clock.now += 4.0
+    assert counter.acquire() == 0.0 and counter.acquire() == 0.0
+    assert counter.counter == pytest.approx(5.0)
+    clock.now += 100.0
+    counter.acquire()
+    assert counter.counter == pytest.approx(1.0)
+
+
+def test_limiter_charges_private_costs_and_penalties():
+    clock = FakeClock()
+    limiter = KrakenRateLimiter(public_max=2, public_decay=1, private_max=4, private_decay=1,
+                                clock=clock, sleep=clock.sleep)
+    limiter.acquire("AddOrder", is_private=True)
+    limiter.acquire("Ledgers", is_private=True)
+    limiter.acquire("Balance", is_private=True)
+    assert limiter.private.counter == pytest.approx(3.0) and limiter.public.counter == 0.0
+    limiter.acquire("Ledgers", is_private=True)
+    assert clock.sleeps == [pytest.approx(1.0)]
+    limiter.penalize(is_private=False)
+    limiter.acquire("Ticker", is_private=False)
+    assert clock.sleeps[-1] == pytest.approx(1.0)
@@ -0,0 +1,87 @@
+import pytest
+from api_kraken import KrakenAPI
+from config import API_KEY, API_SECRET
+from nonce_allocator import NonceAllocator
+from rate_limiter import KrakenRateLimiter, RequestCoalescer
+from response_cache import ResponseCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class Reply:
+    def __init__(self, payload: dict):
+        self.payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self) -> dict:
+        return self.payload
+
+
+class CountingTransport:
+    """
+    Serves AssetPairs and Ticker like Kraken, with a price that rises on every
+    Ticker call, and counts calls per endpoint.
+    """
+    def __init__(self):
+        self.calls = []
+
+    def get(self, url, headers=None, params=None):
+        method = url.rsplit("/", 1)[-1]
+        self.calls.append(method)
+        if method == "AssetPairs":
+            return Reply({"error": [], "result": {"XXBTZUSD": {"altname": "XBTUSD", "wsname": "XBT/USD"}}})
+        price = 60000.0 + self.calls.count("Ticker")
+        return Reply({"error": [], "result": {"XXBTZUSD": {"c": [str(price), "0.1"], "v": ["1.0", "2.0"]}}})
+
+
+def test_entries_expire_after_their_endpoint_ttl():
+    clock = FakeClock()
+    cache = ResponseCache(ttls={"Ticker": 2.0}, clock=clock)
+    cache.set("key", "Ticker", {"c": ["1.0"]})
+    assert cache.get("key", "Ticker") == (True, {"c": ["1.0"]})
+    clock.now += 1.9
+    assert cache.get("key", "Ticker")[0]
+    clock.now += 0.2
+    assert cache.get("key", "Ticker") == (False, None)
+    assert cache.stats() == {"hits": 2, "misses": 1, "evictions": 0, "entries": 0}
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2, clock=FakeClock())
+    cache.set("a", "Depth", 1)
+    cache.set("b", "Depth", 2)
+    assert cache.get("a", "Depth")[0]
+    cache.set("c", "Depth", 3)
+    assert cache.get("b", "Depth") == (False, None)
+    assert cache.get("a", "Depth") == (True, 1) and cache.get("c", "Depth") == (True, 3)
+    assert cache.evictions == 1
+
+
+def test_endpoints_without_a_ttl_are_never_stored():
+    cache = ResponseCache(clock=FakeClock())
+    assert not cache.is_cacheable("Balance") and not ResponseCache(max_entries=0).is_cacheable("Ticker")
+    cache.set("key", "Balance", {"XBT": "1.0"})
+    assert cache.get("key", "Balance") == (False, None)
+
+
+def test_client_serves_public_calls_from_the_cache_until_they_expire(tmp_path):
+    clock = FakeClock()
+    transport = CountingTransport()
+    api = KrakenAPI(API_KEY, API_SECRET, "http://127.0.0.1:1", transport=transport,
+                    rate_limiter=KrakenRateLimiter(1e9, 1e9, 1e9, 1e9), coalescer=RequestCoalescer(clock=clock),
+                    cache=ResponseCache(clock=clock), nonce_allocator=NonceAllocator(str(tmp_path / "nonce.txt")))
+    assert api.get_price("XBTUSD") == 60001.0
+    assert api.get_price("XBTUSD") == 60001.0
+    assert transport.calls == ["AssetPairs", "Ticker"]
+    clock.now += 2.5
+    assert api.get_price("XBTUSD") == pytest.approx(60002.0)
+    # AssetPairs stays cached for an hour
+    assert transport.calls == ["AssetPairs", "Ticker", "Ticker"]
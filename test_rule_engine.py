@@ -0,0 +1,134 @@
+import numpy as np
+import pytest
+import backtest
+import ohlcv
+from rule_engine import NO_ACTION, BUY, SELL, PARTIAL_SELL, RuleBook, sentiment_ladder
+from trading_strategy import TradingStrategy
+
+
+def reference_ladder(sentiment: float, macd: float, signal: float, rsi: float) -> int:
+    # The if/elif ladder TradingStrategy._determine_trade_action used before rule sets
+    if sentiment > 0.5:
+        return BUY if macd > signal * 0.9 and rsi < 65 else NO_ACTION
+    if 0.1 < sentiment <= 0.5:
+        return BUY if macd > signal and rsi < 60 else NO_ACTION
+    if sentiment < -0.5:
+        return SELL if macd < signal * 1.1 and rsi > 50 else NO_ACTION
+    if -0.5 <= sentiment < -0.1:
+        return SELL if macd < signal and rsi > 45 else NO_ACTION
+    if macd > signal and rsi < 40:
+        return BUY
+    if macd < signal and rsi > 60:
+        return PARTIAL_SELL
+    return NO_ACTION
+
+
+def random_ticks(count: int, seed: int):
+    rng = np.random.default_rng(seed)
+    for _ in range(count):
+        # Bucket edges are hit exactly as well as in between
+        sentiment = float(rng.choice([0.5, -0.5, 0.1, -0.1, 0.0, rng.uniform(-1, 1)]))
+        yield sentiment, float(rng.normal()), float(rng.normal()), float(rng.uniform(20, 80))
+
+
+def test_sentiment_ladder_matches_reference():
+    book = RuleBook([sentiment_ladder()])
+    for sentiment, macd, signal, rsi in random_ticks(5000, seed=9):
+        decision = book.decide(sentiment=sentiment, macd=macd, signal=signal, rsi=rsi)[0]
+        assert decision.action == reference_ladder(sentiment, macd, signal, rsi), (sentiment, macd, signal, rsi)
+
+
+def test_strategy_dispatches_ladder_actions():
+    strategy = TradingStrategy(rules=sentiment_ladder(), shadow_rules={})
+    calls = []
+    strategy._execute_buy = lambda price: calls.append(BUY)
+    strategy._execute_sell = lambda price: calls.append(SELL)
+    strategy._execute_partial_sell = lambda price: calls.append(PARTIAL_SELL)
+    for sentiment, macd, signal, rsi in random_ticks(1000, seed=4):
+        strategy.sentiment_score = sentiment
+        calls.clear()
+        strategy._determine_trade_action(100.0, macd, signal, rsi, 99.0)
+        expected = reference_ladder(sentiment, macd, signal, rsi)
+        assert calls == ([expected] if expected != NO_ACTION else [])
+
+
+def edge_rule_sets():
+    sets = [sentiment_ladder({"moderate_buy_rsi": 40 + i % 30, "strong_positive_sentiment": 0.3 + (i % 5) / 10})
+            for i in range(50)]
+    # A rule with no conditions, a scaled left-hand side, a branch without rules,
+    # and an empty rule set
+    sets.append([{"name": "above average", "when": ["price > 1.01 * moving_avg"], "rules": [{"if": [], "then": "sell"}]},
+                 {"when": ["2 * rsi >= 100"], "rules": []}])
+    sets.append([])
+    return sets
+
+
+def test_scalar_and_vector_paths_agree():
+    book = RuleBook(edge_rule_sets())
+    rng = np.random.default_rng(3)
+    for _ in range(2000):
+        features = dict(sentiment=float(rng.choice([0.5, 0.4, -0.5, 0.1, rng.uniform(-1, 1)])),
+                        rsi=float(rng.uniform(20, 80)), macd=float(rng.normal()), signal=float(rng.normal()),
+                        price=float(rng.uniform(99, 103)), moving_avg=100.0)
+        if rng.random() < 0.05:
+            features["macd"] = None
+        scalar = [(d.action, d.branch, d.rule) for d in book._decide_scalar(features)]
+        actions, branches, rules = book.evaluate(features)
+        vector = [(int(action), book.branch_names[branch] if branch >= 0 else None,
+                   book.rule_names[rule] if rule >= 0 else None)
+                  for action, branch, rule in zip(actions, branches, rules)]
+        assert scalar == vector, features
+
+
+def test_each_set_decides_as_if_alone():
+    sets = edge_rule_sets()
+    book = RuleBook(sets)
+    features = dict(sentiment=0.3, rsi=45.0, macd=0.4, signal=0.2, price=101.5, moving_avg=100.0)
+    decisions = book.decide(**features)
+    for index in (0, 7, 33, 50, 51):
+        assert RuleBook([sets[index]]).decide(**features)[0].action == decisions[index].action
+
+
+def test_unknown_action_and_bad_condition_are_rejected():
+    with pytest.raises(ValueError):
+        RuleBook([[{"when": [], "rules": [{"if": [], "then": "hold"}]}]])
+    with pytest.raises(ValueError):
+        RuleBook([[{"when": ["rsi ~ 50"], "rules": []}]])
+
+
+def select_reference(closes: np.ndarray, sentiment: np.ndarray) -> np.ndarray:
+    # The np.select over sentiment buckets generate_signals used before the engine
+    moving_avg = ohlcv.sma(closes, 7)
+    rsi = ohlcv.rsi(closes, 14)
+    macd, signal, _ = ohlcv.macd(closes, 12, 26, 7)
+    with np.errstate(invalid='ignore'):
+        ready = np.all([np.isfinite(x) & (x != 0) for x in (moving_avg, rsi, macd, signal)], axis=0)
+        buckets = [sentiment > 0.5, (sentiment > 0.1) & (sentiment <= 0.5), sentiment < -0.5,
+                   (sentiment >= -0.5) & (sentiment < -0.1)]
+        actions = np.select(buckets, [
+            np.where((macd > signal * 0.9) & (rsi < 65), BUY, NO_ACTION),
+            np.where((macd > signal) & (rsi < 60), BUY, NO_ACTION),
+            np.where((macd < signal * 1.1) & (rsi > 50), SELL, NO_ACTION),
+            np.where((macd < signal) & (rsi > 45), SELL, NO_ACTION),
+        ], default=np.select([(macd > signal) & (rsi < 40), (macd < signal) & (rsi > 60)], [BUY, PARTIAL_SELL],
+                             NO_ACTION))
+    return np.where(ready, actions, NO_ACTION)
+
+
+def test_generate_signals_matches_select_reference():
+    rng = np.random.default_rng(5)
+    closes = 30000 + np.cumsum(rng.normal(0, 60, 20000))
+    sentiment = rng.uniform(-1, 1, 20000)
+    sentiment[::7], sentiment[::11], sentiment[::13], sentiment[::17] = 0.5, -0.5, 0.1, -0.1
+    signals = backtest.generate_signals(closes, sentiment)
+    assert np.array_equal(signals, select_reference(closes, sentiment))
+    assert set(np.unique(signals)) == {NO_ACTION, BUY, SELL, PARTIAL_SELL}
+
+
+def test_generate_signals_reuses_compiled_books():
+    closes = 30000 + np.cumsum(np.random.default_rng(1).normal(0, 60, 500))
+    first = backtest._rule_book(backtest.DEFAULT_PARAMS)
+    backtest.generate_signals(closes, 0.0, {"neutral_buy_rsi": 40})
+    assert backtest._rule_book(dict(backtest.DEFAULT_PARAMS)) is first
+    assert backtest._rule_book(backtest.DEFAULT_PARAMS, sentiment_ladder()) is \
+        backtest._rule_book(backtest.DEFAULT_PARAMS, sentiment_ladder())
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+import scanner
+from api_kraken import KrakenAPI
+from config import API_KEY, API_SECRET
+from exchange_simulator import SimulatedExchange, SyntheticMarket
+from indicators import StreamingIndicators
+from nonce_allocator import NonceAllocator
+from rate_limiter import KrakenRateLimiter, RequestCoalescer
+from response_cache import ResponseCache
+from scanner import MultiPairScanner
+
+INTERVAL = 60
+
+
+@pytest.fixture
+def exchange():
+    simulator = SimulatedExchange({"XBTUSDT": SyntheticMarket(seed=1),
+                                   "ETHUSDT": SyntheticMarket(start_price=3000.0, seed=2),
+                                   "SOLUSDT": SyntheticMarket(start_price=150.0, price_decimals=2, seed=4)}, seed=3)
+    public = simulator._public
+
+    def history_outage(method, data):
+        # SOLUSDT trades, but its candle history cannot be fetched
+        if method == "OHLC" and data.get("pair") == "SOLUSDT":
+            return ["EService:Unavailable"], None
+        return public(method, data)
+
+    simulator._public = history_outage
+    # A slow clock keeps prices still while a test runs
+    simulator.start(port=0, ws_port=None, tick_interval=60)
+    yield simulator
+    simulator.stop()
+
+
+@pytest.fixture
+def api(exchange, tmp_path, monkeypatch):
+    client = KrakenAPI(API_KEY, API_SECRET, exchange.base_url, rate_limiter=KrakenRateLimiter(1e9, 1e9, 1e9, 1e9),
+                       coalescer=RequestCoalescer(window=0), cache=ResponseCache(max_entries=0),
+                       nonce_allocator=NonceAllocator(str(tmp_path / "nonce.txt")))
+    monkeypatch.setattr(scanner, "get_kraken_api", lambda: client)
+    monkeypatch.setattr(scanner, "fetch_latest_news", lambda: [])
+    monkeypatch.setattr(scanner, "calculate_sentiment", lambda articles: 0.25)
+    return client
+
+
+def test_warm_up_drops_unknown_pairs_and_pairs_without_history(exchange, api):
+    pair_scanner = MultiPairScanner(["XBTUSDT", "FOOUSDT", "ETHUSDT", "SOLUSDT"], INTERVAL)
+    pair_scanner.warm_up()
+    assert pair_scanner.pairs == ["XBTUSDT", "ETHUSDT"]
+    assert set(pair_scanner.strategies) == {"XBTUSDT", "ETHUSDT"}
+    assert [strategy.allocation for strategy in pair_scanner.strategies.values()] == [0.5, 0.5]
+    assert pair_scanner.indicators.n_pairs == 2
+    # Each failed pair was retried on its own before being dropped
+    assert exchange.requests["OHLC"] == 4 + 2
+
+
+def test_scan_batches_tickers_and_feeds_each_pair_its_own_row(exchange, api):
+    pairs = ["XBTUSDT", "ETHUSDT", "SOLUSDT"]
+    pair_scanner = MultiPairScanner(pairs, INTERVAL)
+    history = {pair: api.get_historical_closes(pair, INTERVAL) for pair in ("XBTUSDT", "ETHUSDT")}
+    # SOLUSDT has no history on the simulator, so it is seeded directly
+    history["SOLUSDT"] = 150.0 + np.cumsum(np.random.default_rng(5).normal(0, 0.5, 400))
+    length = min(len(closes) for closes in history.values())
+    pair_scanner.indicators.warm_up(np.column_stack([history[pair][-length:] for pair in pairs]))
+
+    decisions = {}
+    for pair, strategy in pair_scanner.strategies.items():
+        strategy.decide = lambda *values, pair=pair: decisions.setdefault(pair, values)
+    tickers_before = exchange.requests["Ticker"]
+    pair_scanner.scan()
+    assert exchange.requests["Ticker"] == tickers_before + 1
+
+    for pair in pairs:
+        price = float(exchange.ticker(pair)["c"][0])
+        reference = StreamingIndicators(capacity=2000)
+        reference.warm_up(history[pair][-length:])
+        reference.update(price)
+        macd, signal = reference.macd
+        assert decisions[pair] == pytest.approx((price, reference.moving_average, reference.rsi, macd, signal),
+                                                rel=1e-9)
+        assert pair_scanner.strategies[pair].sentiment_score == 0.25
+        assert pair_scanner.strategies[pair].market_volume == float(exchange.ticker(pair)["v"][1])
@@ -0,0 +1,73 @@
+import time
+from types import SimpleNamespace
+import numpy as np
+import pytest
+import state_snapshot
+from state_snapshot import read_snapshot, restore_snapshot, save_snapshot
+from trading_strategy import TradingStrategy
+
+INTERVAL = 60
+
+
+class FakeOHLC:
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+        self.calls = []
+
+    def get_ohlc(self, pair, interval, since=None):
+        self.calls.append((pair, interval, since))
+        return self.rows, None
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(value=time.time())
+    monkeypatch.setattr(state_snapshot, "time", SimpleNamespace(time=lambda: now.value))
+    # No portfolio is initialized, so snapshots carry indicator and strategy state only
+    monkeypatch.setattr(state_snapshot, "current_portfolio", lambda: None)
+    return now
+
+
+def warm_strategy(count: int = 1500) -> TradingStrategy:
+    closes = 30000 + np.cumsum(np.random.default_rng(6).normal(0, 40, count))
+    strategy = TradingStrategy(list(closes), trade_cooldown=0)
+    strategy.last_buy_price, strategy.last_trade_type, strategy.cooldown_end_time = 29950.0, "buy", 123.0
+    return strategy
+
+
+def test_saved_snapshot_restores_identical_state(clock, tmp_path):
+    path = str(tmp_path / "state.snap")
+    saved = warm_strategy()
+    assert save_snapshot(saved, path) > 0
+    clock.value += 2 * INTERVAL * 60
+    missed = [[int(clock.value) - INTERVAL * 60, "0", "0", "0", "30123.5", "0", "0", 0]]
+    restored = TradingStrategy(trade_cooldown=0)
+    assert restore_snapshot(restored, INTERVAL, path, kraken_api=FakeOHLC(missed))
+    saved.indicators.update(30123.5)
+    assert restored.state() == saved.state()
+    assert np.array_equal(restored.indicators.prices.to_array(), saved.indicators.prices.to_array())
+    assert restored.indicators.rsi == saved.indicators.rsi
+    assert restored.indicators.macd == saved.indicators.macd
+
+
+def test_flipped_byte_is_rejected(clock, tmp_path):
+    path = tmp_path / "state.snap"
+    save_snapshot(warm_strategy(), str(path))
+    assert read_snapshot(str(path)) is not None
+    data = bytearray(path.read_bytes())
+    # A byte inside the memory-mapped prices, past the header and metadata
+    data[-100] ^= 0x01
+    path.write_bytes(bytes(data))
+    assert read_snapshot(str(path)) is None
+
+
+def test_gap_longer_than_the_buffer_leaves_the_strategy_untouched(clock, tmp_path):
+    path = str(tmp_path / "state.snap")
+    save_snapshot(warm_strategy(), path)
+    strategy = TradingStrategy(trade_cooldown=0)
+    clock.value += strategy.indicators.prices.capacity * INTERVAL * 60 + 1
+    kraken_api = FakeOHLC()
+    assert not restore_snapshot(strategy, INTERVAL, path, kraken_api=kraken_api)
+    assert kraken_api.calls == []
+    assert strategy.state() == TradingStrategy(trade_cooldown=0).state()
+    assert len(strategy.indicators.prices) == 0
@@ -0,0 +1,44 @@
+from multiprocessing import shared_memory
+import numpy as np
+import pytest
+import sweep
+from backtest import run_backtest
+from sweep import SUMMARY_KEYS, grid_configurations, run_sweep
+
+
+def history(count: int = 2000):
+    rng = np.random.default_rng(8)
+    return 30000 + np.cumsum(rng.normal(0, 80, count)), np.clip(rng.normal(0.2, 0.4, count), -1, 1)
+
+
+def test_two_workers_rank_like_serial_backtests():
+    closes, sentiment = history()
+    grid = grid_configurations({"neutral_buy_rsi": [35, 40, 45], "moderate_buy_rsi": [55, 65],
+                                "strong_positive_sentiment": [0.4, 0.6]})
+    ranked = run_sweep(closes, grid, sentiment, workers=2, chunksize=3, trade_volume=0.02, cooldown=4)
+    serial = []
+    for params in grid:
+        result = run_backtest(closes, sentiment, params=params, trade_volume=0.02, cooldown=4)
+        serial.append(dict({key: result[key] for key in SUMMARY_KEYS}, params=params))
+    serial.sort(key=lambda result: result["pnl"], reverse=True)
+    assert len({result["pnl"] for result in serial}) > 1
+    assert ranked == serial
+
+
+def test_shared_memory_is_unlinked_when_a_worker_fails(monkeypatch):
+    names = []
+    share_array = sweep._share_array
+
+    def recording_share_array(array):
+        block, spec = share_array(array)
+        names.append(block.name)
+        return block, spec
+
+    monkeypatch.setattr(sweep, "_share_array", recording_share_array)
+    closes, sentiment = history(500)
+    with pytest.raises(TypeError):
+        run_sweep(closes, [{"ma_window": 7}, {"ma_window": "seven"}], sentiment, workers=2)
+    assert len(names) == 2
+    for name in names:
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
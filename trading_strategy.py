@@ -1,26 +1,56 @@
 import time
-from api_kraken import KrakenAPI
+import metrics
+from api_kraken import get_kraken_api
 from indicators import (
-    calculate_moving_average,
-    calculate_rsi,
-    calculate_macd,
+    StreamingIndicators,
     calculate_potential_profit_loss,
     is_profitable_trade,
     calculate_sentiment,
     fetch_latest_news,
 )
-from portfolio import portfolio
-from config import MIN_TRADE_VOLUME, API_KEY, API_SECRET, API_DOMAIN
-from logger_config import logger
-from typing import List, Optional
-from termcolor import colored
+from portfolio import get_portfolio
+from config import MIN_TRADE_VOLUME, GLOBAL_TRADE_COOLDOWN, RULES_FILE
+from logger_config import logger, correlation
+from rule_engine import NO_ACTION, BUY, SELL, PARTIAL_SELL, Decision, RuleBook, RuleSet, load_rules, sentiment_ladder
+from typing import List, Optional, Dict
+import numpy as np
 
-# Initialize Kraken API client
-kraken_api = KrakenAPI(API_KEY, API_SECRET, API_DOMAIN)
+# Console colors for decision messages, applied by the log writer only when emitted
+GREEN, YELLOW, RED = {"color": "green"}, {"color": "yellow"}, {"color": "red"}
+
+# Buys are skipped while the pair's 24h volume is worth less than this many BTC
+MIN_MARKET_VOLUME_BTC = 100
 
 class TradingStrategy:
-    def __init__(self, prices: Optional[List[float]] = None):
-        self.prices = prices if prices else []
+    def __init__(self, prices: Optional[List[float]] = None, pair: str = "XBTUSDT",
+                 trade_cooldown: float = GLOBAL_TRADE_COOLDOWN, order_manager=None,
+                 rules: Optional[RuleSet] = None, shadow_rules: Optional[Dict[str, RuleSet]] = None,
+                 allocation: float = 1.0):
+        self.pair = pair
+        # Share of the portfolio's TRADING bucket (held in BTC) this strategy trades,
+        # e.g. split between the pairs of a multi-pair scan
+        self.allocation = allocation
+        # Trade decisions come from a declarative rule set, RULES_FILE or the built-in
+        # sentiment ladder. Shadow rule sets are scored on every tick but never traded.
+        if rules is None:
+            rules, file_shadow_rules = load_rules(RULES_FILE) if RULES_FILE else (sentiment_ladder(), {})
+            shadow_rules = file_shadow_rules if shadow_rules is None else shadow_rules
+        shadow_rules = shadow_rules or {}
+        self.rule_book = RuleBook([rules] + list(shadow_rules.values()), names=["live"] + list(shadow_rules))
+        self.shadow_decisions: Dict[str, Decision] = {}
+        self.trade_cooldown = trade_cooldown
+        # With an OrderManager, last buy/sell prices come from confirmed fills
+        # rather than the signal price
+        self.order_manager = order_manager
+        # txid -> last_trade_type before that order, for orders not yet filled, so an
+        # order that is canceled or expires unfilled can be undone
+        self._unfilled_orders: Dict[str, Optional[str]] = {}
+        if order_manager is not None:
+            order_manager.listeners.append(self._on_order_event)
+        # Streaming indicators keep the latest 1000 prices in a ring buffer
+        self.indicators = StreamingIndicators(capacity=1000)
+        if prices:
+            self.indicators.warm_up(prices)
         self.last_buy_price = None
         self.last_sell_price = None
         self.last_trade_type = None
@@ -28,33 +58,88 @@ class TradingStrategy:
         self.stop_loss_percent = 0.03  # 3% stop loss
         self.take_profit_percent = 0.15  # 15% take profit
         self.sentiment_score = 0.0
+        # 24h volume supplied by a caller that already fetched it, e.g. a batched scan
+        self.market_volume = None
+        # perf_counter() when the price being acted on arrived, for tick-to-order latency
+        self.tick_started = None
+
+    @property
+    def prices(self) -> List[float]:
+        return self.indicators.prices.to_list()
+
+    @prices.setter
+    def prices(self, prices: Optional[List[float]]):
+        self.indicators.warm_up(prices or [])
+
+    def warm_up(self, pair: Optional[str] = None, interval: int = 60):
+        """
+        Seeds the indicator engine with historical closes in one bulk pass.
+        """
+        historical_prices = get_kraken_api().get_historical_closes(pair=pair or self.pair, interval=interval)
+        self.indicators.warm_up(historical_prices)
+        logger.info("Warmed up indicators with %d historical prices.", len(historical_prices))
+
+    # Decision state carried across restarts by state_snapshot
+    _STATE_FIELDS = ("last_buy_price", "last_sell_price", "last_trade_type", "cooldown_end_time", "sentiment_score")
+
+    def state(self) -> Dict:
+        """
+        Returns the trade state machine (last fills, last trade type, cooldown) and the
+        indicator state as plain values. Buffered prices are in `indicators.prices`.
+        """
+        state = {field: getattr(self, field) for field in self._STATE_FIELDS}
+        state["pair"] = self.pair
+        state["indicators"] = self.indicators.state()
+        return state
+
+    def restore(self, state: Dict, prices: np.ndarray):
+        """
+        Resumes from a `state()` and its buffered prices instead of warming up again.
+        """
+        if state["pair"] != self.pair:
+            raise ValueError(f"Strategy state belongs to {state['pair']}, not {self.pair}.")
+        self.indicators.restore(state["indicators"], prices)
+        for field in self._STATE_FIELDS:
+            setattr(self, field, state[field])
 
     def update_sentiment(self):
-        articles = fetch_latest_news()
-        self.sentiment_score = calculate_sentiment(articles)
-        logger.info(f"Updated sentiment score: {self.sentiment_score}")
+        with metrics.span("fetch_latest_news"):
+            articles = fetch_latest_news()
+        with metrics.span("calculate_sentiment"):
+            self.sentiment_score = calculate_sentiment(articles)
+        logger.info("Updated sentiment score: %s", self.sentiment_score)
 
     def execute_strategy(self):
-        self.update_sentiment()
+        with correlation("strategy"), metrics.span("execute_strategy"):
+            self.update_sentiment()
 
-        current_price = kraken_api.get_btc_price()
-        if current_price is None:
-            logger.error("Failed to retrieve BTC price.")
-            return
+            with metrics.span("get_price"):
+                current_price = get_kraken_api().get_price(self.pair)
+            if current_price is None:
+                logger.error("Failed to retrieve %s price.", self.pair)
+                return
+            self.tick_started = time.perf_counter()
 
-        self.prices.append(current_price)
-        if len(self.prices) > 1000:
-            self.prices.pop(0)  # keep only the latest 1000
+            # Update indicators incrementally with the new price
+            with metrics.span("indicators"):
+                self.indicators.update(current_price)
+                macd, signal = self.indicators.macd
 
-        logger.debug(f"[execute_strategy] Current price history length: {len(self.prices)}")  # NEW LOG
+            logger.debug("[execute_strategy] Current price history length: %d", len(self.indicators.prices))  # NEW LOG
 
-        # Calculate indicators
-        moving_avg = calculate_moving_average(self.prices)
-        rsi = calculate_rsi(self.prices)
-        macd, signal = calculate_macd(self.prices)
+            with metrics.span("decide"):
+                self.decide(current_price, self.indicators.moving_average, self.indicators.rsi, macd, signal)
 
-        logger.info(f"Current BTC Price: {current_price}, Moving Average: {moving_avg}, "
-                    f"RSI: {rsi}, MACD: {macd}, Signal: {signal}, Sentiment Score: {self.sentiment_score}")
+    def decide(self, current_price: float, moving_avg: Optional[float], rsi: Optional[float],
+               macd: Optional[float], signal: Optional[float]):
+        """
+        Acts on indicator values computed elsewhere, e.g. by a batch engine shared across pairs.
+        """
+        if time.time() < self.cooldown_end_time:
+            logger.debug("[decide] %s in trade cooldown for another %.0fs", self.pair, self.cooldown_end_time - time.time())
+            return
+        logger.info("Current %s Price: %s, Moving Average: %s, RSI: %s, MACD: %s, Signal: %s, Sentiment Score: %s",
+                    self.pair, current_price, moving_avg, rsi, macd, signal, self.sentiment_score)
 
         # NEW LOG: Log if any of them are None
         if moving_avg is None:
@@ -65,119 +150,167 @@ class TradingStrategy:
             logger.debug("[execute_strategy] macd or signal is None - not enough data yet?")
 
         if moving_avg and rsi and macd and signal:
-            self._determine_trade_action(current_price, macd, signal, rsi)
-            self
-
-    def _determine_trade_action(self, current_price: float, macd: float, signal: float, rsi: float):
-        logger.debug(f"[_determine_trade_action] macd={macd}, signal={signal}, rsi={rsi}, sentiment={self.sentiment_score}")  # NEW LOG
-
-        # Integrate sentiment
-        if self.sentiment_score > 0.5:
-            logger.info("Strong positive sentiment detected. Considering more aggressive buying opportunity...")
-            adjusted_rsi_threshold = 65
-            if macd > signal * 0.9 and rsi < adjusted_rsi_threshold:
-                logger.info(f"MACD ({macd}) > 0.9 * Signal ({signal}) and RSI ({rsi}) < {adjusted_rsi_threshold}. Executing buy.")
-                self._execute_buy(current_price)
-            else:
-                logger.info(colored(f"Conditions not met for buying despite strong positive sentiment: MACD {macd}, Signal {signal}, RSI {rsi}.", 'yellow'))
-
-        elif 0.1 < self.sentiment_score <= 0.5:
-            logger.info("Moderate positive sentiment detected. Considering buying opportunity...")
-            if macd > signal and rsi < 60:
-                logger.info(f"MACD ({macd}) > Signal ({signal}) and RSI ({rsi}) < 60 with moderate positive sentiment. Executing buy.")
-                self._execute_buy(current_price)
-            else:
-                logger.info(colored(f"Conditions not met for buying despite moderate positive sentiment: MACD {macd}, Signal {signal}, RSI {rsi}.", 'yellow'))
-
-        elif self.sentiment_score < -0.5:
-            logger.info("Strong negative sentiment detected. Considering more aggressive selling opportunity...")
-            adjusted_rsi_threshold = 50
-            if macd < signal * 1.1 and rsi > adjusted_rsi_threshold:
-                logger.info(f"MACD ({macd}) < 1.1 * Signal ({signal}) and RSI ({rsi}) > {adjusted_rsi_threshold}. Executing sell.")
-                self._execute_sell(current_price)
-            else:
-                logger.info(colored(f"Conditions not met for selling despite strong negative sentiment: MACD {macd}, Signal {signal}, RSI {rsi}.", 'yellow'))
-
-        elif -0.5 <= self.sentiment_score < -0.1:
-            logger.info("Moderate negative sentiment detected. Considering selling opportunity...")
-            if macd < signal and rsi > 45:
-                logger.info(f"MACD ({macd}) < Signal ({signal}) and RSI ({rsi}) > 45 with moderate negative sentiment. Executing sell.")
-                self._execute_sell(current_price)
-            else:
-                logger.info(colored(f"Conditions not met for selling despite moderate negative sentiment: MACD {macd}, Signal {signal}, RSI {rsi}.", 'yellow'))
+            self._determine_trade_action(current_price, macd, signal, rsi, moving_avg)
 
-        else:
-            logger.info("Neutral sentiment detected. Proceeding with regular MACD and RSI checks.")
-            if macd > signal and rsi < 40:
-                logger.info(f"MACD ({macd}) > Signal ({signal}) and RSI ({rsi}) < 40. Executing buy.")
-                self._execute_buy(current_price)
-            elif macd < signal and rsi > 60:
-                logger.info(f"MACD ({macd}) < Signal ({signal}) and RSI ({rsi}) > 60. Executing partial sell.")
-                self._execute_partial_sell(current_price)
-            else:
-                logger.info(colored(f"No trade signal detected: MACD {macd}, Signal {signal}, RSI {rsi}. "
-                                    f"Conditions for buying: MACD > Signal and RSI < 40. "
-                                    f"Conditions for selling: MACD < Signal and RSI > 60.", 'yellow'))
+    def _determine_trade_action(self, current_price: float, macd: float, signal: float, rsi: float,
+                                moving_avg: Optional[float] = None):
+        logger.debug("[_determine_trade_action] macd=%s, signal=%s, rsi=%s, sentiment=%s", macd, signal, rsi, self.sentiment_score)  # NEW LOG
+
+        # The live rule set and any shadow rule sets are scored together in one pass
+        decisions = self.rule_book.decide(price=current_price, moving_avg=moving_avg, rsi=rsi, macd=macd,
+                                          signal=signal, sentiment=self.sentiment_score)
+        for name, decision in zip(self.rule_book.names, decisions):
+            metrics.RULE_DECISIONS.inc(name, decision.action_name)
+        for name, decision in zip(self.rule_book.names[1:], decisions[1:]):
+            self.shadow_decisions[name] = decision
+            logger.debug("[shadow] %s would %s (%s, %s)", name, decision.action_name, decision.branch, decision.rule)
+
+        decision = decisions[0]
+        if decision.action == NO_ACTION:
+            logger.info("No trade signal (%s): MACD %s, Signal %s, RSI %s, sentiment %s.",
+                        decision.branch or "no branch matched", macd, signal, rsi, self.sentiment_score, extra=YELLOW)
+            return
+        logger.info("%s: rule '%s' matched with MACD %s, Signal %s, RSI %s. Executing %s.",
+                    decision.branch, decision.rule, macd, signal, rsi, decision.action_name)
+        if decision.action == BUY:
+            self._execute_buy(current_price)
+        elif decision.action == SELL:
+            self._execute_sell(current_price)
+        elif decision.action == PARTIAL_SELL:
+            self._execute_partial_sell(current_price)
 
     def _execute_buy(self, current_price: float):
         # NEW LOG
-        logger.debug(f"[_execute_buy] last_sell_price={self.last_sell_price}, last_trade_type={self.last_trade_type}, current_price={current_price}")
+        logger.debug("[_execute_buy] last_sell_price=%s, last_trade_type=%s, current_price=%s", self.last_sell_price, self.last_trade_type, current_price)
 
         potential_profit_loss = None
         if self.last_sell_price:
             potential_profit_loss = calculate_potential_profit_loss(current_price, self.last_sell_price)
-        logger.debug(f"[_execute_buy] potential_profit_loss={potential_profit_loss}")  # NEW LOG
+        logger.debug("[_execute_buy] potential_profit_loss=%s", potential_profit_loss)  # NEW LOG
 
         # Check market volume to ensure buying during upward momentum
-        market_volume = kraken_api.get_market_volume()
-        logger.debug(f"[_execute_buy] market_volume={market_volume}")  # NEW LOG
+        market_volume = self.market_volume
+        if market_volume is None:
+            market_volume = get_kraken_api().get_market_volume(self.pair)
+        logger.debug("[_execute_buy] market_volume=%s", market_volume)  # NEW LOG
 
-        if market_volume and market_volume < 100:
-            logger.info(f"Market volume ({market_volume}) is too low for a confident buy. Skipping buy action.")
+        # Kraken reports volume in the pair's base asset, so the threshold is converted too
+        min_market_volume = self._btc_to_base(MIN_MARKET_VOLUME_BTC, current_price)
+        if market_volume and min_market_volume and market_volume < min_market_volume:
+            logger.info("Market volume (%s) is below %s for %s; too low for a confident buy. Skipping buy action.",
+                        market_volume, min_market_volume, self.pair)
             return
 
         # Check if last trade was also 'buy', or if the trade is profitable
         if (potential_profit_loss is None or is_profitable_trade(potential_profit_loss)):
-            logger.info(colored(f"Buying BTC... Potential Profit: {potential_profit_loss if potential_profit_loss else 0:.2f}%, Market Volume: {market_volume}", 'green'))
-            kraken_api.execute_trade(portfolio.portfolio['TRADING'], 'buy')
-            self.last_buy_price = current_price
-            self.last_trade_type = 'buy'
+            logger.info("Buying %s... Potential Profit: %.2f%%, Market Volume: %s", self.pair, potential_profit_loss or 0, market_volume, extra=GREEN)
+            self._place_order('buy', self._order_volume(current_price), current_price)
         else:
             # NEW LOG: Let us know exactly why we skipped
             reason_msg = "Already in buy mode" if self.last_trade_type == 'buy' else f"Not profitable yet (profit={potential_profit_loss}%)"
-            logger.info(colored(f"Skipping buy action. Reason: {reason_msg}", 'yellow'))
+            logger.info("Skipping buy action. Reason: %s", reason_msg, extra=YELLOW)
 
     def _execute_sell(self, current_price: float):
-        logger.debug(f"[_execute_sell] last_buy_price={self.last_buy_price}, last_trade_type={self.last_trade_type}, current_price={current_price}")
+        logger.debug("[_execute_sell] last_buy_price=%s, last_trade_type=%s, current_price=%s", self.last_buy_price, self.last_trade_type, current_price)
         potential_profit_loss = None
         if self.last_buy_price:
             potential_profit_loss = calculate_potential_profit_loss(current_price, self.last_buy_price)
-        logger.debug(f"[_execute_sell] potential_profit_loss={potential_profit_loss}")  # NEW LOG
+        logger.debug("[_execute_sell] potential_profit_loss=%s", potential_profit_loss)  # NEW LOG
 
         if self.last_trade_type != 'sell' and (potential_profit_loss is None or is_profitable_trade(potential_profit_loss)):
-            logger.info(colored(f"Selling BTC... Potential Profit: {potential_profit_loss if potential_profit_loss else 0:.2f}%", 'red'))
-            kraken_api.execute_trade(portfolio.portfolio['TRADING'], 'sell')
-            self.last_sell_price = current_price
-            self.last_trade_type = 'sell'
+            logger.info("Selling %s... Potential Profit: %.2f%%", self.pair, potential_profit_loss or 0, extra=RED)
+            self._place_order('sell', self._order_volume(current_price), current_price)
         else:
             reason_msg = "Already in sell mode" if self.last_trade_type == 'sell' else f"Not profitable yet (profit={potential_profit_loss}%)"
-            logger.info(colored(f"Skipping sell action. Reason: {reason_msg}", 'yellow'))
+            logger.info("Skipping sell action. Reason: %s", reason_msg, extra=YELLOW)
 
     def _execute_partial_sell(self, current_price: float):
-        logger.debug(f"[_execute_partial_sell] last_buy_price={self.last_buy_price}, last_trade_type={self.last_trade_type}, current_price={current_price}")
+        logger.debug("[_execute_partial_sell] last_buy_price=%s, last_trade_type=%s, current_price=%s", self.last_buy_price, self.last_trade_type, current_price)
         potential_profit_loss = None
         if self.last_buy_price:
             potential_profit_loss = calculate_potential_profit_loss(current_price, self.last_buy_price)
-        logger.debug(f"[_execute_partial_sell] potential_profit_loss={potential_profit_loss}")  # NEW LOG
+        logger.debug("[_execute_partial_sell] potential_profit_loss=%s", potential_profit_loss)  # NEW LOG
 
         if self.last_trade_type != 'sell' and (potential_profit_loss is None or is_profitable_trade(potential_profit_loss)):
-            logger.info(colored(f"Partially selling BTC... Potential Profit: {potential_profit_loss if potential_profit_loss else 0:.2f}%", 'yellow'))
-            kraken_api.execute_trade(portfolio.portfolio['TRADING'] / 2, 'sell')
-            self.last_sell_price = current_price
-            self.last_trade_type = 'sell'
+            logger.info("Partially selling %s... Potential Profit: %.2f%%", self.pair, potential_profit_loss or 0, extra=YELLOW)
+            self._place_order('sell', self._order_volume(current_price, 0.5), current_price)
         else:
             reason_msg = "Already in sell mode" if self.last_trade_type == 'sell' else f"Not profitable yet (profit={potential_profit_loss}%)"
-            logger.info(colored(f"Skipping partial sell. Reason: {reason_msg}", 'yellow'))
+            logger.info("Skipping partial sell. Reason: %s", reason_msg, extra=YELLOW)
+
+    def _btc_to_base(self, amount_btc: float, current_price: float) -> Optional[float]:
+        """
+        Converts a BTC amount into units of the pair's base asset at current prices,
+        or None if the pair's assets or the BTC rate in its quote are unknown.
+        """
+        if self.pair.startswith("XBT"):
+            return amount_btc
+        currencies = get_kraken_api().get_pair_currencies(self.pair)
+        if currencies is None or not current_price:
+            return None
+        base, quote = currencies
+        if base == "XBT":
+            return amount_btc
+        rate = 1.0 if quote == "XBT" else get_kraken_api().get_price(f"XBT{quote}")
+        if not rate:
+            return None
+        return amount_btc * rate / current_price
+
+    def _order_volume(self, current_price: float, fraction: float = 1.0) -> Optional[float]:
+        # The TRADING bucket is a BTC amount; orders are placed in the pair's base asset
+        return self._btc_to_base(get_portfolio().portfolio['TRADING'] * self.allocation * fraction, current_price)
+
+    def _place_order(self, side: str, volume: Optional[float], current_price: float):
+        if volume is None:
+            logger.warning("[_place_order] Cannot size a %s order for %s in its base asset; skipping it.", side, self.pair)
+            return
+        if self.order_manager is None:
+            with metrics.span("execute_trade"):
+                get_kraken_api().execute_trade(volume, side, self.pair)
+            self._record_fill(side, current_price)
+        else:
+            # Prices are recorded by _on_order_event once the order actually fills
+            with metrics.span("submit_order"):
+                order = self.order_manager.submit(side, volume, pair=self.pair)
+            if order is None:
+                logger.warning("[_place_order] %s order for %s was not placed; trade state unchanged.", side, self.pair)
+                return
+            self._unfilled_orders[order.txid] = self.last_trade_type
+        if self.tick_started is not None:
+            metrics.TICK_TO_ORDER_SECONDS.observe(time.perf_counter() - self.tick_started, self.pair)
+        self.last_trade_type = side
+        self.cooldown_end_time = time.time() + self.trade_cooldown
+        if self.order_manager is not None and order.status in ("canceled", "expired"):
+            # Closed before it was tracked here, e.g. an immediate-or-cancel miss
+            self._on_order_event(order, order.status)
+
+    def _record_fill(self, side: str, price: float):
+        if side == 'buy':
+            self.last_buy_price = price
+        else:
+            self.last_sell_price = price
+
+    def _on_order_event(self, order, event: str):
+        if order.pair != self.pair:
+            return
+        if event == 'fill' and order.avg_price is not None:
+            # Any fill confirms the trade, so a later cancel of the rest is not undone
+            self._unfilled_orders.pop(order.txid, None)
+            logger.info("[_on_order_event] %s %s filled %s at %s", order.side, order.pair, order.filled_volume, order.avg_price)
+            self._record_fill(order.side, order.avg_price)
+        elif event == 'replaced':
+            if order.txid in self._unfilled_orders:
+                self._unfilled_orders[order.replaced_by] = self._unfilled_orders.pop(order.txid)
+        elif event in ('canceled', 'expired'):
+            if order.txid not in self._unfilled_orders:
+                return
+            previous = self._unfilled_orders.pop(order.txid)
+            if order.filled_volume == 0 and self.last_trade_type == order.side:
+                logger.info("[_on_order_event] %s order %s %s unfilled; last trade type back to %s",
+                            order.side, order.txid, event, previous)
+                self.last_trade_type = previous
+        elif event == 'closed':
+            self._unfilled_orders.pop(order.txid, None)
 
 
 # Initialize TradingStrategy